@@ -2,44 +2,79 @@
 # Ce fichier utilise la nouvelle fonction validate_date sans nécessiter de modification.
 
 import sqlite3
+import sys
 import logging
 import os
 import shutil
-from datetime import datetime, timedelta
+from bisect import bisect_left
+from itertools import islice
+from datetime import datetime, date, timedelta
 from tkinter import messagebox
 
-from utils.date_utils import get_holidays_set_for_period, jours_ouvres, validate_date
+from utils.date_utils import (get_holidays_set_for_period, ensure_official_holidays, get_calendar_code, get_calendriers,
+                              jours_ouvres, jours_ouvres_batch, validate_date)
+from utils.business_calendar import BusinessCalendar
+from utils.holiday_cache import HOLIDAY_CACHE
 from utils.config_loader import CONFIG
 from db.models import Conge
+from db.instrumentation import QUERY_STATS
 from core.constants import SoldeStatus
 
 class CongeManager:
     def __init__(self, db_manager, certificats_dir):
         self.db = db_manager
         self.certificats_dir = certificats_dir
-        os.makedirs(self.certificats_dir, exist_ok=True)
+        self.holiday_cache = HOLIDAY_CACHE
 
     def get_annee_exercice(self):
         return self.db.get_annee_exercice()
 
-    def effectuer_glissement_annuel(self):
-        self.db.conn.execute('BEGIN TRANSACTION')
+    def effectuer_glissement_annuel(self, taille_lot=None, progression=None):
+        """
+        Clôture de l'exercice en requêtes ensemblistes : création du solde de la nouvelle
+        année pour tous les agents (INSERT ... SELECT) et expiration des soldes de
+        l'année N-2 (UPDATE), au lieu de deux requêtes par agent.
+        Avec `taille_lot`, les agents sont traités par tranches validées séparément ; les
+        requêtes étant idempotentes et l'exercice n'étant avancé qu'à la fin, une clôture
+        interrompue peut simplement être relancée.
+        `progression(fait, total)` est appelée après chaque tranche (nombre d'agents).
+        """
         try:
             annee_actuelle = self.get_annee_exercice()
             nouvelle_annee = annee_actuelle + 1
             annee_a_expirer = annee_actuelle - 2
             solde_initial = float(CONFIG['conges'].get('solde_annuel_par_defaut', 22.0))
-            all_agents = self.get_all_agents()
-            for agent in all_agents:
-                self.db.execute_query("INSERT INTO soldes_annuels (agent_id, annee, solde, statut) VALUES (?, ?, ?, ?)",
-                                      (agent.id, nouvelle_annee, solde_initial, SoldeStatus.ACTIF))
-                self.db.execute_query("UPDATE soldes_annuels SET statut = ? WHERE agent_id = ? AND annee = ?",
-                                      (SoldeStatus.EXPIRE, agent.id, annee_a_expirer))
-            self.db.set_annee_exercice(nouvelle_annee)
-            self.db.conn.commit()
+
+            motif = f"Clôture de l'exercice {annee_actuelle}"
+            if not taille_lot:
+                with self.db.motif_mouvement(motif):
+                    self.db.creer_soldes_annee(nouvelle_annee, solde_initial, SoldeStatus.ACTIF)
+                    self.db.expirer_soldes_annee(annee_a_expirer)
+                    self.db.set_annee_exercice(nouvelle_annee)
+                    self.db.prendre_snapshot_soldes()
+                if progression:
+                    progression(1, 1)
+            else:
+                agent_ids = self.db.get_agent_ids()
+                total = len(agent_ids)
+                for i in range(0, total, taille_lot):
+                    tranche = agent_ids[i:i + taille_lot]
+                    with self.db.motif_mouvement(motif):
+                        self.db.creer_soldes_annee(nouvelle_annee, solde_initial, SoldeStatus.ACTIF, tranche[0], tranche[-1])
+                        self.db.expirer_soldes_annee(annee_a_expirer, tranche[0], tranche[-1])
+                    if progression:
+                        progression(i + len(tranche), total)
+                with self.db.motif_mouvement(motif):
+                    # Agents éventuellement créés pendant la clôture
+                    suivant = agent_ids[-1] + 1 if agent_ids else 0
+                    self.db.creer_soldes_annee(nouvelle_annee, solde_initial, SoldeStatus.ACTIF, suivant, sys.maxsize)
+                    self.db.expirer_soldes_annee(annee_a_expirer, suivant, sys.maxsize)
+                    self.db.set_annee_exercice(nouvelle_annee)
+                    # Instantané de fin d'exercice (soldes à date des audits annuels)
+                    self.db.prendre_snapshot_soldes()
+            logging.info(f"Glissement annuel effectué : exercice {nouvelle_annee}.")
             return True
         except sqlite3.Error as e:
-            self.db.conn.rollback()
             logging.error(f"Échec du glissement annuel : {e}", exc_info=True)
             raise e
 
@@ -48,7 +83,8 @@ class CongeManager:
 
     def apurer_soldes(self, solde_ids):
         try:
-            self.db.apurer_soldes_by_ids(solde_ids)
+            with self.db.motif_mouvement("Apurement des soldes expirés"):
+                self.db.apurer_soldes_by_ids(solde_ids)
             return True
         except sqlite3.Error as e:
             logging.error(f"Échec de l'apurement des soldes : {e}", exc_info=True)
@@ -59,21 +95,18 @@ class CongeManager:
         Sauvegarde les modifications manuelles des soldes, en gérant
         les mises à jour et les créations de nouvelles lignes de solde.
         """
-        self.db.conn.execute('BEGIN TRANSACTION')
         try:
-            for solde_id, new_value in updates.items():
-                self.db.update_solde_by_id(solde_id, new_value)
-            
-            if creations:
-                annee_exercice = self.get_annee_exercice()
-                for year, value in creations.items():
-                    statut = SoldeStatus.EXPIRE if year < annee_exercice - 2 else SoldeStatus.ACTIF
-                    self.db.create_solde_annuel(agent_id, year, value, statut)
+            with self.db.motif_mouvement("Saisie manuelle"):
+                for solde_id, new_value in updates.items():
+                    self.db.update_solde_by_id(solde_id, new_value)
 
-            self.db.conn.commit()
+                if creations:
+                    annee_exercice = self.get_annee_exercice()
+                    for year, value in creations.items():
+                        statut = SoldeStatus.EXPIRE if year < annee_exercice - 2 else SoldeStatus.ACTIF
+                        self.db.create_solde_annuel(agent_id, year, value, statut)
             return True
         except sqlite3.Error as e:
-            self.db.conn.rollback()
             logging.error(f"Échec de la mise à jour manuelle des soldes pour agent {agent_id}: {e}", exc_info=True)
             raise e
 
@@ -81,8 +114,14 @@ class CongeManager:
     def get_all_agents(self, **kwargs):
         return self.db.get_agents(**kwargs)
 
-    def get_agents_count(self, term=None):
-        return self.db.get_agents_count(term=term)
+    def get_agents_rows(self, exclude_id=None):
+        return self.db.get_agents_rows(exclude_id=exclude_id)
+
+    def get_agents_page(self, term=None, limit=50, after=None, tri=None, descendant=False, solde_min=None):
+        return self.db.get_agents_page(term=term, limit=limit, after=after, tri=tri, descendant=descendant, solde_min=solde_min)
+
+    def get_agents_count(self, term=None, solde_min=None):
+        return self.db.get_agents_count(term=term, solde_min=solde_min)
 
     def get_agent_by_id(self, agent_id):
         return self.db.get_agent_by_id(agent_id)
@@ -90,9 +129,58 @@ class CongeManager:
     def get_all_conges(self):
         return self.db.get_conges()
 
+    def iter_all_agents(self, term=None):
+        return self.db.iter_agents(term=term)
+
+    def iter_all_conges(self, **filtres):
+        return self.db.iter_conges(**filtres)
+
     def get_conges_for_agent(self, agent_id):
         return self.db.get_conges(agent_id=agent_id)
 
+    # --- Agrégats de congés (tenus à jour par la base, sans parcourir les congés) ---
+    def get_jours_pris_par_annee(self, agent_id, type_conge="Congé annuel", statut="Actif"):
+        return self.db.get_jours_pris_par_annee(agent_id, type_conge, statut)
+
+    def get_agregats_agent(self, agent_id):
+        return self.db.get_agregats_agent(agent_id)
+
+    def get_statistiques_annee(self, annee):
+        return self.db.get_statistiques_annee(annee)
+
+    def get_statistiques_par_grade(self, annee, type_conge="Congé annuel", statut="Actif"):
+        return self.db.get_statistiques_par_grade(annee, type_conge, statut)
+
+    # --- Registre des mouvements de soldes et soldes à date ---
+    def get_mouvements_agent(self, agent_id, limit=None):
+        return self.db.get_mouvements_agent(agent_id, limit)
+
+    def get_solde_a_date(self, agent_id, jour):
+        return self.db.get_solde_a_date(agent_id, jour)
+
+    def get_soldes_annuels_a_date(self, agent_id, jour):
+        return self.db.get_soldes_annuels_a_date(agent_id, jour)
+
+    def iter_soldes_a_date(self, jour):
+        return self.db.iter_soldes_a_date(jour)
+
+    def snapshot_soldes_si_necessaire(self, aujourdhui=None):
+        """
+        Prend un instantané des soldes si le dernier date de plus de
+        `conges.snapshot_soldes_jours` jours (0 : pas d'instantané périodique).
+        Retourne True si un instantané a été pris.
+        """
+        intervalle = int(CONFIG['conges'].get('snapshot_soldes_jours', 30))
+        if intervalle <= 0:
+            return False
+        aujourdhui = aujourdhui or date.today()
+        dernier = self.db.get_dernier_snapshot()
+        if dernier is not None and (aujourdhui - dernier).days < intervalle:
+            return False
+        nb_agents = self.db.prendre_snapshot_soldes(aujourdhui)
+        logging.info(f"Instantané des soldes pris pour {nb_agents} agent(s).")
+        return True
+
     def get_conge_by_id(self, conge_id):
         return self.db.get_conge_by_id(conge_id)
 
@@ -105,73 +193,300 @@ class CongeManager:
     def get_sick_leaves_by_status(self, status, search_term=None):
         return self.db.get_sick_leaves_by_status(status, search_term)
 
-    def get_holidays_set_for_period(self, start_year, end_year):
-        return get_holidays_set_for_period(self.db, start_year, end_year)
+    def get_holidays_set_for_period(self, start_year, end_year, calendrier=None):
+        code = get_calendar_code(calendrier)
+        # Le cache est partagé par le processus : la base fait partie de la clé
+        key = (self.db.get_db_path(), code, start_year, end_year)
+        return self.holiday_cache.get_holidays(key, lambda: get_holidays_set_for_period(self.db, start_year, end_year, code))
+
+    def get_business_calendar(self, start_year, end_year, calendrier=None):
+        """
+        Retourne le calendrier des jours ouvrés (compilé une seule fois et mis en cache)
+        couvrant la période demandée, pour le calendrier régional indiqué.
+        """
+        code = get_calendar_code(calendrier)
+        key = (self.db.get_db_path(), code, start_year, end_year)
+        # get_holidays_set_for_period charge aussi l'année end_year + 1
+        return self.holiday_cache.get_calendar(
+            key, lambda: BusinessCalendar(self.get_holidays_set_for_period(start_year, end_year, calendrier), start_year, end_year + 1))
+
+    def get_calendriers(self):
+        """Noms des calendriers régionaux configurés."""
+        return list(get_calendriers().keys())
+
+    def get_holidays_details_for_year(self, year, calendrier=None):
+        """Jours fériés officiels et personnalisés de l'année : liste de (date, nom, type)."""
+        country_code = get_calendar_code(calendrier)
+        ensure_official_holidays(self.db, country_code, year, year)
+        return self.db.get_holidays_details_between(country_code, f"{year:04d}-01-01", f"{year:04d}-12-31")
+
+    def precalculer_jours_feries_officiels(self):
+        """
+        Matérialise en base les jours fériés officiels de chaque calendrier sur la plage
+        d'années configurée autour de l'exercice (conges.jours_feries_officiels).
+        """
+        plage = CONFIG['conges'].get('jours_feries_officiels', {})
+        annee_exercice = self.get_annee_exercice()
+        annee_debut = annee_exercice - int(plage.get('annees_avant', 5))
+        annee_fin = annee_exercice + int(plage.get('annees_apres', 5))
+        codes = {get_calendar_code()} | set(get_calendriers().values())
+        for code in sorted(codes):
+            ensure_official_holidays(self.db, code, annee_debut, annee_fin)
+
+    def apres_restauration(self):
+        """
+        Remet le gestionnaire en phase avec une base restaurée à chaud : migrations
+        manquantes de la sauvegarde, caches du processus et jours fériés précalculés.
+        La file des congés à vérifier est en base : c'est celle de la sauvegarde.
+        """
+        self.db.run_migrations()
+        self.holiday_cache.invalidate()
+        self.precalculer_jours_feries_officiels()
+        self.snapshot_soldes_si_necessaire()
+
+    def get_holiday_cache_stats(self):
+        return self.holiday_cache.stats()
+
+    def get_query_stats(self):
+        return QUERY_STATS.stats()
+
+    def get_requetes_lentes(self):
+        return QUERY_STATS.requetes_lentes()
+
+    def get_instrumentation(self):
+        return QUERY_STATS.actif()
+
+    def set_instrumentation(self, actif):
+        """Active ou coupe la mesure des requêtes pour la session en cours."""
+        QUERY_STATS.enabled = bool(actif)
+
+    def reset_query_stats(self):
+        QUERY_STATS.reset()
 
     def get_agents_on_leave_today(self):
         return self.db.get_agents_on_leave_today()
 
     def add_holiday(self, date_sql, name, h_type):
-        return self.db.add_holiday(date_sql, name, h_type)
+        added = self.db.add_holiday(date_sql, name, h_type)
+        if added:
+            self.holiday_cache.invalidate()
+            self.analyser_impact_jours_feries([date_sql])
+        return added
 
     def delete_holiday(self, date_sql):
-        return self.db.delete_holiday(date_sql)
+        deleted = self.db.delete_holiday(date_sql)
+        self.holiday_cache.invalidate()
+        self.analyser_impact_jours_feries([date_sql])
+        return deleted
 
     def add_or_update_holiday(self, date_sql, name, h_type):
-        return self.db.add_or_update_holiday(date_sql, name, h_type)
+        updated = self.db.add_or_update_holiday(date_sql, name, h_type)
+        self.holiday_cache.invalidate()
+        self.analyser_impact_jours_feries([date_sql])
+        return updated
+
+    def importer_jours_feries(self, rows, h_type="Personnalisé"):
+        """
+        Import en masse de jours fériés personnalisés (date_sql, nom) : insertion groupée
+        en une transaction, une seule invalidation du cache puis une seule analyse
+        d'impact sur les congés couvrant les dates ajoutées.
+        Retourne (nombre de dates ajoutées, nombre de dates ignorées, incohérences).
+        """
+        ajoutees = self.db.add_holidays_bulk(rows, h_type)
+        if not ajoutees:
+            return 0, len(rows), []
+        self.holiday_cache.invalidate()
+
+        # Une seule requête sur la plage couverte, puis filtrage des congés contenant une date ajoutée
+        jours = sorted(validate_date(d) for d in ajoutees)
+        leaves = []
+        for conge, calendrier in self.db.get_active_annual_leaves_between(jours[0], jours[-1]):
+            i = bisect_left(jours, conge.date_debut)
+            if i < len(jours) and jours[i] <= conge.date_fin:
+                leaves.append((conge, calendrier))
+        inconsistencies = self._verifier_conges(leaves)
+        logging.info(f"Import de jours fériés : {len(ajoutees)} ajouté(s), {len(rows) - len(ajoutees)} ignoré(s).")
+        return len(ajoutees), len(rows) - len(ajoutees), inconsistencies
+
+    def analyser_impact_jours_feries(self, dates_sql):
+        """
+        Analyse incrémentale après une modification de jours fériés : seuls les congés
+        annuels actifs contenant l'une des dates sont recalculés (recherche indexée).
+        La file des congés à vérifier (en base) est mise à jour et les incohérences trouvées sont retournées.
+        """
+        leaves = {}
+        for date_sql in dates_sql:
+            jour = validate_date(date_sql)
+            if jour:
+                for conge, calendrier in self.db.get_active_annual_leaves_covering(jour):
+                    leaves[conge.id] = (conge, calendrier)
+        return self._verifier_conges(leaves.values())
+
+    def _recalculer_conges(self, leaves_with_calendar):
+        """
+        Recalcule les congés donnés (couples (conge, calendrier)), sans rien écrire.
+        Retourne (incohérences [(conge, jours recalculés)], identifiants des congés cohérents).
+        """
+        leaves_by_calendar = {}
+        for conge, calendrier in leaves_with_calendar:
+            leaves_by_calendar.setdefault(calendrier, []).append(conge)
+
+        inconsistencies, coherents = [], []
+        for calendrier, leaves in leaves_by_calendar.items():
+            calendar = self.get_business_calendar(min(c.date_debut.year for c in leaves), max(c.date_fin.year for c in leaves), calendrier)
+            recalculated = jours_ouvres_batch([c.date_debut for c in leaves], [c.date_fin for c in leaves], calendar)
+            for conge, recalculated_days in zip(leaves, recalculated):
+                if conge.jours_pris != recalculated_days:
+                    inconsistencies.append((conge, recalculated_days))
+                else:
+                    coherents.append(conge.id)
+        return inconsistencies, coherents
+
+    def _verifier_conges(self, leaves_with_calendar):
+        """Recalcule les congés donnés (couples (conge, calendrier)) et met à jour la file de vérification."""
+        inconsistencies, coherents = self._recalculer_conges(leaves_with_calendar)
+        with self.db.transaction():
+            self.db.ajouter_conges_a_verifier([(conge.id, jours) for conge, jours in inconsistencies])
+            self.db.retirer_conges_a_verifier(coherents)
+
+        if inconsistencies:
+            logging.info(f"{len(inconsistencies)} congé(s) annuel(s) impacté(s) par la modification des jours fériés.")
+        return inconsistencies
+
+    def preparer_corrections(self, inconsistencies):
+        """
+        Aperçu de la correction en masse, sans écriture : regroupe les congés incohérents
+        par agent et calcule l'écart de jours et le solde actif avant / après correction.
+        Les congés sont relus et recalculés : un congé modifié ou supprimé depuis la
+        détection n'est pas corrigé à tort. Un agent dont le solde deviendrait négatif
+        est signalé ('solde_insuffisant') : ses congés ne seront pas corrigés.
+        Retourne une liste de dictionnaires triée par nom d'agent, à transmettre
+        telle quelle à appliquer_corrections après confirmation.
+        """
+        conge_ids = {conge.id for conge, _ in inconsistencies}
+        inconsistencies, _ = self._recalculer_conges(self.db.get_active_annual_leaves_by_ids(conge_ids))
+
+        par_agent = {}
+        for conge, recalculated_days in inconsistencies:
+            par_agent.setdefault(conge.agent_id, []).append((conge, recalculated_days))
+
+        apercu = []
+        for agent_id, corrections in par_agent.items():
+            agent = self.get_agent_by_id(agent_id)
+            if not agent:
+                continue
+            delta = sum(jours - conge.jours_pris for conge, jours in corrections)
+            solde_avant = agent.get_solde_total_actif()
+            apercu.append({
+                'agent': agent,
+                'corrections': corrections,
+                'delta': delta,
+                'solde_avant': solde_avant,
+                'solde_apres': solde_avant - delta,
+                'solde_insuffisant': delta > 0 and solde_avant - delta < 0,
+            })
+        return sorted(apercu, key=lambda item: (item['agent'].nom, item['agent'].prenom))
+
+    @staticmethod
+    def _empreinte_corrections(corrections):
+        """Ce que l'utilisateur a confirmé pour chaque congé : {conge_id: (agent, dates, jours pris, jours recalculés)}."""
+        return {conge.id: (conge.agent_id, conge.date_debut, conge.date_fin, conge.jours_pris, jours) for conge, jours in corrections}
+
+    def appliquer_corrections(self, apercu):
+        """
+        Applique, en une seule transaction, les corrections d'un aperçu confirmé
+        (preparer_corrections) : jours_pris des congés (mise à jour groupée) puis écart net
+        de chaque agent appliqué à ses soldes en une requête ensembliste. Les agents au
+        solde insuffisant sont laissés de côté : leurs congés restent dans la file de
+        vérification. Les congés sont relus et recalculés dans la transaction : si l'un
+        d'eux a changé depuis l'aperçu, rien n'est écrit et ValueError est levée.
+        Retourne le nombre de congés corrigés.
+        """
+        ecartes = [item for item in apercu if item['solde_insuffisant']]
+        apercu = [item for item in apercu if not item['solde_insuffisant']]
+        if ecartes:
+            logging.warning(f"Correction en masse : {len(ecartes)} agent(s) au solde insuffisant non corrigé(s).")
+        if not apercu:
+            return 0
+
+        confirmees = self._empreinte_corrections([c for item in apercu for c in item['corrections']])
+        solde_max = float(CONFIG['conges'].get('solde_annuel_par_defaut', 22.0))
+        try:
+            with self.db.motif_mouvement("Correction après modification des jours fériés"):
+                actuelles, _ = self._recalculer_conges(self.db.get_active_annual_leaves_by_ids(confirmees))
+                if self._empreinte_corrections(actuelles) != confirmees:
+                    raise ValueError("Des congés ont été modifiés depuis l'aperçu. Relancez la correction pour vérifier les nouveaux écarts.")
+                self.db.update_conges_jours_pris([(conge_id, valeurs[-1]) for conge_id, valeurs in confirmees.items()])
+                self.db.appliquer_ecarts_soldes([(item['agent'].id, item['delta']) for item in apercu], solde_max)
+                self.db.retirer_conges_a_verifier(confirmees)
+        except (ValueError, sqlite3.Error) as e:
+            logging.error(f"Échec de la correction en masse des congés : {e}", exc_info=True)
+            raise e
+
+        logging.info(f"Correction en masse : {len(confirmees)} congé(s) corrigé(s) pour {len(apercu)} agent(s).")
+        return len(confirmees)
+
+    def get_conges_a_verifier(self):
+        """Congés en attente de vérification après des modifications de jours fériés : liste de (conge, jours recalculés)."""
+        return self.db.get_conges_a_verifier()
 
     # --- Logique de gestion des soldes ---
-    def _debiter_solde(self, agent_id, jours_a_prendre):
+    @staticmethod
+    def _motif_conge(operation, type_conge, date_debut, date_fin):
+        """Motif inscrit au registre des soldes pour le débit ou le crédit d'un congé."""
+        return f"{operation} : {type_conge} du {date_debut:%d/%m/%Y} au {date_fin:%d/%m/%Y}"
+
+    def _debiter_solde(self, agent_id, jours_a_prendre, motif="Débit de congé"):
         if jours_a_prendre <= 0:
             return
-            
-        agent = self.get_agent_by_id(agent_id)
-        if agent.get_solde_total_actif() < jours_a_prendre:
-            raise ValueError(f"Solde total insuffisant ({agent.get_solde_total_actif()}j) pour décompter {jours_a_prendre}j.")
+        with self.db.motif_mouvement(motif):
+            agent = self.get_agent_by_id(agent_id)
+            if agent.get_solde_total_actif() < jours_a_prendre:
+                raise ValueError(f"Solde total insuffisant ({agent.get_solde_total_actif()}j) pour décompter {jours_a_prendre}j.")
         
-        soldes_actifs = sorted([s for s in agent.soldes_annuels if s.statut == SoldeStatus.ACTIF], key=lambda s: s.annee)
+            soldes_actifs = sorted([s for s in agent.soldes_annuels if s.statut == SoldeStatus.ACTIF], key=lambda s: s.annee)
         
-        jours_restants_a_debiter = float(jours_a_prendre)
-        for solde_annuel in soldes_actifs:
-            if jours_restants_a_debiter < 0.001:
-                break
+            jours_restants_a_debiter = float(jours_a_prendre)
+            for solde_annuel in soldes_actifs:
+                if jours_restants_a_debiter < 0.001:
+                    break
             
-            jours_pris_sur_ce_solde = min(float(solde_annuel.solde), jours_restants_a_debiter)
+                jours_pris_sur_ce_solde = min(float(solde_annuel.solde), jours_restants_a_debiter)
             
-            if jours_pris_sur_ce_solde > 0:
-                nouveau_solde = solde_annuel.solde - jours_pris_sur_ce_solde
-                self.db.update_solde_by_id(solde_annuel.id, nouveau_solde)
-                jours_restants_a_debiter -= jours_pris_sur_ce_solde
+                if jours_pris_sur_ce_solde > 0:
+                    nouveau_solde = solde_annuel.solde - jours_pris_sur_ce_solde
+                    self.db.update_solde_by_id(solde_annuel.id, nouveau_solde)
+                    jours_restants_a_debiter -= jours_pris_sur_ce_solde
             
-        if jours_restants_a_debiter > 0.001:
-            raise sqlite3.Error("Incohérence de solde détectée lors du débit.")
+            if jours_restants_a_debiter > 0.001:
+                raise sqlite3.Error("Incohérence de solde détectée lors du débit.")
 
-    def _crediter_solde(self, agent_id, jours_a_rendre):
+    def _crediter_solde(self, agent_id, jours_a_rendre, motif="Crédit de congé"):
         if jours_a_rendre <= 0:
             return
-            
-        agent = self.get_agent_by_id(agent_id)
+        with self.db.motif_mouvement(motif):
+            agent = self.get_agent_by_id(agent_id)
         
-        soldes_actifs = sorted([s for s in agent.soldes_annuels if s.statut == SoldeStatus.ACTIF], key=lambda s: s.annee, reverse=True)
+            soldes_actifs = sorted([s for s in agent.soldes_annuels if s.statut == SoldeStatus.ACTIF], key=lambda s: s.annee, reverse=True)
         
-        jours_restants_a_rendre = float(jours_a_rendre)
-        for solde_annuel in soldes_actifs:
-            if jours_restants_a_rendre < 0.001:
-                break
+            jours_restants_a_rendre = float(jours_a_rendre)
+            for solde_annuel in soldes_actifs:
+                if jours_restants_a_rendre < 0.001:
+                    break
             
-            solde_max_annee = float(CONFIG['conges'].get('solde_annuel_par_defaut', 22.0))
-            jours_pouvant_etre_rendus = solde_max_annee - solde_annuel.solde
-            jours_a_ajouter = min(jours_restants_a_rendre, jours_pouvant_etre_rendus)
+                solde_max_annee = float(CONFIG['conges'].get('solde_annuel_par_defaut', 22.0))
+                jours_pouvant_etre_rendus = solde_max_annee - solde_annuel.solde
+                jours_a_ajouter = min(jours_restants_a_rendre, jours_pouvant_etre_rendus)
             
-            if jours_a_ajouter > 0:
-                nouveau_solde = solde_annuel.solde + jours_a_ajouter
-                self.db.update_solde_by_id(solde_annuel.id, nouveau_solde)
-                jours_restants_a_rendre -= jours_a_ajouter
+                if jours_a_ajouter > 0:
+                    nouveau_solde = solde_annuel.solde + jours_a_ajouter
+                    self.db.update_solde_by_id(solde_annuel.id, nouveau_solde)
+                    jours_restants_a_rendre -= jours_a_ajouter
 
-        if jours_restants_a_rendre > 0.001 and soldes_actifs:
-            solde_le_plus_recent = soldes_actifs[0]
-            solde_final = solde_le_plus_recent.solde + jours_restants_a_rendre
-            self.db.update_solde_by_id(solde_le_plus_recent.id, solde_final)
+            if jours_restants_a_rendre > 0.001 and soldes_actifs:
+                solde_le_plus_recent = soldes_actifs[0]
+                solde_final = solde_le_plus_recent.solde + jours_restants_a_rendre
+                self.db.update_solde_by_id(solde_le_plus_recent.id, solde_final)
 
     def get_deduction_details(self, agent_id, jours_a_prendre):
         if jours_a_prendre <= 0:
@@ -201,27 +516,33 @@ class CongeManager:
     # --- Logique de gestion des agents et congés ---
     def save_agent(self, agent_data, is_modification=False):
         if is_modification:
-            return self.db.modifier_agent(agent_data['id'], agent_data['nom'], agent_data['prenom'], agent_data['ppr'], agent_data['grade'])
+            with self.db.transaction():
+                success = self.db.modifier_agent(agent_data['id'], agent_data['nom'], agent_data['prenom'], agent_data['ppr'], agent_data['grade'])
+                # Le calendrier n'est modifié que s'il est fourni (l'import Excel ne le gère pas)
+                if success and 'calendrier' in agent_data:
+                    self.db.set_agent_calendrier(agent_data['id'], agent_data['calendrier'])
+            return success
         else:
             try:
-                agent_id = self.db.ajouter_agent(agent_data['nom'], agent_data['prenom'], agent_data['ppr'], agent_data['grade'])
-                if not agent_id:
-                    raise sqlite3.IntegrityError("Le PPR est probablement déjà utilisé.")
-                
-                soldes_initiaux = agent_data.get('soldes', {})
-                if not soldes_initiaux:
-                    annee_exercice = self.get_annee_exercice()
-                    solde_defaut = float(CONFIG['conges'].get('solde_annuel_par_defaut', 22.0))
-                    if solde_defaut > 0:
-                         soldes_initiaux[annee_exercice] = solde_defaut
-                
-                for annee, solde_val in soldes_initiaux.items():
-                    if solde_val > 0:
-                        self.db.execute_query("INSERT INTO soldes_annuels (agent_id, annee, solde, statut) VALUES (?, ?, ?, ?)", 
-                                              (agent_id, annee, solde_val, SoldeStatus.ACTIF))
+                with self.db.transaction():
+                    agent_id = self.db.ajouter_agent(agent_data['nom'], agent_data['prenom'], agent_data['ppr'], agent_data['grade'], agent_data.get('calendrier'))
+                    if not agent_id:
+                        raise sqlite3.IntegrityError("Le PPR est probablement déjà utilisé.")
+
+                    soldes_initiaux = agent_data.get('soldes', {})
+                    if not soldes_initiaux:
+                        annee_exercice = self.get_annee_exercice()
+                        solde_defaut = float(CONFIG['conges'].get('solde_annuel_par_defaut', 22.0))
+                        if solde_defaut > 0:
+                             soldes_initiaux[annee_exercice] = solde_defaut
+
+                    for annee, solde_val in soldes_initiaux.items():
+                        if solde_val > 0:
+                            self.db.execute_query("INSERT INTO soldes_annuels (agent_id, annee, solde, statut) VALUES (?, ?, ?, ?)", 
+                                                  (agent_id, annee, solde_val, SoldeStatus.ACTIF))
                 return agent_id
             except sqlite3.Error as e:
-                logging.error(f"Échec de la sauvegarde de l'agent (transaction externe) : {e}")
+                logging.error(f"Échec de la sauvegarde de l'agent : {e}")
                 raise e
 
     def delete_agent(self, agent_id):
@@ -247,79 +568,72 @@ class CongeManager:
                 else:
                     return False
 
-            self.db.conn.execute('BEGIN TRANSACTION')
             agent_id = form_data['agent_id']
             jours_pris = form_data['jours_pris']
             type_conge = form_data['type_conge']
-            
-            if is_modification:
-                old_conge = self.get_conge_by_id(form_data['conge_id'])
-                if old_conge and old_conge.type_conge in CONFIG['conges']['types_decompte_solde']:
-                    self._crediter_solde(old_conge.agent_id, old_conge.jours_pris)
-                self.db.supprimer_conge(form_data['conge_id'])
 
-            if type_conge in CONFIG['conges']['types_decompte_solde']:
-                self._debiter_solde(agent_id, jours_pris)
+            with self.db.transaction():
+                if is_modification:
+                    old_conge = self.get_conge_by_id(form_data['conge_id'])
+                    if old_conge and old_conge.type_conge in CONFIG['conges']['types_decompte_solde']:
+                        self._crediter_solde(old_conge.agent_id, old_conge.jours_pris,
+                                             self._motif_conge("Modification", old_conge.type_conge, old_conge.date_debut, old_conge.date_fin))
+                    self.db.supprimer_conge(form_data['conge_id'])
+
+                if type_conge in CONFIG['conges']['types_decompte_solde']:
+                    self._debiter_solde(agent_id, jours_pris, self._motif_conge("Débit", type_conge, start_date, end_date))
 
-            conge_model = Conge(id=None, agent_id=agent_id, type_conge=type_conge, justif=form_data.get('justif'), interim_id=form_data.get('interim_id'), date_debut=start_date.strftime('%Y-%m-%d'), date_fin=end_date.strftime('%Y-%m-%d'), jours_pris=jours_pris)
-            new_conge_id = self.db.ajouter_conge(conge_model)
-            self.db.conn.commit()
+                conge_model = Conge(id=None, agent_id=agent_id, type_conge=type_conge, justif=form_data.get('justif'), interim_id=form_data.get('interim_id'), date_debut=start_date.strftime('%Y-%m-%d'), date_fin=end_date.strftime('%Y-%m-%d'), jours_pris=jours_pris)
+                new_conge_id = self.db.ajouter_conge(conge_model)
 
             if new_conge_id and type_conge == "Congé de maladie": 
                 self._handle_certificat_save(form_data, new_conge_id)
             return True
 
         except (ValueError, sqlite3.Error) as e:
-            if self.db.conn.in_transaction:
-                self.db.conn.rollback()
             raise e
         except Exception as e:
-            if self.db.conn.in_transaction:
-                self.db.conn.rollback()
             logging.error(f"Erreur inattendue soumission congé: {e}", exc_info=True)
             raise e
 
     def _split_or_replace_leaves(self, annual_overlaps, form_data):
-        self.db.conn.execute('BEGIN TRANSACTION')
-        try:
-            new_start = validate_date(form_data['date_debut'])
-            new_end = validate_date(form_data['date_fin'])
-            agent_id = form_data['agent_id']
-            holidays_set = self.get_holidays_set_for_period(new_start.year - 1, new_end.year + 2)
+        new_start = validate_date(form_data['date_debut'])
+        new_end = validate_date(form_data['date_fin'])
+        agent_id = form_data['agent_id']
+        calendar = self.get_business_calendar(new_start.year - 1, new_end.year + 2, self.get_calendrier_agent(agent_id))
 
+        # Remplacement atomique : une seule validation pour toutes les écritures
+        with self.db.transaction():
             for conge in annual_overlaps:
-                self._crediter_solde(agent_id, conge.jours_pris)
+                self._crediter_solde(agent_id, conge.jours_pris,
+                                     self._motif_conge("Remplacement", conge.type_conge, conge.date_debut, conge.date_fin))
                 self.db.supprimer_conge(conge.id)
-            
+
             type_conge = form_data['type_conge']
             new_conge_model = Conge(id=None, agent_id=agent_id, type_conge=type_conge, justif=form_data.get('justif'), interim_id=form_data.get('interim_id'), date_debut=new_start.strftime('%Y-%m-%d'), date_fin=new_end.strftime('%Y-%m-%d'), jours_pris=form_data['jours_pris'])
-            
+
             if type_conge in CONFIG['conges']['types_decompte_solde']:
-                self._debiter_solde(agent_id, new_conge_model.jours_pris)
+                self._debiter_solde(agent_id, new_conge_model.jours_pris, self._motif_conge("Débit", type_conge, new_start, new_end))
             new_conge_id = self.db.ajouter_conge(new_conge_model)
 
             min_start_date = min(c.date_debut for c in annual_overlaps)
             max_end_date = max(c.date_fin for c in annual_overlaps)
 
             if min_start_date < new_start:
-                self._create_leave_segment(agent_id, min_start_date, new_start - timedelta(days=1), holidays_set)
+                self._create_leave_segment(agent_id, min_start_date, new_start - timedelta(days=1), calendar)
             if max_end_date > new_end:
-                self._create_leave_segment(agent_id, new_end + timedelta(days=1), max_end_date, holidays_set)
+                self._create_leave_segment(agent_id, new_end + timedelta(days=1), max_end_date, calendar)
 
-            self.db.conn.commit()
-            if new_conge_id and type_conge == "Congé de maladie": 
-                self._handle_certificat_save(form_data, new_conge_id)
-            return True
-        except (ValueError, sqlite3.Error) as e:
-            self.db.conn.rollback()
-            raise e
+        if new_conge_id and type_conge == "Congé de maladie": 
+            self._handle_certificat_save(form_data, new_conge_id)
+        return True
 
-    def _create_leave_segment(self, agent_id, start_date, end_date, holidays_set):
+    def _create_leave_segment(self, agent_id, start_date, end_date, calendar):
         if start_date > end_date:
             return
-        jours = jours_ouvres(start_date, end_date, holidays_set)
+        jours = jours_ouvres(start_date, end_date, calendar)
         if jours > 0:
-            self._debiter_solde(agent_id, jours)
+            self._debiter_solde(agent_id, jours, self._motif_conge("Débit", 'Congé annuel', start_date, end_date))
             segment = Conge(None, agent_id, 'Congé annuel', None, None, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'), jours)
             self.db.ajouter_conge(segment)
 
@@ -328,17 +642,13 @@ class CongeManager:
         if not conge: 
             raise ValueError("Congé introuvable.")
         
-        self.db.conn.execute('BEGIN TRANSACTION')
-        try:
+        with self.db.transaction():
             if conge.type_conge in CONFIG['conges']['types_decompte_solde']:
-                self._crediter_solde(conge.agent_id, conge.jours_pris)
-            
+                self._crediter_solde(conge.agent_id, conge.jours_pris,
+                                     self._motif_conge("Suppression", conge.type_conge, conge.date_debut, conge.date_fin))
+
             self.db.supprimer_conge(conge_id)
-            self.db.conn.commit()
-            return True
-        except (ValueError, sqlite3.Error) as e:
-            self.db.conn.rollback()
-            raise e
+        return True
             
     def _handle_certificat_save(self, form_data, conge_id):
         source_path = form_data.get('cert_path')
@@ -353,6 +663,7 @@ class CongeManager:
             
             destination_path = os.path.join(self.certificats_dir, safe_filename)
 
+            os.makedirs(self.certificats_dir, exist_ok=True)
             shutil.copy2(source_path, destination_path)
             self.db.add_certificat(conge_id, destination_path)
             logging.info(f"Certificat pour conge_id {conge_id} sauvegardé à {destination_path}")
@@ -363,19 +674,27 @@ class CongeManager:
                 "Le congé a été créé, mais une erreur est survenue lors de la sauvegarde du fichier justificatif.\n"
                 f"Veuillez le rattacher manuellement en modifiant le congé.\n\nErreur: {e}")
 
+    def get_calendrier_agent(self, agent_id):
+        """Nom du calendrier régional de l'agent (None pour le calendrier par défaut)."""
+        return self.db.get_agent_calendrier(agent_id)
+
     def find_inconsistent_annual_leaves(self, year):
         inconsistencies = []
-        holidays_set = self.get_holidays_set_for_period(year, year + 1)
-        
-        all_conges = self.get_all_conges()
-        annual_leaves_in_year = [
-            c for c in all_conges 
-            if c.type_conge == "Congé annuel" and c.date_debut.year == year and c.statut == 'Actif'
-        ]
-
-        for conge in annual_leaves_in_year:
-            recalculated_days = jours_ouvres(conge.date_debut, conge.date_fin, holidays_set)
-            if conge.jours_pris != recalculated_days:
-                inconsistencies.append((conge, recalculated_days))
+        calendriers_agents = self.db.get_agents_calendriers()
+        annual_leaves_in_year = self.db.iter_conges(type_conge="Congé annuel", statut='Actif', annee=year)
+
+        # Vérification par paquets : la mémoire utilisée ne dépend pas du nombre de congés
+        for paquet in iter(lambda: list(islice(annual_leaves_in_year, self.db.arraysize)), []):
+            # Un seul calendrier compilé par calendrier régional, quel que soit le nombre d'agents
+            leaves_by_calendar = {}
+            for conge in paquet:
+                leaves_by_calendar.setdefault(calendriers_agents.get(conge.agent_id), []).append(conge)
+
+            for calendrier, leaves in leaves_by_calendar.items():
+                calendar = self.get_business_calendar(year, year + 1, calendrier)
+                recalculated = jours_ouvres_batch([c.date_debut for c in leaves], [c.date_fin for c in leaves], calendar)
+                for conge, recalculated_days in zip(leaves, recalculated):
+                    if conge.jours_pris != recalculated_days:
+                        inconsistencies.append((conge, recalculated_days))
                 
-        return inconsistencies
\ No newline at end of file
+        return inconsistencies
@@ -6,7 +6,7 @@ from abc import ABC, abstractmethod
 from datetime import timedelta
 import os
 
-from utils.date_utils import jours_ouvres
+from utils.date_utils import jours_ouvres, ajouter_jours_ouvres
 from utils.config_loader import CONFIG
 
 class CongeStrategy(ABC):
@@ -59,19 +59,12 @@ class CongeStrategy(ABC):
 # --- Implémentations concrètes ---
 
 class CongeAnnuelStrategy(CongeStrategy):
-    """Stratégie pour les congés annuels, calculés en jours ouvrés."""
+    """
+    Stratégie pour les congés annuels, calculés en jours ouvrés.
+    `holidays_set` peut être un ensemble de dates ou un BusinessCalendar.
+    """
     def calculate_end_date(self, start_date, days_to_add, holidays_set):
-        if days_to_add <= 0:
-            return start_date
-            
-        temp_date = start_date
-        days_counted = 0
-        while days_counted < days_to_add:
-            if temp_date.weekday() < 5 and temp_date.date() not in holidays_set:
-                days_counted += 1
-            if days_counted < days_to_add:
-                temp_date += timedelta(days=1)
-        return temp_date
+        return ajouter_jours_ouvres(start_date, days_to_add, holidays_set)
 
     def calculate_days(self, start_date, end_date, holidays_set):
         return jours_ouvres(start_date, end_date, holidays_set)
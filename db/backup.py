@@ -0,0 +1,218 @@
+# Fichier : db/backup.py
+# Description : Sauvegarde et restauration à chaud de la base par l'API de
+# sauvegarde de SQLite. La copie se fait par lots de pages entrecoupés de courtes
+# pauses, depuis une connexion du pool : la copie est cohérente (jamais de fichier
+# à moitié écrit) et l'interface peut continuer à lire et écrire pendant la
+# sauvegarde. Le résultat peut être compressé (gzip) et n'apparaît qu'une fois
+# complet. La restauration recopie une sauvegarde vérifiée dans la base ouverte,
+# sans fermer les connexions ni redémarrer l'application.
+
+import gzip
+import os
+import shutil
+import sqlite3
+import re
+import logging
+from datetime import datetime
+
+from db.pool import get_pool
+from utils.config_loader import CONFIG
+
+EXTENSIONS_SAUVEGARDE = (".db", ".sqlite3", ".db.gz", ".sqlite3.gz")
+
+# Taille des blocs lus et écrits lors de la compression
+_BLOC_COMPRESSION = 1024 * 1024
+
+
+class _CopieRedemarree(Exception):
+    """Levée depuis le suivi de progression pour abandonner une copie relancée par SQLite."""
+
+
+def get_backup_config():
+    """Réglages de sauvegarde (section db.backup de la configuration)."""
+    config = CONFIG.get('db', {}).get('backup') or {}
+    return {
+        'pages_par_etape': int(config.get('pages_par_etape', 1000)),
+        'pause_ms': float(config.get('pause_ms', 5)),
+        'compresser': bool(config.get('compresser', True)),
+        'redemarrages_max': int(config.get('redemarrages_max', 3)),
+    }
+
+def chemin_sauvegarde(db_path, libelle=None, compresser=None):
+    """Chemin d'une nouvelle sauvegarde dans le dossier 'backups' voisin de la base."""
+    if compresser is None:
+        compresser = get_backup_config()['compresser']
+    backups_dir = os.path.join(os.path.dirname(db_path), "backups")
+    os.makedirs(backups_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    libelle = f"_{libelle}" if libelle else ""
+    nom = f"backup_{timestamp}{libelle}_{os.path.basename(db_path)}"
+    return os.path.join(backups_dir, nom + (".gz" if compresser else ""))
+
+def sauvegarder_base(db_path, destination, pages_par_etape=None, pause_ms=None, progression=None):
+    """
+    Copie la base `db_path` vers `destination` (compressée si le nom se termine par .gz).
+    Conçu pour être exécuté dans un thread.
+
+    `progression(etape, fait, total)` est appelée après chaque lot : etape vaut
+    'copie' (pages copiées) puis 'compression' (octets compressés).
+    Une écriture faite par une autre connexion pendant la copie oblige SQLite à la
+    reprendre au début ; après `redemarrages_max` reprises, la base est copiée en une
+    seule étape (une lecture cohérente qui, en WAL, ne bloque pas les écritures).
+    """
+    config = get_backup_config()
+    if pages_par_etape is None:
+        pages_par_etape = config['pages_par_etape']
+    if pause_ms is None:
+        pause_ms = config['pause_ms']
+    compresser = destination.endswith(".gz")
+    copie = (destination[:-3] if compresser else destination) + ".tmp"
+
+    pool = get_pool(db_path)
+    source = pool.checkout()
+    try:
+        redemarrages = 0
+        while True:
+            pages = pages_par_etape if redemarrages < config['redemarrages_max'] else -1
+            try:
+                _copier(source, copie, pages, pause_ms / 1000, progression)
+                break
+            except _CopieRedemarree:
+                redemarrages += 1
+                logging.info(f"Sauvegarde reprise après une écriture concurrente ({redemarrages}).")
+    except BaseException:
+        _supprimer(copie)
+        raise
+    finally:
+        pool.checkin(source)
+
+    try:
+        if compresser:
+            _compresser(copie, destination + ".tmp", progression)
+            _supprimer(copie)
+            os.replace(destination + ".tmp", destination)
+        else:
+            os.replace(copie, destination)
+    except BaseException:
+        _supprimer(copie)
+        _supprimer(destination + ".tmp")
+        raise
+    logging.info(f"Sauvegarde créée : {destination} ({os.path.getsize(destination)} octets).")
+    return destination
+
+def _copier(source, chemin, pages, pause, progression):
+    _supprimer(chemin)
+    cible = sqlite3.connect(chemin)
+    etat = {'reste': None}
+
+    def suivi(status, reste, total):
+        # Après une reprise, l'étape n'a pas fait baisser le nombre de pages restantes
+        if pages > 0 and status == sqlite3.SQLITE_OK and etat['reste'] is not None and reste >= etat['reste']:
+            raise _CopieRedemarree()
+        etat['reste'] = reste
+        if progression:
+            progression('copie', total - reste, total)
+
+    try:
+        source.backup(cible, pages=pages, progress=suivi, sleep=pause)
+    finally:
+        cible.close()
+
+def _compresser(chemin, destination, progression):
+    total = os.path.getsize(chemin)
+    fait = 0
+    with open(chemin, "rb") as entree, gzip.open(destination, "wb", compresslevel=6) as sortie:
+        while True:
+            bloc = entree.read(_BLOC_COMPRESSION)
+            if not bloc:
+                break
+            sortie.write(bloc)
+            fait += len(bloc)
+            if progression:
+                progression('compression', fait, total)
+
+def version_schema_application():
+    """Dernière version de schéma connue de l'application (migrations livrées)."""
+    dossier = os.path.join(os.path.dirname(__file__), 'migrations')
+    versions = [int(m.group(1)) for m in (re.match(r'(\d+)_.*\.sql', f) for f in os.listdir(dossier)) if m]
+    return max(versions, default=0)
+
+def verifier_sauvegarde(chemin):
+    """
+    Vérifie qu'un fichier (décompressé) est une base intègre dont le schéma n'est pas
+    plus récent que l'application. Retourne sa version de schéma ; lève ValueError sinon.
+    """
+    try:
+        conn = sqlite3.connect(f"file:{chemin}?mode=ro", uri=True)
+    except sqlite3.Error as e:
+        raise ValueError(f"Fichier de sauvegarde illisible : {e}")
+    try:
+        resultat = conn.execute("PRAGMA integrity_check(1)").fetchone()[0]
+        if resultat != "ok":
+            raise ValueError(f"La sauvegarde est corrompue : {resultat}")
+        version = conn.execute("SELECT MAX(version) FROM db_version").fetchone()[0] or 0
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"Le fichier n'est pas une sauvegarde valide : {e}")
+    finally:
+        conn.close()
+    if version > version_schema_application():
+        raise ValueError(f"La sauvegarde provient d'une version plus récente de l'application (schéma {version}).")
+    return version
+
+def restaurer_base(db_path, chemin, pages_par_etape=None, progression=None):
+    """
+    Restaure la sauvegarde `chemin` dans la base ouverte `db_path`, par l'API de
+    sauvegarde vers une connexion du pool : les autres connexions restent ouvertes et
+    voient la base restaurée à leur lecture suivante. Conçu pour être exécuté dans un thread.
+
+    `progression(etape, fait, total)` : 'decompression' (octets) puis 'restauration' (pages).
+    Retourne la version de schéma de la sauvegarde (les migrations manquantes sont à
+    appliquer ensuite par l'appelant).
+    """
+    if pages_par_etape is None:
+        pages_par_etape = get_backup_config()['pages_par_etape']
+    fichier, temporaire = chemin, None
+    if chemin.endswith(".gz"):
+        fichier = temporaire = db_path + ".restauration.tmp"
+        decompresser_sauvegarde(chemin, temporaire, progression)
+    try:
+        version = verifier_sauvegarde(fichier)
+        source = sqlite3.connect(f"file:{fichier}?mode=ro", uri=True)
+        pool = get_pool(db_path)
+        cible = pool.checkout()
+        try:
+            def suivi(status, reste, total):
+                if progression:
+                    progression('restauration', total - reste, total)
+            # Sans pause : le verrou d'écriture de la base est tenu jusqu'à la fin de la copie
+            source.backup(cible, pages=pages_par_etape, progress=suivi)
+        finally:
+            pool.checkin(cible)
+            source.close()
+    finally:
+        if temporaire:
+            _supprimer(temporaire)
+    logging.info(f"Base restaurée à chaud depuis {chemin} (schéma {version}).")
+    return version
+
+def decompresser_sauvegarde(chemin, destination, progression=None):
+    """Copie une sauvegarde vers `destination`, en la décompressant si nécessaire."""
+    if not chemin.endswith(".gz"):
+        shutil.copyfile(chemin, destination)
+        return
+    total = os.path.getsize(chemin)
+    with open(chemin, "rb") as brut, gzip.open(brut, "rb") as entree, open(destination, "wb") as sortie:
+        while True:
+            bloc = entree.read(_BLOC_COMPRESSION)
+            if not bloc:
+                break
+            sortie.write(bloc)
+            if progression:
+                # Avancement mesuré sur le fichier compressé lu
+                progression('decompression', brut.tell(), total)
+
+def _supprimer(chemin):
+    try:
+        os.remove(chemin)
+    except FileNotFoundError:
+        pass
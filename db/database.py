@@ -9,45 +9,136 @@ from tkinter import messagebox
 import logging
 import os
 import re
-from datetime import datetime
+import time
+from contextlib import contextmanager
+from datetime import datetime, date
 
-from db.models import Agent, Conge, SoldeAnnuel
+from db.models import Agent, AgentRow, Conge, ResumeSoldes, SoldeAnnuel
 from core.constants import SoldeStatus
+from utils.date_utils import jour_julien
+from db.pool import get_pool
+from db.instrumentation import QUERY_STATS
+from utils.config_loader import CONFIG
 
 class DatabaseManager:
     def __init__(self, db_file):
         self.db_file = db_file
         self.conn = None
+        self.pool = get_pool(db_file)
+        # Nombre de lignes lues à chaque fetchmany par les itérateurs (iter_agents, iter_conges)
+        self.arraysize = int(CONFIG.get('db', {}).get('arraysize', 500))
+
+    @property
+    def _tx_depth(self):
+        """Profondeur des portées transaction() ouvertes sur la connexion (0 : validation après chaque écriture)."""
+        return self.pool.get_tx_depth()
+
+    @_tx_depth.setter
+    def _tx_depth(self, depth):
+        self.pool.set_tx_depth(depth)
 
     def connect(self):
         try:
-            self.conn = sqlite3.connect(self.db_file, detect_types=sqlite3.PARSE_DECLTYPES)
-            self.conn.execute("PRAGMA foreign_keys = ON")
+            self.conn = self.pool.checkout()
             return True
-        except sqlite3.Error as e:
+        except (sqlite3.Error, ValueError) as e:
             messagebox.showerror("Erreur Base de Données", f"Impossible de se connecter : {e}")
             return False
 
     def close(self):
+        """Rend la connexion au pool : elle reste ouverte pour la tâche suivante."""
         if self.conn:
-            self.conn.close()
+            self.pool.checkin(self.conn)
+            self.conn = None
+
+    def close_all_connections(self):
+        """Rend la connexion et ferme toutes celles du pool (avant remplacement du fichier de base)."""
+        self.close()
+        self.pool.close_all()
+
+    def checkpoint(self):
+        """Reporte le journal WAL dans le fichier principal (avant une copie du fichier de base)."""
+        if self.conn:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Portée transactionnelle : les écritures du bloc ne sont validées qu'à la sortie
+        de la portée la plus externe (une seule écriture disque), et tout est annulé en
+        cas d'exception. Les portées imbriquées sont des SAVEPOINT : seule la portée
+        interne est annulée si l'appelant intercepte l'exception.
+        """
+        if not self.conn:
+            raise sqlite3.Error("Pas de connexion à la base de données.")
+        self._tx_depth += 1
+        savepoint = f"sp_{self._tx_depth}"
+        externe = self._tx_depth == 1
+        try:
+            # IMMEDIATE : le verrou d'écriture est pris d'emblée (pas d'échec tardif en WAL)
+            self.conn.execute("BEGIN IMMEDIATE" if externe else f"SAVEPOINT {savepoint}")
+            try:
+                yield self
+            except BaseException:
+                if externe:
+                    self.conn.rollback()
+                else:
+                    self.conn.execute(f"ROLLBACK TO {savepoint}")
+                    self.conn.execute(f"RELEASE {savepoint}")
+                raise
+            if externe:
+                debut = time.perf_counter()
+                self.conn.commit()
+                if QUERY_STATS.actif():
+                    QUERY_STATS.enregistrer("COMMIT", time.perf_counter() - debut)
+            else:
+                self.conn.execute(f"RELEASE {savepoint}")
+        finally:
+            self._tx_depth -= 1
 
     def execute_query(self, query, params=(), fetch=None):
         if not self.conn:
             raise sqlite3.Error("Pas de connexion à la base de données.")
+        debut = time.perf_counter()
         try:
             cursor = self.conn.cursor()
             cursor.execute(query, params)
             if fetch == "one":
-                return cursor.fetchone()
-            if fetch == "all":
-                return cursor.fetchall()
-            self.conn.commit()
-            return cursor.lastrowid
+                result = cursor.fetchone()
+            elif fetch == "all":
+                result = cursor.fetchall()
+            else:
+                # Dans une portée transaction(), la validation se fait à la sortie de la portée
+                if not self._tx_depth:
+                    self.conn.commit()
+                result = cursor.lastrowid
         except sqlite3.Error as e:
-            self.conn.rollback()
+            if not self._tx_depth:
+                self.conn.rollback()
             logging.error(f"Erreur SQL: {query} avec params {params} -> {e}", exc_info=True)
             raise e
+        if QUERY_STATS.actif():
+            QUERY_STATS.enregistrer(query, time.perf_counter() - debut, self.conn, params)
+        return result
+
+    def execute_many(self, query, seq_of_params):
+        """Exécute une requête d'écriture pour chaque jeu de paramètres (executemany)."""
+        if not self.conn:
+            raise sqlite3.Error("Pas de connexion à la base de données.")
+        debut = time.perf_counter()
+        try:
+            cursor = self.conn.cursor()
+            cursor.executemany(query, seq_of_params)
+            if not self._tx_depth:
+                self.conn.commit()
+        except sqlite3.Error as e:
+            if not self._tx_depth:
+                self.conn.rollback()
+            logging.error(f"Erreur SQL (executemany): {query} -> {e}", exc_info=True)
+            raise e
+        if QUERY_STATS.actif():
+            QUERY_STATS.enregistrer(query, time.perf_counter() - debut)
+        return cursor.rowcount
 
     def _handle_data_migration_from_legacy(self):
         cursor = self.conn.cursor()
@@ -57,27 +148,23 @@ class DatabaseManager:
             if 'solde' in columns or '_solde_legacy' in columns:
                 legacy_col_name = 'solde' if 'solde' in columns else '_solde_legacy'
                 logging.info(f"Ancienne colonne '{legacy_col_name}' détectée. Lancement de la migration des données...")
-                self.conn.execute('BEGIN TRANSACTION')
-                
-                cursor.execute(f"SELECT id, {legacy_col_name} FROM agents WHERE {legacy_col_name} IS NOT NULL AND {legacy_col_name} > 0")
-                legacy_data = cursor.fetchall()
-
-                annee_actuelle = self.get_annee_exercice()
-                for agent_id, solde_val in legacy_data:
-                    cursor.execute("INSERT INTO soldes_annuels (agent_id, annee, solde, statut) VALUES (?, ?, ?, ?)",
-                                   (agent_id, annee_actuelle, solde_val, str(SoldeStatus.ACTIF)))
-
-                cursor.execute("CREATE TABLE agents_new (id INTEGER PRIMARY KEY, nom TEXT NOT NULL, prenom TEXT, ppr TEXT UNIQUE NOT NULL, grade TEXT NOT NULL)")
-                cursor.execute("INSERT INTO agents_new (id, nom, prenom, ppr, grade) SELECT id, nom, prenom, ppr, grade FROM agents")
-                cursor.execute("DROP TABLE agents")
-                cursor.execute("ALTER TABLE agents_new RENAME TO agents")
-                
-                cursor.execute("REPLACE INTO db_version (version) VALUES (2)")
-                self.conn.commit()
+                with self.transaction():
+                    cursor.execute(f"SELECT id, {legacy_col_name} FROM agents WHERE {legacy_col_name} IS NOT NULL AND {legacy_col_name} > 0")
+                    legacy_data = cursor.fetchall()
+
+                    annee_actuelle = self.get_annee_exercice()
+                    for agent_id, solde_val in legacy_data:
+                        cursor.execute("INSERT INTO soldes_annuels (agent_id, annee, solde, statut) VALUES (?, ?, ?, ?)",
+                                       (agent_id, annee_actuelle, solde_val, str(SoldeStatus.ACTIF)))
+
+                    # DROP COLUMN conserve les colonnes, index et triggers ajoutés par les migrations SQL
+                    cursor.execute(f"ALTER TABLE agents DROP COLUMN {legacy_col_name}")
+
+                    # Version 2 réservée à cette migration des données : aucun script SQL ne porte ce numéro
+                    cursor.execute("REPLACE INTO db_version (version) VALUES (2)")
                 logging.info("Migration des données de solde terminée avec succès.")
                 messagebox.showinfo("Mise à jour", "Les données de l'application ont été mises à jour vers la nouvelle version.")
         except sqlite3.Error as e:
-            self.conn.rollback()
             logging.error(f"Échec de la migration des données : {e}", exc_info=True)
             raise e
 
@@ -85,8 +172,8 @@ class DatabaseManager:
         self.execute_query("CREATE TABLE IF NOT EXISTS db_version (version INTEGER PRIMARY KEY)")
         self.execute_query("CREATE TABLE IF NOT EXISTS system_config (config_key TEXT PRIMARY KEY NOT NULL, config_value TEXT NOT NULL)")
 
-        current_version_row = self.execute_query("SELECT version FROM db_version", fetch="one")
-        current_version = current_version_row[0] if current_version_row else 0
+        current_version_row = self.execute_query("SELECT MAX(version) FROM db_version", fetch="one")
+        current_version = current_version_row[0] if current_version_row and current_version_row[0] else 0
         
         migrations_path = os.path.join(os.path.dirname(__file__), 'migrations')
         if os.path.exists(migrations_path):
@@ -123,6 +210,31 @@ class DatabaseManager:
     def set_annee_exercice(self, annee):
         self.execute_query("REPLACE INTO system_config (config_key, config_value) VALUES ('annee_exercice', ?)", (str(annee),))
 
+    def get_agent_ids(self):
+        """Identifiants de tous les agents, par ordre croissant."""
+        return [r[0] for r in self.execute_query("SELECT id FROM agents ORDER BY id", fetch="all")]
+
+    def creer_soldes_annee(self, annee, solde, statut, id_debut=None, id_fin=None):
+        """
+        Crée en une requête le solde de l'année pour chaque agent (ou pour les agents dont
+        l'identifiant est dans [id_debut, id_fin]). Un solde déjà existant est conservé.
+        """
+        q = "INSERT OR IGNORE INTO soldes_annuels (agent_id, annee, solde, statut) SELECT id, ?, ?, ? FROM agents"
+        p = [annee, solde, str(statut)]
+        if id_debut is not None:
+            q += " WHERE id BETWEEN ? AND ?"
+            p.extend([id_debut, id_fin])
+        return self.execute_query(q, tuple(p))
+
+    def expirer_soldes_annee(self, annee, id_debut=None, id_fin=None):
+        """Passe en une requête les soldes de l'année au statut expiré (éventuellement pour une tranche d'agents)."""
+        q = "UPDATE soldes_annuels SET statut = ? WHERE annee = ? AND statut != ?"
+        p = [str(SoldeStatus.EXPIRE), annee, str(SoldeStatus.EXPIRE)]
+        if id_debut is not None:
+            q += " AND agent_id BETWEEN ? AND ?"
+            p.extend([id_debut, id_fin])
+        return self.execute_query(q, tuple(p))
+
     def get_soldes_by_status(self, statut):
         query = "SELECT s.id, a.nom, a.prenom, s.annee, s.solde FROM soldes_annuels s JOIN agents a ON s.agent_id = a.id WHERE s.statut = ? AND s.solde > 0 ORDER BY a.nom, s.annee"
         return self.execute_query(query, (str(statut),), fetch="all")
@@ -134,46 +246,315 @@ class DatabaseManager:
         query = f"UPDATE soldes_annuels SET solde = 0 WHERE id IN ({placeholders})"
         self.execute_query(query, solde_ids)
     
+    def create_solde_annuel(self, agent_id, annee, solde, statut):
+        return self.execute_query("INSERT INTO soldes_annuels (agent_id, annee, solde, statut) VALUES (?, ?, ?, ?)", (agent_id, annee, solde, str(statut)))
+
     def update_solde_by_id(self, solde_id, new_value):
         self.execute_query("UPDATE soldes_annuels SET solde = ? WHERE id = ?", (new_value, solde_id))
 
-    def get_agents(self, term=None, limit=None, offset=None, exclude_id=None):
-        q = "SELECT id, nom, prenom, ppr, grade FROM agents"
+    def appliquer_ecarts_soldes(self, ecarts, solde_max):
+        """
+        Applique en une requête un écart de jours au solde actif de plusieurs agents :
+        `ecarts` est une liste de (agent_id, jours), positif pour un débit, négatif pour un crédit.
+        Le débit consomme les soldes de l'année la plus ancienne à la plus récente ; le crédit
+        remplit les soldes de la plus récente à la plus ancienne jusqu'à `solde_max`, le
+        reliquat allant au solde le plus récent. Lève ValueError (sans rien écrire) si le solde
+        actif d'un agent ne couvre pas son débit.
+        """
+        ecarts = [(agent_id, jours) for agent_id, jours in ecarts if jours]
+        if not ecarts:
+            return
+        with self.transaction():
+            self.execute_query("CREATE TEMP TABLE IF NOT EXISTS ecarts_soldes (agent_id INTEGER PRIMARY KEY, jours REAL NOT NULL)")
+            self.execute_query("DELETE FROM temp.ecarts_soldes")
+            self.execute_many("INSERT INTO temp.ecarts_soldes (agent_id, jours) VALUES (?, ?)", ecarts)
+            insuffisants = self.execute_query("""
+                SELECT e.agent_id FROM temp.ecarts_soldes e
+                WHERE e.jours > 0 AND e.jours > (SELECT COALESCE(SUM(s.solde), 0) FROM soldes_annuels s WHERE s.agent_id = e.agent_id AND s.statut = ?)
+            """, (str(SoldeStatus.ACTIF),), fetch="all")
+            if insuffisants:
+                raise ValueError(f"Solde total insuffisant pour {len(insuffisants)} agent(s) (id {', '.join(str(r[0]) for r in insuffisants)}).")
+
+            self.execute_query("""
+                WITH actifs AS (
+                    SELECT s.id, s.solde, e.jours,
+                           -- Jours déjà débités sur les années plus anciennes
+                           SUM(MAX(s.solde, 0)) OVER (PARTITION BY s.agent_id ORDER BY s.annee ROWS UNBOUNDED PRECEDING) - MAX(s.solde, 0) AS debite_avant,
+                           -- Jours déjà rendus sur les années plus récentes
+                           SUM(MAX(:max - s.solde, 0)) OVER (PARTITION BY s.agent_id ORDER BY s.annee DESC ROWS UNBOUNDED PRECEDING) - MAX(:max - s.solde, 0) AS rendu_avant,
+                           SUM(MAX(:max - s.solde, 0)) OVER (PARTITION BY s.agent_id) AS rendu_max,
+                           ROW_NUMBER() OVER (PARTITION BY s.agent_id ORDER BY s.annee DESC) AS rang
+                    FROM soldes_annuels s
+                    JOIN temp.ecarts_soldes e ON e.agent_id = s.agent_id
+                    WHERE s.statut = :actif
+                ),
+                variations AS (
+                    SELECT id, CASE
+                        WHEN jours > 0 THEN -MIN(MAX(solde, 0), MAX(jours - debite_avant, 0))
+                        ELSE MIN(MAX(:max - solde, 0), MAX(-jours - rendu_avant, 0))
+                             + CASE WHEN rang = 1 THEN MAX(-jours - rendu_max, 0) ELSE 0 END
+                    END AS variation
+                    FROM actifs
+                )
+                UPDATE soldes_annuels SET solde = solde + v.variation
+                FROM variations v
+                WHERE soldes_annuels.id = v.id AND v.variation != 0
+            """, {'max': float(solde_max), 'actif': str(SoldeStatus.ACTIF)})
+            self.execute_query("DELETE FROM temp.ecarts_soldes")
+
+    # --- Registre des mouvements de soldes ---
+    @contextmanager
+    def motif_mouvement(self, motif):
+        """
+        Portée transactionnelle dont les écritures sur soldes_annuels sont inscrites au
+        registre avec ce motif (débit, crédit, clôture...). Le motif précédent est
+        rétabli à la sortie : une portée imbriquée n'altère que ses propres mouvements.
+        """
+        with self.transaction():
+            precedent = self.execute_query("SELECT motif FROM mouvements_contexte WHERE id = 1", fetch="one")[0]
+            self.execute_query("UPDATE mouvements_contexte SET motif = ? WHERE id = 1", (motif,))
+            try:
+                yield self
+            finally:
+                self.execute_query("UPDATE mouvements_contexte SET motif = ? WHERE id = 1", (precedent,))
+
+    def get_mouvements_agent(self, agent_id, limit=None):
+        """Mouvements de soldes d'un agent, du plus récent au plus ancien."""
+        q = ("SELECT id, annee, horodatage, delta, delta_actif, solde_apres, statut_apres, motif "
+             "FROM mouvements_soldes WHERE agent_id = ? ORDER BY id DESC")
+        p = [agent_id]
+        if limit:
+            q += " LIMIT ?"
+            p.append(limit)
+        return self.execute_query(q, tuple(p), fetch="all")
+
+    def prendre_snapshot_soldes(self, jour=None):
+        """
+        Instantané du solde actif total de tous les agents (lu sur agents_soldes_resume,
+        en une requête), arrêté au dernier mouvement du registre. Retourne le nombre d'agents.
+        """
+        jour = jour_julien(jour or date.today())
+        return self.execute_query(
+            "INSERT OR REPLACE INTO snapshots_soldes (agent_id, jour, mouvement_id, solde_total) "
+            "SELECT r.agent_id, ?, (SELECT COALESCE(MAX(id), 0) FROM mouvements_soldes), r.solde_total "
+            "FROM agents_soldes_resume r", (jour,))
+
+    def get_dernier_snapshot(self):
+        """Date du dernier instantané des soldes (None s'il n'y en a aucun)."""
+        result = self.execute_query("SELECT date(MAX(jour) + 0.5) FROM snapshots_soldes", fetch="one")
+        if not result or result[0] is None:
+            return None
+        return datetime.strptime(result[0], "%Y-%m-%d").date()
+
+    # Solde au dernier instantané antérieur ou égal au jour, plus les mouvements qui le suivent jusqu'à ce jour
+    _SOLDE_A_DATE = (
+        "COALESCE(s.solde_total, 0) + COALESCE((SELECT SUM(m.delta_actif) FROM mouvements_soldes m "
+        "WHERE m.agent_id = a.id AND m.id > COALESCE(s.mouvement_id, 0) AND m.jour <= :jour), 0)"
+    )
+    _SNAPSHOT_A_DATE = (
+        "LEFT JOIN snapshots_soldes s ON s.agent_id = a.id AND s.jour = "
+        "(SELECT MAX(jour) FROM snapshots_soldes WHERE agent_id = a.id AND jour <= :jour)"
+    )
+
+    def get_solde_a_date(self, agent_id, jour):
+        """Solde actif total d'un agent à la fin du jour donné."""
+        result = self.execute_query(
+            f"SELECT {self._SOLDE_A_DATE} FROM agents a {self._SNAPSHOT_A_DATE} WHERE a.id = :agent_id",
+            {'jour': jour_julien(jour), 'agent_id': agent_id}, fetch="one")
+        return result[0] if result else None
+
+    def iter_soldes_a_date(self, jour, arraysize=None):
+        """Solde actif total de chaque agent à la fin du jour donné : (id, nom, prenom, ppr, grade, solde)."""
+        for rows in self._iter_rows(
+                f"SELECT a.id, a.nom, a.prenom, a.ppr, a.grade, {self._SOLDE_A_DATE} FROM agents a "
+                f"{self._SNAPSHOT_A_DATE} ORDER BY a.nom, a.prenom, a.id",
+                {'jour': jour_julien(jour)}, arraysize):
+            yield from rows
+
+    def get_soldes_annuels_a_date(self, agent_id, jour):
+        """Détail par année des soldes d'un agent à la fin du jour donné : [(annee, solde, statut)]."""
+        return self.execute_query(
+            "SELECT annee, solde_apres, statut_apres FROM mouvements_soldes WHERE id IN "
+            "(SELECT MAX(id) FROM mouvements_soldes WHERE agent_id = ? AND jour <= ? GROUP BY solde_id) "
+            "AND statut_apres != 'Supprimé' ORDER BY annee", (agent_id, jour_julien(jour)), fetch="all")
+
+    @staticmethod
+    def _search_condition(term):
+        """
+        Condition de recherche d'agents : chaque mot saisi doit être le début d'un mot
+        du nom, du prénom ou du PPR (index plein texte agents_fts, sans accents ni casse).
+        Retourne (clause SQL, paramètres).
+        """
+        mots = re.findall(r"[^\W_]+", term)
+        if not mots:
+            # Saisie sans lettre ni chiffre : recherche littérale
+            t = f"%{term.lower()}%"
+            return "(LOWER(nom) LIKE ? OR LOWER(prenom) LIKE ? OR LOWER(ppr) LIKE ?)", [t, t, t]
+        requete_fts = " ".join(f'"{mot}"*' for mot in mots)
+        return "id IN (SELECT rowid FROM agents_fts WHERE agents_fts MATCH ?)", [requete_fts]
+
+    # Tris possibles côté SQL sur les soldes (colonnes de agents_soldes_resume) ; par défaut, tri par nom
+    TRIS_SOLDE = ('solde_total', 'solde_n', 'solde_n1', 'solde_n2')
+
+    def get_agents(self, term=None, limit=None, offset=None, exclude_id=None, after=None, tri=None, descendant=False, solde_min=None):
+        return self._query_agents(term, limit, offset, exclude_id, after, tri=tri, descendant=descendant, solde_min=solde_min)[0]
+
+    def get_agents_page(self, term=None, limit=50, after=None, tri=None, descendant=False, solde_min=None):
+        """
+        Page d'agents en pagination par clé (keyset) : `after` est la clé du dernier agent
+        de la page précédente, None pour la première page. Le coût ne dépend pas du numéro de page.
+        `tri` (une des colonnes TRIS_SOLDE, ou None pour le nom) et `solde_min` (solde total
+        actif minimal) portent sur tous les agents, pas seulement sur la page affichée.
+        Retourne (agents, total des agents correspondant à la recherche, clé de la page suivante) ;
+        le total est calculé dans la même requête. Les agents portent leur résumé de soldes
+        (resume_soldes) mais pas le détail des soldes annuels.
+        """
+        return self._query_agents(term, limit, None, None, after, with_total=True, tri=tri, descendant=descendant,
+                                  solde_min=solde_min, avec_soldes=False)
+
+    def _query_agents(self, term=None, limit=None, offset=None, exclude_id=None, after=None, with_total=False,
+                      tri=None, descendant=False, solde_min=None, avec_soldes=True):
         p, c = [], []
         if term:
-            t = f"%{term.lower()}%"
-            c.append("(LOWER(nom) LIKE ? OR LOWER(prenom) LIKE ? OR LOWER(ppr) LIKE ?)")
-            p.extend([t, t, t])
+            clause, params = self._search_condition(term)
+            c.append(clause)
+            p.extend(params)
+        if solde_min is not None:
+            c.append("r.solde_total >= ?")
+            p.append(solde_min)
         if exclude_id is not None:
-            c.append("id != ?")
+            c.append("a.id != ?")
             p.append(exclude_id)
+        sens, comparaison = ("DESC", "<") if descendant else ("ASC", ">")
+        if tri in self.TRIS_SOLDE:
+            # r.agent_id (et non a.id) : le tri est alors entièrement servi par l'index du résumé
+            cle = (f"r.{tri}", "r.agent_id")
+            position_cle = (6 + self.TRIS_SOLDE.index(tri), 0)
+        else:
+            cle = ("a.nom", "a.prenom", "a.id")
+            position_cle = (1, 2, 0)
+        q = "SELECT a.id, a.nom, a.prenom, a.ppr, a.grade, a.calendrier, r.solde_total, r.solde_n, r.solde_n1, r.solde_n2"
+        if with_total:
+            # Total par fenêtre COUNT(*) OVER () dans la même requête. Il porte sur toute la recherche :
+            # les filtres restent dans la sous-requête, la condition de clé s'applique autour.
+            q += ", COUNT(*) OVER () FROM agents a JOIN agents_soldes_resume r ON r.agent_id = a.id"
+            if c:
+                q += " WHERE " + " AND ".join(c)
+            # Sous-requête parcourue dans l'ordre de l'index de tri
+            q += " ORDER BY " + ", ".join(f"{colonne} {sens}" for colonne in cle)
+            q, c = f"SELECT * FROM ({q})", []
+            cle = tuple(("id" if colonne == "r.agent_id" else colonne.split(".")[1]) for colonne in cle)
+        else:
+            q += " FROM agents a JOIN agents_soldes_resume r ON r.agent_id = a.id"
+        if after is not None:
+            c.append(f"({', '.join(cle)}) {comparaison} ({', '.join('?' for _ in cle)})")
+            p.extend(after)
         if c:
             q += " WHERE " + " AND ".join(c)
-        q += " ORDER BY nom, prenom"
+        q += " ORDER BY " + ", ".join(f"{colonne} {sens}" for colonne in cle)
         if limit is not None:
-            q += " LIMIT ? OFFSET ?"
-            p.extend([limit, offset])
-            
+            q += " LIMIT ?"
+            p.append(limit)
+            if offset:
+                q += " OFFSET ?"
+                p.append(offset)
+
         agents_rows = self.execute_query(q, tuple(p), fetch="all")
         if not agents_rows:
-            return []
+            # Page vide : aucune ligne ne porte le total, et aucune autre requête n'est émise
+            return [], 0, None
+        total = agents_rows[0][10] if with_total else len(agents_rows)
+        dernier = agents_rows[-1]
+        cle_suivante = tuple(dernier[i] for i in position_cle)
             
-        agents = [Agent.from_db_row(row) for row in agents_rows]
-        agent_ids = [agent.id for agent in agents]
-        soldes_query = f"SELECT id, agent_id, annee, solde, statut FROM soldes_annuels WHERE agent_id IN ({','.join('?' for _ in agent_ids)})"
-        all_soldes_rows = self.execute_query(soldes_query, agent_ids, fetch="all")
+        agents = []
+        for row in agents_rows:
+            agent = Agent.from_db_row(row)
+            agent.resume_soldes = ResumeSoldes._make(row[6:10])
+            agents.append(agent)
+        if avec_soldes:
+            self._attacher_soldes(agents)
+        return agents, total, cle_suivante
+
+    def _attacher_soldes(self, agents):
+        """Charge les soldes des agents par lots (une requête IN par tranche de 500 agents)."""
         soldes_map = {}
-        for row in all_soldes_rows:
-            solde_obj = SoldeAnnuel.from_db_row(row)
-            if solde_obj.agent_id not in soldes_map:
-                soldes_map[solde_obj.agent_id] = []
-            soldes_map[solde_obj.agent_id].append(solde_obj)
+        agent_ids = [agent.id for agent in agents]
+        for i in range(0, len(agent_ids), 500):
+            chunk = agent_ids[i:i + 500]
+            soldes_query = f"SELECT id, agent_id, annee, solde, statut FROM soldes_annuels WHERE agent_id IN ({','.join('?' for _ in chunk)})"
+            for row in self.execute_query(soldes_query, chunk, fetch="all"):
+                soldes_map.setdefault(row[1], []).append(SoldeAnnuel.from_db_row(row))
         for agent in agents:
             agent.soldes_annuels = soldes_map.get(agent.id, [])
-        return agents
+
+    def _iter_rows(self, query, params=(), arraysize=None):
+        """
+        Parcourt le résultat d'une requête par paquets de `arraysize` lignes (fetchmany),
+        sans jamais charger tout le résultat en mémoire.
+        """
+        if not self.conn:
+            raise sqlite3.Error("Pas de connexion à la base de données.")
+        cursor = self.conn.cursor()
+        cursor.arraysize = arraysize or self.arraysize
+        # Seul le temps passé dans SQLite est mesuré, pas celui du code qui consomme les lignes
+        debut = time.perf_counter()
+        cursor.execute(query, params)
+        duree = time.perf_counter() - debut
+        try:
+            while True:
+                debut = time.perf_counter()
+                rows = cursor.fetchmany()
+                duree += time.perf_counter() - debut
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+        if QUERY_STATS.actif():
+            QUERY_STATS.enregistrer(query, duree, self.conn, params)
+
+    def iter_agents(self, term=None, arraysize=None):
+        """Itère sur les agents (triés par nom), soldes compris, un paquet de lignes à la fois."""
+        q, p = "SELECT id, nom, prenom, ppr, grade, calendrier FROM agents", []
+        if term:
+            clause, params = self._search_condition(term)
+            q += " WHERE " + clause
+            p.extend(params)
+        q += " ORDER BY nom, prenom, id"
+        for rows in self._iter_rows(q, tuple(p), arraysize):
+            agents = [Agent.from_db_row(row) for row in rows]
+            self._attacher_soldes(agents)
+            yield from agents
+
+    def get_agents_rows(self, exclude_id=None):
+        """Agents triés par nom, en lignes légères (AgentRow) sans soldes : pour les listes de sélection."""
+        q, p = "SELECT id, nom, prenom, ppr, grade FROM agents", ()
+        if exclude_id is not None:
+            q += " WHERE id != ?"
+            p = (exclude_id,)
+        q += " ORDER BY nom, prenom, id"
+        return [AgentRow._make(row) for row in self.execute_query(q, p, fetch="all")]
+
+    def get_agents_identites(self, agent_ids):
+        """Retourne {agent_id: (nom, prenom, ppr, calendrier)} pour les agents demandés."""
+        agent_ids = list(set(agent_ids))
+        result = {}
+        for i in range(0, len(agent_ids), 500):
+            chunk = agent_ids[i:i + 500]
+            q = f"SELECT id, nom, prenom, ppr, calendrier FROM agents WHERE id IN ({','.join('?' for _ in chunk)})"
+            for row in self.execute_query(q, chunk, fetch="all"):
+                result[row[0]] = row[1:]
+        return result
+
+    def get_longueurs_max(self, table, colonnes):
+        """Longueur maximale (en caractères) de chaque colonne, pour dimensionner un export."""
+        # Noms de table et de colonnes fournis par le code, jamais par l'utilisateur
+        q = "SELECT " + ", ".join(f"COALESCE(MAX(LENGTH({c})), 0)" for c in colonnes) + f" FROM {table}"
+        return dict(zip(colonnes, self.execute_query(q, fetch="one")))
 
     def get_agent_by_id(self, agent_id):
-        row = self.execute_query("SELECT id, nom, prenom, ppr, grade FROM agents WHERE id=?", (agent_id,), fetch="one")
+        row = self.execute_query("SELECT id, nom, prenom, ppr, grade, calendrier FROM agents WHERE id=?", (agent_id,), fetch="one")
         if not row:
             return None
         agent = Agent.from_db_row(row)
@@ -181,20 +562,38 @@ class DatabaseManager:
         agent.soldes_annuels = [SoldeAnnuel.from_db_row(s_row) for s_row in soldes_rows]
         return agent
 
-    def get_agents_count(self, term=None):
-        q, p = "SELECT COUNT(*) FROM agents", []
+    def get_agents_count(self, term=None, solde_min=None):
+        q, p, c = "SELECT COUNT(*) FROM agents", [], []
         if term:
-            t = f"%{term.lower()}%"
-            q += " WHERE LOWER(nom) LIKE ? OR LOWER(prenom) LIKE ? OR LOWER(ppr) LIKE ?"
-            p.extend([t, t, t])
+            clause, params = self._search_condition(term)
+            c.append(clause)
+            p.extend(params)
+        if solde_min is not None:
+            q += " JOIN agents_soldes_resume r ON r.agent_id = agents.id"
+            c.append("r.solde_total >= ?")
+            p.append(solde_min)
+        if c:
+            q += " WHERE " + " AND ".join(c)
         return self.execute_query(q, tuple(p), fetch="one")[0]
 
-    def ajouter_agent(self, nom, prenom, ppr, grade):
+    def ajouter_agent(self, nom, prenom, ppr, grade, calendrier=None):
         try:
-            return self.execute_query("INSERT INTO agents (nom, prenom, ppr, grade) VALUES (?, ?, ?, ?)", (nom.strip(), prenom.strip(), ppr.strip(), grade.strip()))
+            return self.execute_query("INSERT INTO agents (nom, prenom, ppr, grade, calendrier) VALUES (?, ?, ?, ?, ?)", (nom.strip(), prenom.strip(), ppr.strip(), grade.strip(), calendrier or None))
         except sqlite3.IntegrityError:
             return None
 
+    def set_agent_calendrier(self, agent_id, calendrier):
+        self.execute_query("UPDATE agents SET calendrier=? WHERE id=?", (calendrier or None, agent_id))
+
+    def get_agent_calendrier(self, agent_id):
+        row = self.execute_query("SELECT calendrier FROM agents WHERE id=?", (agent_id,), fetch="one")
+        return row[0] if row else None
+
+    def get_agents_calendriers(self):
+        """Retourne {agent_id: calendrier} pour les agents rattachés à un calendrier régional."""
+        rows = self.execute_query("SELECT id, calendrier FROM agents WHERE calendrier IS NOT NULL", fetch="all")
+        return {agent_id: calendrier for agent_id, calendrier in rows}
+
     def modifier_agent(self, agent_id, nom, prenom, ppr, grade):
         try:
             self.execute_query("UPDATE agents SET nom=?, prenom=?, ppr=?, grade=? WHERE id=?", (nom.strip(), prenom.strip(), ppr.strip(), grade.strip(), agent_id))
@@ -210,6 +609,10 @@ class DatabaseManager:
         return self.execute_query("INSERT INTO conges (agent_id, type_conge, justif, interim_id, date_debut, date_fin, jours_pris) VALUES (?, ?, ?, ?, ?, ?, ?)",
                        (conge_model.agent_id, conge_model.type_conge, conge_model.justif, conge_model.interim_id, conge_model.date_debut, conge_model.date_fin, conge_model.jours_pris))
 
+    def update_conges_jours_pris(self, updates):
+        """Met à jour jours_pris pour plusieurs congés : updates est une liste de (conge_id, jours_pris)."""
+        return self.execute_many("UPDATE conges SET jours_pris = ? WHERE id = ?", [(jours, conge_id) for conge_id, jours in updates])
+
     def supprimer_conge(self, conge_id):
         cert = self.execute_query("SELECT chemin_fichier FROM certificats_medicaux WHERE conge_id = ?", (conge_id,), fetch="one")
         if cert and cert[0] and os.path.exists(cert[0]):
@@ -221,28 +624,181 @@ class DatabaseManager:
         return True
 
     def get_conges(self, agent_id=None):
-        q, p = "SELECT id, agent_id, type_conge, justif, interim_id, date_debut, date_fin, jours_pris, statut FROM conges", ()
+        return list(self.iter_conges(agent_id=agent_id))
+
+    def iter_conges(self, agent_id=None, type_conge=None, statut=None, annee=None, arraysize=None):
+        """
+        Itère sur les congés (du plus récent au plus ancien) en parcourant le curseur par
+        paquets de `arraysize` lignes. Filtres optionnels : agent, type, statut, année de début.
+        """
+        q, p, c = "SELECT id, agent_id, type_conge, justif, interim_id, date_debut, date_fin, jours_pris, statut FROM conges", [], []
         if agent_id:
-            q += " WHERE agent_id=? ORDER BY date_debut DESC"
-            p = (agent_id,)
-        else:
-            q += " ORDER BY date_debut DESC"
-        return [Conge.from_db_row(r) for r in self.execute_query(q, p, fetch="all") if r]
+            c.append("agent_id=?")
+            p.append(agent_id)
+        if type_conge:
+            c.append("type_conge=?")
+            p.append(type_conge)
+        if statut:
+            c.append("statut=?")
+            p.append(statut)
+        if annee:
+            # Bornes en texte : valable que la date soit stockée avec ou sans heure
+            c.append("date_debut >= ? AND date_debut < ?")
+            p.extend([f"{int(annee):04d}-01-01", f"{int(annee) + 1:04d}-01-01"])
+        if c:
+            q += " WHERE " + " AND ".join(c)
+        q += " ORDER BY date_debut DESC"
+        for rows in self._iter_rows(q, tuple(p), arraysize):
+            yield from (Conge.from_db_row(r) for r in rows if r)
+
+    def get_jours_pris_par_annee(self, agent_id, type_conge="Congé annuel", statut="Actif"):
+        """Retourne {année: jours pris} pour un agent, lu dans les agrégats (conges_agregats)."""
+        rows = self.execute_query("SELECT annee, jours_pris FROM conges_agregats WHERE agent_id = ? AND type_conge = ? AND statut = ?",
+                                  (agent_id, type_conge, statut), fetch="all")
+        return dict(rows)
+
+    def get_agregats_agent(self, agent_id):
+        """Agrégats d'un agent : (annee, type_conge, statut, nb_conges, jours_pris), du plus récent au plus ancien."""
+        return self.execute_query("SELECT annee, type_conge, statut, nb_conges, jours_pris FROM conges_agregats WHERE agent_id = ? ORDER BY annee DESC, type_conge, statut",
+                                  (agent_id,), fetch="all")
+
+    def get_statistiques_annee(self, annee):
+        """Pour une année, par type et statut : (type_conge, statut, nb_agents, nb_conges, jours_pris)."""
+        return self.execute_query("""
+            SELECT type_conge, statut, COUNT(*), SUM(nb_conges), SUM(jours_pris)
+            FROM conges_agregats WHERE annee = ?
+            GROUP BY type_conge, statut ORDER BY type_conge, statut
+        """, (annee,), fetch="all")
+
+    def get_statistiques_par_grade(self, annee, type_conge="Congé annuel", statut="Actif"):
+        """Pour une année et un type de congé, par grade : (grade, nb_agents, nb_conges, jours_pris)."""
+        return self.execute_query("""
+            SELECT a.grade, COUNT(*), SUM(g.nb_conges), SUM(g.jours_pris)
+            FROM conges_agregats g JOIN agents a ON a.id = g.agent_id
+            WHERE g.annee = ? AND g.type_conge = ? AND g.statut = ?
+            GROUP BY a.grade ORDER BY a.grade
+        """, (annee, type_conge, statut), fetch="all")
 
     def get_conge_by_id(self, conge_id):
         r = self.execute_query("SELECT id, agent_id, type_conge, justif, interim_id, date_debut, date_fin, jours_pris, statut FROM conges WHERE id=?", (conge_id,), fetch="one")
         return Conge.from_db_row(r) if r else None
         
     def get_overlapping_leaves(self, agent_id, start_date, end_date, conge_id_exclu=None):
-        q = "SELECT * FROM conges WHERE agent_id=? AND date_fin >= ? AND date_debut <= ? AND statut = 'Actif'"
-        p = [agent_id, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')]
+        q = "SELECT id, agent_id, type_conge, justif, interim_id, date_debut, date_fin, jours_pris, statut FROM conges WHERE agent_id=? AND jour_fin >= ? AND jour_debut <= ? AND statut = 'Actif'"
+        p = [agent_id, jour_julien(start_date), jour_julien(end_date)]
         if conge_id_exclu:
             q += " AND id != ?"
             p.append(conge_id_exclu)
         return [Conge.from_db_row(r) for r in self.execute_query(q, tuple(p), fetch="all") if r]
 
+    def get_active_annual_leaves_covering(self, jour):
+        """
+        Congés annuels actifs dont l'intervalle contient la date donnée.
+        Retourne une liste de tuples (Conge, calendrier de l'agent).
+        """
+        q = """
+            SELECT c.id, c.agent_id, c.type_conge, c.justif, c.interim_id, c.date_debut, c.date_fin, c.jours_pris, c.statut, a.calendrier
+            FROM conges c
+            JOIN agents a ON c.agent_id = a.id
+            WHERE c.type_conge = 'Congé annuel' AND c.statut = 'Actif'
+              AND c.jour_fin >= ? AND c.jour_debut <= ?
+        """
+        jour_num = jour_julien(jour)
+        return [(Conge.from_db_row(r), r[9]) for r in self.execute_query(q, (jour_num, jour_num), fetch="all")]
+
+    def get_active_annual_leaves_between(self, jour_min, jour_max):
+        """Congés annuels actifs qui chevauchent l'intervalle [jour_min, jour_max] (dates) : liste de (Conge, calendrier)."""
+        q = """
+            SELECT c.id, c.agent_id, c.type_conge, c.justif, c.interim_id, c.date_debut, c.date_fin, c.jours_pris, c.statut, a.calendrier
+            FROM conges c
+            JOIN agents a ON c.agent_id = a.id
+            WHERE c.type_conge = 'Congé annuel' AND c.statut = 'Actif'
+              AND c.jour_fin >= ? AND c.jour_debut <= ?
+        """
+        return [(Conge.from_db_row(r), r[9]) for r in self.execute_query(q, (jour_julien(jour_min), jour_julien(jour_max)), fetch="all")]
+
+    def get_active_annual_leaves_by_ids(self, conge_ids):
+        """Congés annuels actifs parmi les identifiants donnés : liste de (Conge, calendrier de l'agent)."""
+        conge_ids = list(conge_ids)
+        result = []
+        # Découpage pour rester sous la limite de paramètres de SQLite
+        for i in range(0, len(conge_ids), 500):
+            chunk = conge_ids[i:i + 500]
+            q = f"""
+                SELECT c.id, c.agent_id, c.type_conge, c.justif, c.interim_id, c.date_debut, c.date_fin, c.jours_pris, c.statut, a.calendrier
+                FROM conges c
+                JOIN agents a ON c.agent_id = a.id
+                WHERE c.type_conge = 'Congé annuel' AND c.statut = 'Actif' AND c.id IN ({','.join('?' for _ in chunk)})
+            """
+            result.extend((Conge.from_db_row(r), r[9]) for r in self.execute_query(q, chunk, fetch="all"))
+        return result
+
+    def ajouter_conges_a_verifier(self, rows):
+        """Place des congés dans la file de vérification : rows est une liste de (conge_id, jours recalculés)."""
+        return self.execute_many("""
+            INSERT INTO conges_a_verifier (conge_id, jours_recalcules) VALUES (?, ?)
+            ON CONFLICT (conge_id) DO UPDATE SET jours_recalcules = excluded.jours_recalcules
+        """, rows)
+
+    def retirer_conges_a_verifier(self, conge_ids):
+        """Retire des congés de la file de vérification."""
+        return self.execute_many("DELETE FROM conges_a_verifier WHERE conge_id = ?", [(conge_id,) for conge_id in conge_ids])
+
+    def get_conges_a_verifier(self):
+        """
+        File de vérification : liste de (Conge, jours recalculés) triée par date de début.
+        Un congé annulé ou dont les jours ont été corrigés entre-temps n'est pas retourné.
+        """
+        q = """
+            SELECT c.id, c.agent_id, c.type_conge, c.justif, c.interim_id, c.date_debut, c.date_fin, c.jours_pris, c.statut, v.jours_recalcules
+            FROM conges_a_verifier v
+            JOIN conges c ON c.id = v.conge_id
+            WHERE c.type_conge = 'Congé annuel' AND c.statut = 'Actif' AND c.jours_pris != v.jours_recalcules
+            ORDER BY c.jour_debut, c.id
+        """
+        return [(Conge.from_db_row(r), r[9]) for r in self.execute_query(q, fetch="all")]
+
     def get_holidays_for_year(self, year):
-        return self.execute_query("SELECT date, nom, type FROM jours_feries_personnalises WHERE strftime('%Y', date) = ? ORDER BY date", (str(year),), fetch="all")
+        return self.execute_query("SELECT date, nom, type FROM jours_feries_personnalises WHERE date BETWEEN ? AND ? ORDER BY date", (f"{int(year):04d}-01-01", f"{int(year):04d}-12-31"), fetch="all")
+
+    def get_official_holidays_range(self, pays):
+        """Retourne la plage (annee_debut, annee_fin) précalculée pour le pays, ou None."""
+        return self.execute_query("SELECT annee_debut, annee_fin FROM jours_feries_officiels_plages WHERE pays = ?", (pays,), fetch="one")
+
+    def store_official_holidays(self, pays, annee_debut, annee_fin, rows):
+        """
+        Enregistre en une transaction les jours fériés officiels calculés et la plage couverte.
+        Sans plage (annee_debut None), seuls les jours sont enregistrés.
+        """
+        with self.transaction():
+            self.execute_many("INSERT OR REPLACE INTO jours_feries_officiels (pays, date, nom) VALUES (?, ?, ?)", rows)
+            if annee_debut is not None:
+                self.execute_query("REPLACE INTO jours_feries_officiels_plages (pays, annee_debut, annee_fin) VALUES (?, ?, ?)",
+                                   (pays, annee_debut, annee_fin))
+
+    def get_holiday_dates_between(self, pays, date_debut, date_fin):
+        """Dates (officielles et personnalisées) comprises entre deux dates SQL incluses."""
+        query = """
+            SELECT date FROM jours_feries_officiels WHERE pays = ? AND date BETWEEN ? AND ?
+            UNION
+            SELECT date FROM jours_feries_personnalises WHERE date BETWEEN ? AND ?
+        """
+        return self.execute_query(query, (pays, date_debut, date_fin, date_debut, date_fin), fetch="all")
+
+    def get_holidays_details_between(self, pays, date_debut, date_fin):
+        """
+        Détail (date, nom, type) des jours fériés entre deux dates SQL incluses.
+        Un jour personnalisé remplace le jour officiel de même date.
+        """
+        query = """
+            SELECT date, nom, 'Officiel' FROM jours_feries_officiels
+            WHERE pays = ? AND date BETWEEN ? AND ?
+              AND date NOT IN (SELECT date FROM jours_feries_personnalises WHERE date BETWEEN ? AND ?)
+            UNION ALL
+            SELECT date, nom, type FROM jours_feries_personnalises WHERE date BETWEEN ? AND ?
+            ORDER BY date
+        """
+        return self.execute_query(query, (pays, date_debut, date_fin, date_debut, date_fin, date_debut, date_fin), fetch="all")
         
     def get_certificat_for_conge(self, conge_id):
         return self.execute_query("SELECT * FROM certificats_medicaux WHERE conge_id = ?", (conge_id,), fetch="one")
@@ -266,6 +822,21 @@ class DatabaseManager:
         except sqlite3.IntegrityError:
             return False
 
+    def add_holidays_bulk(self, rows, h_type):
+        """
+        Insère en une transaction les jours fériés personnalisés (date_sql, nom).
+        Les dates déjà enregistrées sont ignorées. Retourne la liste des dates réellement ajoutées.
+        """
+        if not rows:
+            return []
+        dates = [date_sql for date_sql, _ in rows]
+        with self.transaction():
+            existantes = {r[0] for r in self.execute_query(
+                "SELECT date FROM jours_feries_personnalises WHERE date BETWEEN ? AND ?", (min(dates), max(dates)), fetch="all")}
+            self.execute_many("INSERT OR IGNORE INTO jours_feries_personnalises (date, nom, type) VALUES (?, ?, ?)",
+                              [(date_sql, nom, h_type) for date_sql, nom in rows])
+        return sorted(set(dates) - existantes)
+
     def delete_holiday(self, date_sql):
         self.execute_query("DELETE FROM jours_feries_personnalises WHERE date = ?", (date_sql,))
         return True
@@ -290,14 +861,15 @@ class DatabaseManager:
     
     def get_agents_on_leave_today(self):
         query = """
-            SELECT a.nom, a.prenom, a.ppr, c.type_conge, c.date_fin
+            SELECT a.nom, a.prenom, a.ppr, c.type_conge, c.date_fin, a.calendrier
             FROM conges c
             JOIN agents a ON c.agent_id = a.id
             WHERE c.statut = 'Actif'
-              AND date('now', 'localtime') BETWEEN date(c.date_debut) AND date(c.date_fin)
+              AND c.jour_fin >= ? AND c.jour_debut <= ?
             ORDER BY a.nom, a.prenom
         """
-        return self.execute_query(query, fetch="all")
+        today = jour_julien(date.today())
+        return self.execute_query(query, (today, today), fetch="all")
         
     def get_db_path(self):
         """Retourne le chemin complet vers le fichier de la base de données."""
@@ -0,0 +1,131 @@
+# Fichier : db/instrumentation.py
+# Description : Mesure optionnelle des requêtes SQL passant par DatabaseManager.
+# Pour chaque requête (forme normalisée) : nombre d'appels, durées cumulées et
+# percentiles, et code appelant (écran ou service) à l'origine des appels. Les
+# requêtes dépassant le seuil configuré sont journalisées avec leur plan d'exécution.
+
+import re
+import sys
+import os
+import sqlite3
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime
+
+from utils.config_loader import CONFIG
+
+_ESPACES = re.compile(r"\s+")
+_LISTE_IN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_DOSSIER_DB = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def normaliser_requete(sql):
+    """Forme canonique d'une requête : espaces réduits, listes IN (?, ?, ...) regroupées."""
+    return _LISTE_IN.sub("(?, ...)", _ESPACES.sub(" ", sql).strip())
+
+def _origine():
+    """Premier appelant hors de la couche db (fichier:fonction)."""
+    frame = sys._getframe(2)
+    while frame:
+        fichier = frame.f_code.co_filename
+        if not fichier.startswith(_DOSSIER_DB) and not fichier.endswith("contextlib.py"):
+            return f"{os.path.relpath(fichier, _RACINE)}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+def _percentile(valeurs_triees, p):
+    """Percentile par rang le plus proche sur une liste triée non vide."""
+    return valeurs_triees[min(len(valeurs_triees) - 1, round(p / 100 * (len(valeurs_triees) - 1)))]
+
+
+class QueryStats:
+    """
+    Statistiques des requêtes, partagées par toutes les connexions du processus.
+    Les percentiles portent sur les `echantillons` dernières exécutions de chaque requête.
+    """
+
+    def __init__(self, echantillons=1000, max_lentes=200):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._lentes = deque(maxlen=max_lentes)
+        self.echantillons = echantillons
+        # None : suit db.instrumentation.enabled ; True/False : forcé depuis l'administration
+        self.enabled = None
+
+    @staticmethod
+    def _config():
+        return CONFIG.get('db', {}).get('instrumentation') or {}
+
+    def actif(self):
+        if self.enabled is not None:
+            return self.enabled
+        return bool(self._config().get('enabled', False))
+
+    def seuil_ms(self):
+        return float(self._config().get('slow_query_ms', 100))
+
+    def enregistrer(self, sql, duree, conn=None, params=None):
+        """Enregistre une exécution ; journalise la requête si elle dépasse le seuil."""
+        requete = normaliser_requete(sql)
+        origine = _origine()
+        with self._lock:
+            stat = self._stats.get(requete)
+            if stat is None:
+                stat = self._stats[requete] = {'appels': 0, 'total': 0.0, 'max': 0.0,
+                                               'durees': deque(maxlen=self.echantillons), 'origines': Counter()}
+            stat['appels'] += 1
+            stat['total'] += duree
+            stat['max'] = max(stat['max'], duree)
+            stat['durees'].append(duree)
+            stat['origines'][origine] += 1
+
+        duree_ms = duree * 1000
+        if duree_ms < self.seuil_ms():
+            return
+        plan = None
+        if self._config().get('explain_slow', True) and conn is not None and params is not None \
+                and requete.split(" ", 1)[0].upper() in ("SELECT", "WITH"):
+            try:
+                plan = [ligne[3] for ligne in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            except sqlite3.Error as e:
+                plan = [f"Plan indisponible : {e}"]
+        logging.warning(f"Requête lente ({duree_ms:.0f} ms, {origine}) : {requete}" + (f" | plan : {' ; '.join(plan)}" if plan else ""))
+        with self._lock:
+            self._lentes.append({'heure': datetime.now(), 'duree_ms': duree_ms, 'requete': requete,
+                                 'params': repr(params)[:200], 'origine': origine, 'plan': plan})
+
+    def stats(self):
+        """Statistiques par requête, de la plus coûteuse (durée cumulée) à la moins coûteuse."""
+        with self._lock:
+            instantane = [(requete, dict(stat, durees=sorted(stat['durees']), origines=stat['origines'].most_common(3)))
+                          for requete, stat in self._stats.items()]
+        resultat = []
+        for requete, stat in instantane:
+            durees = stat['durees']
+            resultat.append({
+                'requete': requete,
+                'appels': stat['appels'],
+                'total_ms': stat['total'] * 1000,
+                'moyenne_ms': stat['total'] * 1000 / stat['appels'],
+                'p50_ms': _percentile(durees, 50) * 1000,
+                'p95_ms': _percentile(durees, 95) * 1000,
+                'p99_ms': _percentile(durees, 99) * 1000,
+                'max_ms': stat['max'] * 1000,
+                'origines': stat['origines'],
+            })
+        return sorted(resultat, key=lambda s: s['total_ms'], reverse=True)
+
+    def requetes_lentes(self):
+        """Journal des requêtes lentes, de la plus récente à la plus ancienne."""
+        with self._lock:
+            return list(reversed(self._lentes))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._lentes.clear()
+
+
+# Instance unique partagée par tous les DatabaseManager du processus
+QUERY_STATS = QueryStats()
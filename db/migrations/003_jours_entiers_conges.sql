@@ -0,0 +1,45 @@
+-- ##########################################################################
+-- ## Version 003 : Colonnes de jours entiers pour les dates des congés    ##
+-- ##########################################################################
+-- jour_debut / jour_fin contiennent le numéro de jour julien (entier) des
+-- colonnes texte date_debut / date_fin. Ils sont tenus à jour par des triggers
+-- et permettent des recherches par plage sans fonction sur les colonnes.
+
+BEGIN TRANSACTION;
+
+-- Normalisation des anciennes dates JJ/MM/AAAA ou JJ-MM-AAAA au format ISO
+UPDATE conges SET date_debut = substr(date_debut, 7, 4) || '-' || substr(date_debut, 4, 2) || '-' || substr(date_debut, 1, 2)
+WHERE date_debut GLOB '[0-9][0-9][/-][0-9][0-9][/-][0-9][0-9][0-9][0-9]*';
+
+UPDATE conges SET date_fin = substr(date_fin, 7, 4) || '-' || substr(date_fin, 4, 2) || '-' || substr(date_fin, 1, 2)
+WHERE date_fin GLOB '[0-9][0-9][/-][0-9][0-9][/-][0-9][0-9][0-9][0-9]*';
+
+ALTER TABLE conges ADD COLUMN jour_debut INTEGER;
+ALTER TABLE conges ADD COLUMN jour_fin INTEGER;
+
+UPDATE conges SET
+    jour_debut = CAST(julianday(date(date_debut)) AS INTEGER),
+    jour_fin = CAST(julianday(date(date_fin)) AS INTEGER);
+
+CREATE TRIGGER IF NOT EXISTS trg_conges_jours_insert AFTER INSERT ON conges
+BEGIN
+    UPDATE conges SET
+        jour_debut = CAST(julianday(date(NEW.date_debut)) AS INTEGER),
+        jour_fin = CAST(julianday(date(NEW.date_fin)) AS INTEGER)
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_conges_jours_update AFTER UPDATE OF date_debut, date_fin ON conges
+BEGIN
+    UPDATE conges SET
+        jour_debut = CAST(julianday(date(NEW.date_debut)) AS INTEGER),
+        jour_fin = CAST(julianday(date(NEW.date_fin)) AS INTEGER)
+    WHERE id = NEW.id;
+END;
+
+-- Congés en cours à une date donnée (tableau de bord) : peu de congés finissent après aujourd'hui
+CREATE INDEX IF NOT EXISTS idx_conges_jour_fin ON conges (jour_fin, jour_debut);
+-- Chevauchements pour un agent
+CREATE INDEX IF NOT EXISTS idx_conges_agent_jours ON conges (agent_id, jour_fin, jour_debut);
+
+COMMIT;
@@ -0,0 +1,11 @@
+-- ##########################################################################
+-- ## Version 004 : Calendrier régional des agents                         ##
+-- ##########################################################################
+-- Nom d'un calendrier défini dans config.yaml (conges.calendriers).
+-- NULL : calendrier par défaut (conges.holidays_country).
+
+BEGIN TRANSACTION;
+
+ALTER TABLE agents ADD COLUMN calendrier TEXT;
+
+COMMIT;
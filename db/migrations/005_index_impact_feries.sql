@@ -0,0 +1,11 @@
+-- ##########################################################################
+-- ## Version 005 : Index pour l'analyse d'impact des jours fériés         ##
+-- ##########################################################################
+-- Recherche des congés annuels actifs contenant une date donnée
+-- (type_conge = ? AND statut = ? AND jour_fin >= ? AND jour_debut <= ?).
+
+BEGIN TRANSACTION;
+
+CREATE INDEX IF NOT EXISTS idx_conges_type_statut_jours ON conges (type_conge, statut, jour_fin, jour_debut);
+
+COMMIT;
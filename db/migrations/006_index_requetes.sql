@@ -0,0 +1,49 @@
+-- ##########################################################################
+-- ## Version 006 : Index des requêtes courantes (congés, soldes, agents) ##
+-- ##########################################################################
+-- Chaque index correspond à une requête de db/database.py (voir
+-- tests/db/test_query_plans.py) : plus de parcours complet de la table
+-- conges ni de tri temporaire pour les listes les plus utilisées.
+
+BEGIN TRANSACTION;
+
+-- Liste des congés d'un agent (ORDER BY date_debut DESC) et liste globale
+CREATE INDEX IF NOT EXISTS idx_conges_agent_date_debut ON conges (agent_id, date_debut);
+CREATE INDEX IF NOT EXISTS idx_conges_date_debut ON conges (date_debut);
+
+-- Suivi des certificats : filtre type/statut puis tri par date de début
+CREATE INDEX IF NOT EXISTS idx_conges_type_statut_debut ON conges (type_conge, statut, date_debut);
+
+-- Tableau de bord (congés actifs à une date) : statut puis plage en jours entiers.
+-- Remplace idx_conges_jour_fin, qui n'est plus utilisé par aucune requête.
+CREATE INDEX IF NOT EXISTS idx_conges_statut_jours ON conges (statut, jour_fin, jour_debut);
+DROP INDEX IF EXISTS idx_conges_jour_fin;
+
+-- Chevauchements d'un agent (congés actifs) : égalité sur agent et statut, puis plage.
+-- Remplace idx_conges_agent_jours, moins sélectif.
+CREATE INDEX IF NOT EXISTS idx_conges_agent_statut_jours ON conges (agent_id, statut, jour_fin, jour_debut);
+DROP INDEX IF EXISTS idx_conges_agent_jours;
+
+-- Liste des agents triée par nom
+CREATE INDEX IF NOT EXISTS idx_agents_nom_prenom ON agents (nom, prenom);
+
+-- Agents ayant un calendrier régional (index partiel : la plupart n'en ont pas)
+CREATE INDEX IF NOT EXISTS idx_agents_calendrier ON agents (calendrier) WHERE calendrier IS NOT NULL;
+
+-- Un seul solde par agent et par année : les doublons éventuels sont fusionnés
+-- (somme des soldes sur la ligne la plus ancienne) avant la création de l'index unique.
+UPDATE soldes_annuels
+SET solde = (SELECT SUM(s2.solde) FROM soldes_annuels s2 WHERE s2.agent_id = soldes_annuels.agent_id AND s2.annee = soldes_annuels.annee)
+WHERE id IN (SELECT MIN(id) FROM soldes_annuels GROUP BY agent_id, annee HAVING COUNT(*) > 1);
+
+DELETE FROM soldes_annuels
+WHERE id NOT IN (SELECT MIN(id) FROM soldes_annuels GROUP BY agent_id, annee);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_soldes_agent_annee ON soldes_annuels (agent_id, annee);
+-- Préfixe de l'index unique : devenu redondant
+DROP INDEX IF EXISTS idx_soldes_agent_id;
+
+-- Soldes par statut (soldes expirés à apurer)
+CREATE INDEX IF NOT EXISTS idx_soldes_statut ON soldes_annuels (statut);
+
+COMMIT;
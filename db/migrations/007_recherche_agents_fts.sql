@@ -0,0 +1,35 @@
+-- ##########################################################################
+-- ## Version 007 : Index plein texte (FTS5) pour la recherche d'agents   ##
+-- ##########################################################################
+-- Index externe sur agents (nom, prénom, PPR) : insensible à la casse et aux
+-- accents ("Élodie" = "elodie"), interrogé par préfixe de mots. Il est tenu à
+-- jour par des déclencheurs sur la table agents.
+
+BEGIN TRANSACTION;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS agents_fts USING fts5(
+    nom, prenom, ppr,
+    content='agents', content_rowid='id',
+    tokenize="unicode61 remove_diacritics 2"
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_agents_fts_insert AFTER INSERT ON agents
+BEGIN
+    INSERT INTO agents_fts (rowid, nom, prenom, ppr) VALUES (NEW.id, NEW.nom, NEW.prenom, NEW.ppr);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_agents_fts_delete AFTER DELETE ON agents
+BEGIN
+    INSERT INTO agents_fts (agents_fts, rowid, nom, prenom, ppr) VALUES ('delete', OLD.id, OLD.nom, OLD.prenom, OLD.ppr);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_agents_fts_update AFTER UPDATE OF nom, prenom, ppr ON agents
+BEGIN
+    INSERT INTO agents_fts (agents_fts, rowid, nom, prenom, ppr) VALUES ('delete', OLD.id, OLD.nom, OLD.prenom, OLD.ppr);
+    INSERT INTO agents_fts (rowid, nom, prenom, ppr) VALUES (NEW.id, NEW.nom, NEW.prenom, NEW.ppr);
+END;
+
+-- Indexation des agents existants
+INSERT INTO agents_fts (agents_fts) VALUES ('rebuild');
+
+COMMIT;
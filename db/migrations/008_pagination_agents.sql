@@ -0,0 +1,11 @@
+-- ##########################################################################
+-- ## Version 008 : Prénoms non nuls pour la pagination par clé           ##
+-- ##########################################################################
+-- La liste des agents est paginée sur la clé (nom, prenom, id) : une
+-- comparaison avec un prénom NULL ne renverrait aucune ligne.
+
+BEGIN TRANSACTION;
+
+UPDATE agents SET prenom = '' WHERE prenom IS NULL;
+
+COMMIT;
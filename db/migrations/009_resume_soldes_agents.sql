@@ -0,0 +1,123 @@
+-- ##########################################################################
+-- ## Version 009 : Résumé des soldes par agent (tri et filtre côté SQL)    ##
+-- ##########################################################################
+-- Une ligne par agent : total des soldes actifs et soldes actifs des années
+-- N, N-1 et N-2 (N = année d'exercice). Le résumé est tenu à jour par des
+-- déclencheurs sur soldes_annuels, agents et system_config (changement
+-- d'exercice), ce qui permet de trier et filtrer la liste des agents sur
+-- leurs soldes sans charger les lignes de soldes_annuels.
+
+BEGIN TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS agents_soldes_resume (
+    agent_id INTEGER PRIMARY KEY NOT NULL,
+    solde_total REAL NOT NULL DEFAULT 0,
+    solde_n REAL NOT NULL DEFAULT 0,
+    solde_n1 REAL NOT NULL DEFAULT 0,
+    solde_n2 REAL NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_resume_solde_total ON agents_soldes_resume (solde_total);
+CREATE INDEX IF NOT EXISTS idx_resume_solde_n ON agents_soldes_resume (solde_n);
+CREATE INDEX IF NOT EXISTS idx_resume_solde_n1 ON agents_soldes_resume (solde_n1);
+CREATE INDEX IF NOT EXISTS idx_resume_solde_n2 ON agents_soldes_resume (solde_n2);
+
+-- Recalcul du résumé d'un agent (quelques lignes lues sur idx_soldes_agent_annee)
+CREATE TRIGGER IF NOT EXISTS trg_resume_soldes_insert AFTER INSERT ON soldes_annuels
+BEGIN
+    REPLACE INTO agents_soldes_resume (agent_id, solde_total, solde_n, solde_n1, solde_n2)
+    SELECT NEW.agent_id,
+           COALESCE(SUM(CASE WHEN statut = 'Actif' THEN solde END), 0),
+           COALESCE(SUM(CASE WHEN statut = 'Actif' AND annee = e.n THEN solde END), 0),
+           COALESCE(SUM(CASE WHEN statut = 'Actif' AND annee = e.n - 1 THEN solde END), 0),
+           COALESCE(SUM(CASE WHEN statut = 'Actif' AND annee = e.n - 2 THEN solde END), 0)
+    FROM soldes_annuels
+    LEFT JOIN (SELECT CAST(config_value AS INTEGER) AS n FROM system_config WHERE config_key = 'annee_exercice') e
+    WHERE agent_id = NEW.agent_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_resume_soldes_update AFTER UPDATE OF agent_id, annee, solde, statut ON soldes_annuels
+BEGIN
+    REPLACE INTO agents_soldes_resume (agent_id, solde_total, solde_n, solde_n1, solde_n2)
+    SELECT a.id,
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = e.n THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = e.n - 1 THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = e.n - 2 THEN s.solde END), 0)
+    FROM agents a
+    LEFT JOIN soldes_annuels s ON s.agent_id = a.id
+    LEFT JOIN (SELECT CAST(config_value AS INTEGER) AS n FROM system_config WHERE config_key = 'annee_exercice') e
+    WHERE a.id IN (OLD.agent_id, NEW.agent_id)
+    GROUP BY a.id;
+END;
+
+-- Suppression d'un solde (y compris en cascade depuis agents : l'agent n'existe
+-- alors plus et aucune ligne n'est recréée)
+CREATE TRIGGER IF NOT EXISTS trg_resume_soldes_delete AFTER DELETE ON soldes_annuels
+BEGIN
+    REPLACE INTO agents_soldes_resume (agent_id, solde_total, solde_n, solde_n1, solde_n2)
+    SELECT a.id,
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = e.n THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = e.n - 1 THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = e.n - 2 THEN s.solde END), 0)
+    FROM agents a
+    LEFT JOIN soldes_annuels s ON s.agent_id = a.id
+    LEFT JOIN (SELECT CAST(config_value AS INTEGER) AS n FROM system_config WHERE config_key = 'annee_exercice') e
+    WHERE a.id = OLD.agent_id
+    GROUP BY a.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_resume_agents_insert AFTER INSERT ON agents
+BEGIN
+    INSERT OR IGNORE INTO agents_soldes_resume (agent_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_resume_agents_delete AFTER DELETE ON agents
+BEGIN
+    DELETE FROM agents_soldes_resume WHERE agent_id = OLD.id;
+END;
+
+-- Changement d'exercice (REPLACE dans system_config = suppression puis insertion) :
+-- les colonnes N, N-1 et N-2 de tous les agents sont recalculées en une requête
+CREATE TRIGGER IF NOT EXISTS trg_resume_exercice_insert AFTER INSERT ON system_config
+WHEN NEW.config_key = 'annee_exercice'
+BEGIN
+    REPLACE INTO agents_soldes_resume (agent_id, solde_total, solde_n, solde_n1, solde_n2)
+    SELECT a.id,
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = CAST(NEW.config_value AS INTEGER) THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = CAST(NEW.config_value AS INTEGER) - 1 THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = CAST(NEW.config_value AS INTEGER) - 2 THEN s.solde END), 0)
+    FROM agents a
+    LEFT JOIN soldes_annuels s ON s.agent_id = a.id
+    GROUP BY a.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_resume_exercice_update AFTER UPDATE OF config_value ON system_config
+WHEN NEW.config_key = 'annee_exercice'
+BEGIN
+    REPLACE INTO agents_soldes_resume (agent_id, solde_total, solde_n, solde_n1, solde_n2)
+    SELECT a.id,
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = CAST(NEW.config_value AS INTEGER) THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = CAST(NEW.config_value AS INTEGER) - 1 THEN s.solde END), 0),
+           COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = CAST(NEW.config_value AS INTEGER) - 2 THEN s.solde END), 0)
+    FROM agents a
+    LEFT JOIN soldes_annuels s ON s.agent_id = a.id
+    GROUP BY a.id;
+END;
+
+-- Résumé initial de tous les agents
+REPLACE INTO agents_soldes_resume (agent_id, solde_total, solde_n, solde_n1, solde_n2)
+SELECT a.id,
+       COALESCE(SUM(CASE WHEN s.statut = 'Actif' THEN s.solde END), 0),
+       COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = e.n THEN s.solde END), 0),
+       COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = e.n - 1 THEN s.solde END), 0),
+       COALESCE(SUM(CASE WHEN s.statut = 'Actif' AND s.annee = e.n - 2 THEN s.solde END), 0)
+FROM agents a
+LEFT JOIN soldes_annuels s ON s.agent_id = a.id
+LEFT JOIN (SELECT CAST(config_value AS INTEGER) AS n FROM system_config WHERE config_key = 'annee_exercice') e
+GROUP BY a.id;
+
+COMMIT;
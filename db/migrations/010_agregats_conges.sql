@@ -0,0 +1,64 @@
+-- ##########################################################################
+-- ## Version 010 : Agrégats de congés par agent, année, type et statut    ##
+-- ##########################################################################
+-- Nombre de congés et jours pris par (agent, année de début, type, statut),
+-- tenus à jour de façon incrémentale par des déclencheurs sur conges. Les
+-- totaux annuels (lignes de synthèse, statistiques par année ou par grade)
+-- se lisent ici sans parcourir les congés.
+
+BEGIN TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS conges_agregats (
+    agent_id INTEGER NOT NULL,
+    annee INTEGER NOT NULL,
+    type_conge TEXT NOT NULL,
+    statut TEXT NOT NULL,
+    nb_conges INTEGER NOT NULL DEFAULT 0,
+    jours_pris INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (agent_id, annee, type_conge, statut)
+) WITHOUT ROWID;
+
+-- Statistiques d'une année sur tous les agents
+CREATE INDEX IF NOT EXISTS idx_agregats_annee ON conges_agregats (annee, type_conge, statut);
+
+CREATE TRIGGER IF NOT EXISTS trg_agregats_conges_insert AFTER INSERT ON conges
+BEGIN
+    INSERT INTO conges_agregats (agent_id, annee, type_conge, statut, nb_conges, jours_pris)
+    VALUES (NEW.agent_id, CAST(substr(NEW.date_debut, 1, 4) AS INTEGER), NEW.type_conge, NEW.statut, 1, NEW.jours_pris)
+    ON CONFLICT (agent_id, annee, type_conge, statut)
+    DO UPDATE SET nb_conges = nb_conges + 1, jours_pris = jours_pris + excluded.jours_pris;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_agregats_conges_delete AFTER DELETE ON conges
+BEGIN
+    UPDATE conges_agregats SET nb_conges = nb_conges - 1, jours_pris = jours_pris - OLD.jours_pris
+    WHERE agent_id = OLD.agent_id AND annee = CAST(substr(OLD.date_debut, 1, 4) AS INTEGER)
+      AND type_conge = OLD.type_conge AND statut = OLD.statut;
+    DELETE FROM conges_agregats
+    WHERE agent_id = OLD.agent_id AND annee = CAST(substr(OLD.date_debut, 1, 4) AS INTEGER)
+      AND type_conge = OLD.type_conge AND statut = OLD.statut AND nb_conges <= 0;
+END;
+
+-- Modification (jours recalculés, annulation, changement de dates) : retrait de
+-- l'ancienne ligne puis ajout de la nouvelle
+CREATE TRIGGER IF NOT EXISTS trg_agregats_conges_update AFTER UPDATE OF agent_id, type_conge, statut, date_debut, jours_pris ON conges
+BEGIN
+    UPDATE conges_agregats SET nb_conges = nb_conges - 1, jours_pris = jours_pris - OLD.jours_pris
+    WHERE agent_id = OLD.agent_id AND annee = CAST(substr(OLD.date_debut, 1, 4) AS INTEGER)
+      AND type_conge = OLD.type_conge AND statut = OLD.statut;
+    DELETE FROM conges_agregats
+    WHERE agent_id = OLD.agent_id AND annee = CAST(substr(OLD.date_debut, 1, 4) AS INTEGER)
+      AND type_conge = OLD.type_conge AND statut = OLD.statut AND nb_conges <= 0;
+    INSERT INTO conges_agregats (agent_id, annee, type_conge, statut, nb_conges, jours_pris)
+    VALUES (NEW.agent_id, CAST(substr(NEW.date_debut, 1, 4) AS INTEGER), NEW.type_conge, NEW.statut, 1, NEW.jours_pris)
+    ON CONFLICT (agent_id, annee, type_conge, statut)
+    DO UPDATE SET nb_conges = nb_conges + 1, jours_pris = jours_pris + excluded.jours_pris;
+END;
+
+-- Agrégats des congés existants
+INSERT INTO conges_agregats (agent_id, annee, type_conge, statut, nb_conges, jours_pris)
+SELECT agent_id, CAST(substr(date_debut, 1, 4) AS INTEGER), type_conge, statut, COUNT(*), SUM(jours_pris)
+FROM conges
+GROUP BY agent_id, CAST(substr(date_debut, 1, 4) AS INTEGER), type_conge, statut;
+
+COMMIT;
@@ -0,0 +1,98 @@
+-- ##########################################################################
+-- ## Version 011 : Registre des mouvements de soldes et instantanés        ##
+-- ##########################################################################
+-- Chaque écriture sur soldes_annuels (débit, crédit, clôture, apurement,
+-- saisie manuelle) ajoute une ligne au registre mouvements_soldes, qui n'est
+-- jamais modifié ni purgé. Le motif est celui posé par l'application dans
+-- mouvements_contexte pour la durée de l'opération.
+-- Les instantanés (snapshots_soldes) figent périodiquement le solde actif
+-- total de chaque agent : le solde à une date D se lit sur le dernier
+-- instantané antérieur à D, plus la somme des mouvements qui le suivent.
+
+BEGIN TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS mouvements_soldes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    agent_id INTEGER NOT NULL,
+    solde_id INTEGER NOT NULL,
+    annee INTEGER NOT NULL,
+    horodatage TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+    -- Jour julien de l'écriture (même convention que conges.jour_debut)
+    jour INTEGER NOT NULL DEFAULT (CAST(julianday(date('now', 'localtime')) AS INTEGER)),
+    -- Variation du solde de l'année et variation du solde actif (changement de statut compris)
+    delta REAL NOT NULL,
+    delta_actif REAL NOT NULL,
+    solde_apres REAL NOT NULL,
+    statut_apres TEXT NOT NULL,
+    motif TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_mouvements_agent ON mouvements_soldes (agent_id, id);
+
+-- Registre en ajout seul
+CREATE TRIGGER IF NOT EXISTS trg_mouvements_no_update BEFORE UPDATE ON mouvements_soldes
+BEGIN
+    SELECT RAISE(ABORT, 'Le registre des mouvements de soldes ne peut pas être modifié.');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mouvements_no_delete BEFORE DELETE ON mouvements_soldes
+BEGIN
+    SELECT RAISE(ABORT, 'Le registre des mouvements de soldes ne peut pas être modifié.');
+END;
+
+-- Motif de l'opération en cours (une seule ligne, NULL hors opération)
+CREATE TABLE IF NOT EXISTS mouvements_contexte (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    motif TEXT
+);
+INSERT OR IGNORE INTO mouvements_contexte (id, motif) VALUES (1, NULL);
+
+CREATE TRIGGER IF NOT EXISTS trg_mouvements_soldes_insert AFTER INSERT ON soldes_annuels
+BEGIN
+    INSERT INTO mouvements_soldes (agent_id, solde_id, annee, delta, delta_actif, solde_apres, statut_apres, motif)
+    SELECT NEW.agent_id, NEW.id, NEW.annee, NEW.solde,
+           CASE WHEN NEW.statut = 'Actif' THEN NEW.solde ELSE 0 END,
+           NEW.solde, NEW.statut, COALESCE(c.motif, 'Création')
+    FROM mouvements_contexte c WHERE c.id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mouvements_soldes_update AFTER UPDATE OF solde, statut ON soldes_annuels
+WHEN NEW.solde IS NOT OLD.solde OR NEW.statut IS NOT OLD.statut
+BEGIN
+    INSERT INTO mouvements_soldes (agent_id, solde_id, annee, delta, delta_actif, solde_apres, statut_apres, motif)
+    SELECT NEW.agent_id, NEW.id, NEW.annee, NEW.solde - OLD.solde,
+           (CASE WHEN NEW.statut = 'Actif' THEN NEW.solde ELSE 0 END) - (CASE WHEN OLD.statut = 'Actif' THEN OLD.solde ELSE 0 END),
+           NEW.solde, NEW.statut, COALESCE(c.motif, 'Modification')
+    FROM mouvements_contexte c WHERE c.id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mouvements_soldes_delete AFTER DELETE ON soldes_annuels
+BEGIN
+    INSERT INTO mouvements_soldes (agent_id, solde_id, annee, delta, delta_actif, solde_apres, statut_apres, motif)
+    SELECT OLD.agent_id, OLD.id, OLD.annee, -OLD.solde,
+           -(CASE WHEN OLD.statut = 'Actif' THEN OLD.solde ELSE 0 END),
+           0, 'Supprimé', COALESCE(c.motif, 'Suppression')
+    FROM mouvements_contexte c WHERE c.id = 1;
+END;
+
+-- Solde actif total de chaque agent au jour `jour`, arrêté au mouvement `mouvement_id`
+CREATE TABLE IF NOT EXISTS snapshots_soldes (
+    agent_id INTEGER NOT NULL,
+    jour INTEGER NOT NULL,
+    mouvement_id INTEGER NOT NULL,
+    solde_total REAL NOT NULL,
+    PRIMARY KEY (agent_id, jour)
+) WITHOUT ROWID;
+
+-- Ouverture du registre : un mouvement par solde existant, puis un premier instantané
+INSERT INTO mouvements_soldes (agent_id, solde_id, annee, delta, delta_actif, solde_apres, statut_apres, motif)
+SELECT agent_id, id, annee, solde, CASE WHEN statut = 'Actif' THEN solde ELSE 0 END, solde, statut, 'Ouverture du registre'
+FROM soldes_annuels
+ORDER BY agent_id, annee;
+
+INSERT OR REPLACE INTO snapshots_soldes (agent_id, jour, mouvement_id, solde_total)
+SELECT r.agent_id, CAST(julianday(date('now', 'localtime')) AS INTEGER),
+       (SELECT COALESCE(MAX(id), 0) FROM mouvements_soldes), r.solde_total
+FROM agents_soldes_resume r;
+
+COMMIT;
@@ -0,0 +1,17 @@
+-- ##########################################################################
+-- ## Version 012 : File des congés à vérifier (jours fériés modifiés)     ##
+-- ##########################################################################
+-- Congés annuels dont le nombre de jours ouvrés a changé après l'ajout, la
+-- modification ou la suppression d'un jour férié, avec le nombre de jours
+-- recalculé. La file survit au redémarrage de l'application et suit la base
+-- lors d'une restauration ; un congé supprimé en sort automatiquement.
+
+BEGIN TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS conges_a_verifier (
+    conge_id INTEGER PRIMARY KEY REFERENCES conges (id) ON DELETE CASCADE,
+    jours_recalcules INTEGER NOT NULL,
+    date_detection TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+COMMIT;
@@ -0,0 +1,27 @@
+-- ##########################################################################
+-- ## Version 013 : Table matérialisée des jours fériés officiels          ##
+-- ##########################################################################
+-- Numérotée 013 et non 002 : la version 2 est inscrite par la migration des
+-- données héritées (_handle_data_migration_from_legacy), ce qui faisait sauter
+-- ce script aux bases passées par cette migration. Le script est idempotent :
+-- une base qui l'avait déjà appliqué sous le numéro 002 le rejoue sans effet.
+
+BEGIN TRANSACTION;
+
+-- Jours fériés officiels précalculés depuis la bibliothèque 'holidays'.
+-- La clé primaire (pays, date) sert d'index pour les recherches par plage.
+CREATE TABLE IF NOT EXISTS jours_feries_officiels (
+    pays TEXT NOT NULL,
+    date TEXT NOT NULL,
+    nom TEXT NOT NULL,
+    PRIMARY KEY (pays, date)
+) WITHOUT ROWID;
+
+-- Plage d'années déjà précalculée pour chaque pays.
+CREATE TABLE IF NOT EXISTS jours_feries_officiels_plages (
+    pays TEXT PRIMARY KEY,
+    annee_debut INTEGER NOT NULL,
+    annee_fin INTEGER NOT NULL
+);
+
+COMMIT;
@@ -1,17 +1,44 @@
 # Fichier : db/models.py
-# Ce fichier utilise la nouvelle fonction validate_date sans nécessiter de modification.
+# Modèles compacts (__slots__) : pas de dictionnaire par instance. Les dates des congés
+# ne sont décodées qu'au premier accès, les listes qui ne les affichent pas n'en paient pas le coût.
 
-from utils.date_utils import validate_date
+from collections import namedtuple
+from functools import lru_cache
+
+from utils.date_utils import validate_date, format_date_for_display
 from core.constants import SoldeStatus
 
+# Statuts déjà convertis : évite de reconstruire l'Enum pour chaque ligne lue
+_STATUTS_SOLDE = {s.value: s for s in SoldeStatus}
+
+# Textes à faible cardinalité (types de congé, statuts, grades, calendriers) : une seule chaîne
+# nettoyée par valeur distincte, partagée par tous les objets. Les dates n'y passent pas.
+@lru_cache(maxsize=256)
+def _texte_partage(valeur):
+    return valeur.strip() if valeur else ""
+
+# Soldes actifs d'un agent tels que tenus par la table agents_soldes_resume
+ResumeSoldes = namedtuple('ResumeSoldes', 'total annee_n annee_n1 annee_n2')
+
+
+class AgentRow(namedtuple('AgentRow', 'id nom prenom ppr grade')):
+    """Ligne légère (tuple) pour les listes de sélection : ni soldes ni dates."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.nom} {self.prenom} (PPR: {self.ppr})"
+
+
 class SoldeAnnuel:
     """Représente une ligne de la table soldes_annuels."""
+    __slots__ = ('agent_id', 'annee', 'id', 'solde', 'statut')
+
     def __init__(self, id, agent_id, annee, solde, statut):
         self.id = id
         self.agent_id = agent_id
         self.annee = annee
         self.solde = float(solde)
-        self.statut = SoldeStatus(statut.strip() if statut else SoldeStatus.ACTIF)
+        self.statut = _STATUTS_SOLDE.get(statut) or SoldeStatus(statut.strip() if statut else SoldeStatus.ACTIF)
 
     @classmethod
     def from_db_row(cls, row):
@@ -23,13 +50,17 @@ class SoldeAnnuel:
 
 class Agent:
     """Représente un agent avec ses attributs."""
-    def __init__(self, id, nom, prenom, ppr, grade, soldes_annuels=None):
+    __slots__ = ('calendrier', 'grade', 'id', 'nom', 'ppr', 'prenom', 'resume_soldes', 'soldes_annuels')
+
+    def __init__(self, id, nom, prenom, ppr, grade, soldes_annuels=None, calendrier=None):
         self.id = id
         self.nom = nom.strip() if nom else ""
         self.prenom = prenom.strip() if prenom else ""
         self.ppr = ppr.strip() if ppr else ""
-        self.grade = grade.strip() if grade else ""
+        self.grade = _texte_partage(grade)
+        self.calendrier = _texte_partage(calendrier) or None
         self.soldes_annuels = soldes_annuels if soldes_annuels is not None else []
+        self.resume_soldes = None
 
     def __str__(self):
         return f"{self.nom} {self.prenom} (PPR: {self.ppr})"
@@ -38,10 +69,12 @@ class Agent:
     def from_db_row(cls, row):
         """
         Crée une instance de Agent à partir d'une ligne de la table 'agents'.
+        La colonne 'calendrier' (6e position) est optionnelle.
         """
         if not row:
             return None
-        return cls(id=row[0], nom=row[1], prenom=row[2], ppr=row[3], grade=row[4])
+        return cls(id=row[0], nom=row[1], prenom=row[2], ppr=row[3], grade=row[4],
+                   calendrier=row[5] if len(row) > 5 else None)
 
     def get_solde_total_actif(self):
         """Calcule et retourne la somme de tous les soldes avec le statut 'Actif'."""
@@ -49,36 +82,64 @@ class Agent:
 
 
 class Conge:
-    """Représente un congé avec ses attributs."""
+    """
+    Représente un congé avec ses attributs. date_debut et date_fin sont conservées
+    telles que lues (texte partagé) et converties en datetime au premier accès.
+    """
+    __slots__ = ('_date_debut', '_date_fin', 'agent_id', 'id', 'interim_id', 'jours_pris', 'justif', 'statut', 'type_conge')
+
     def __init__(self, id, agent_id, type_conge, justif, interim_id, date_debut, date_fin, jours_pris, statut='Actif'):
         self.id = id
         self.agent_id = agent_id
-        self.type_conge = type_conge.strip() if type_conge else ""
+        self.type_conge = _texte_partage(type_conge)
         self.justif = justif.strip() if justif else ""
         self.interim_id = interim_id
-        self.date_debut = validate_date(date_debut)
-        self.date_fin = validate_date(date_fin)
+        self.date_debut = date_debut
+        self.date_fin = date_fin
         self.jours_pris = jours_pris
-        self.statut = statut.strip() if statut else "Actif"
+        self.statut = _texte_partage(statut) or "Actif"
+
+    @property
+    def date_debut(self):
+        valeur = self._date_debut
+        if valeur.__class__ is str:
+            valeur = self._date_debut = validate_date(valeur)
+        return valeur
+
+    @date_debut.setter
+    def date_debut(self, valeur):
+        self._date_debut = valeur.strip() if isinstance(valeur, str) else validate_date(valeur)
+
+    @property
+    def date_fin(self):
+        valeur = self._date_fin
+        if valeur.__class__ is str:
+            valeur = self._date_fin = validate_date(valeur)
+        return valeur
+
+    @date_fin.setter
+    def date_fin(self, valeur):
+        self._date_fin = valeur.strip() if isinstance(valeur, str) else validate_date(valeur)
 
     def __str__(self):
-        debut_str = self.date_debut.strftime('%d/%m/%Y') if self.date_debut else 'N/A'
-        fin_str = self.date_fin.strftime('%d/%m/%Y') if self.date_fin else 'N/A'
+        debut_str = format_date_for_display(self.date_debut) or 'N/A'
+        fin_str = format_date_for_display(self.date_fin) or 'N/A'
         return f"Congé {self.type_conge} du {debut_str} au {fin_str} ({self.jours_pris} jours)"
 
     @classmethod
     def from_db_row(cls, row):
-        """Crée une instance de Conge à partir d'une ligne de la base de données."""
+        """
+        Crée une instance de Conge à partir d'une ligne de la base de données
+        (id, agent_id, type_conge, justif, interim_id, date_debut, date_fin, jours_pris, statut, ...).
+        """
         if not row:
             return None
-        return cls(
-            id=row[0], 
-            agent_id=row[1], 
-            type_conge=row[2], 
-            justif=row[3], 
-            interim_id=row[4], 
-            date_debut=row[5], 
-            date_fin=row[6], 
-            jours_pris=row[7],
-            statut=row[8]
-        )
\ No newline at end of file
+        # Chemin rapide sans passer par __init__ : les dates restent en texte jusqu'au premier accès
+        conge = object.__new__(cls)
+        conge.id, conge.agent_id, type_conge, justif, conge.interim_id, debut, fin, conge.jours_pris, statut = row[:9]
+        conge.type_conge = _texte_partage(type_conge)
+        conge.justif = justif.strip() if justif else ""
+        conge._date_debut = debut.strip() if debut.__class__ is str else validate_date(debut)
+        conge._date_fin = fin.strip() if fin.__class__ is str else validate_date(fin)
+        conge.statut = _texte_partage(statut) or "Actif"
+        return conge
@@ -0,0 +1,173 @@
+# Fichier : db/pool.py
+# Description : Pool de connexions SQLite partagé par l'interface et les tâches de
+# fond (exports, imports). Une connexion n'est utilisée que par un seul thread à la
+# fois : elle est empruntée (checkout) puis rendue (checkin) et reste ouverte pour
+# la tâche suivante, avec ses réglages PRAGMA et son cache de pages déjà chauds.
+
+import sqlite3
+import threading
+import logging
+import os
+
+from utils.config_loader import CONFIG
+
+# Profil de performance par défaut, surchargé par la section db.performance de la configuration
+PERFORMANCE_PAR_DEFAUT = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+_VALEURS_PRAGMA = {
+    'journal_mode': {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'},
+    'synchronous': {'OFF', 'NORMAL', 'FULL', 'EXTRA'},
+    'temp_store': {'DEFAULT', 'FILE', 'MEMORY'},
+}
+
+def get_performance_profile():
+    """Retourne les réglages SQLite validés (défauts + configuration)."""
+    profil = dict(PERFORMANCE_PAR_DEFAUT)
+    profil.update(CONFIG.get('db', {}).get('performance') or {})
+    for nom, valeurs in _VALEURS_PRAGMA.items():
+        profil[nom] = str(profil[nom]).upper()
+        if profil[nom] not in valeurs:
+            raise ValueError(f"Valeur invalide pour db.performance.{nom} : {profil[nom]}")
+    for nom in ('cache_size', 'mmap_size', 'busy_timeout'):
+        profil[nom] = int(profil[nom])
+    return profil
+
+
+class ConnectionPool:
+    """
+    Pool de connexions vers un fichier de base. Chaque thread reçoit sa propre
+    connexion (un même thread qui emprunte plusieurs fois obtient la même) ; les
+    connexions rendues sont conservées, dans la limite de `max_idle`, et vérifiées
+    avant d'être prêtées à nouveau.
+    """
+
+    def __init__(self, db_file, max_idle=4):
+        self.db_file = db_file
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = []
+        self._local = threading.local()
+        self.created = 0
+        self.reused = 0
+
+    def checkout(self):
+        """Emprunte une connexion pour le thread courant."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+                if conn is not None:
+                    self.reused += 1
+            if conn is None:
+                conn = self._create()
+                break
+            if self._is_healthy(conn):
+                break
+            logging.warning("Connexion SQLite inutilisable écartée du pool.")
+            self._close_quietly(conn)
+
+        self._local.conn = conn
+        self._local.depth = 1
+        self._local.tx_depth = 0
+        return conn
+
+    def checkin(self, conn):
+        """Rend une connexion empruntée par le thread courant."""
+        if getattr(self._local, 'conn', None) is not conn:
+            raise sqlite3.ProgrammingError("Cette connexion n'a pas été empruntée par ce thread.")
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+        self._local.tx_depth = 0
+
+        # Une transaction laissée ouverte ne doit pas passer à l'emprunteur suivant
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._close_quietly(conn)
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        self._close_quietly(conn)
+
+    def get_tx_depth(self):
+        """
+        Profondeur des portées transaction() ouvertes sur la connexion du thread courant.
+        Elle est tenue ici, avec la connexion, car tous les gestionnaires d'un même
+        thread partagent cette connexion.
+        """
+        return getattr(self._local, 'tx_depth', 0)
+
+    def set_tx_depth(self, depth):
+        self._local.tx_depth = depth
+
+    def close_all(self):
+        """Ferme les connexions au repos (avant le remplacement du fichier de base)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._lock:
+            return {'created': self.created, 'reused': self.reused, 'idle': len(self._idle)}
+
+    def _create(self):
+        profil = get_performance_profile()
+        # La connexion peut changer de thread entre deux emprunts, jamais pendant
+        conn = sqlite3.connect(self.db_file, detect_types=sqlite3.PARSE_DECLTYPES,
+                               timeout=profil['busy_timeout'] / 1000, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA foreign_keys = ON")
+            # Les valeurs sont validées par get_performance_profile (liste fermée ou entiers)
+            for nom in ('busy_timeout', 'journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store'):
+                conn.execute(f"PRAGMA {nom} = {profil[nom]}")
+            effectifs = {nom: conn.execute(f"PRAGMA {nom}").fetchone()[0] for nom in profil}
+        except sqlite3.Error:
+            conn.close()
+            raise
+        with self._lock:
+            self.created += 1
+        logging.info(f"Connexion SQLite ({os.path.basename(self.db_file)}) : {effectifs}")
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return not conn.in_transaction
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_file):
+    """Retourne le pool (unique dans le processus) associé au fichier de base."""
+    key = os.path.abspath(db_file)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(db_file)
+        return _pools[key]
@@ -46,6 +46,7 @@ if __name__ == "__main__":
     LOG_FILE_PATH = os.path.join(BASE_DIR, "conges.log")
     logging.basicConfig(filename=LOG_FILE_PATH, level=logging.INFO,
                         format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+    os.makedirs(CERTIFICATS_DIR_ABS, exist_ok=True)
 
     # Boucle permettant un redémarrage propre de l'application.
     restart_app = True
@@ -67,6 +68,8 @@ if __name__ == "__main__":
 
         # Initialisation du gestionnaire métier et lancement de l'interface.
         conge_manager = CongeManager(db_manager, CERTIFICATS_DIR_ABS)
+        conge_manager.precalculer_jours_feries_officiels()
+        conge_manager.snapshot_soldes_si_necessaire()
         
         print(f"--- Lancement de {CONFIG['app']['title']} v{CONFIG['app']['version']} ---")
         app = MainWindow(conge_manager, BASE_DIR)
@@ -77,5 +80,6 @@ if __name__ == "__main__":
             restart_app = True
         
         db_manager.close()
-    
+
+    db_manager.close_all_connections()
     print("--- Application fermée, connexion à la base de données terminée. ---")
\ No newline at end of file
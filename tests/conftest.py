@@ -0,0 +1,26 @@
+# Fichier : tests/conftest.py
+# Description : Fixtures partagées par les tests. `db_manager` fournit une base
+# migrée dans un fichier temporaire ; un fichier de test qui a besoin de données
+# la redéfinit sous le même nom pour y ajouter son jeu d'essai.
+
+import sys
+import os
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# ---------------------------------------------------------------------------
+
+import db.database
+from db.database import DatabaseManager
+
+
+@pytest.fixture
+def db_manager(tmp_path, monkeypatch):
+    # Pas de boîte de dialogue à l'application des migrations
+    monkeypatch.setattr(db.database.messagebox, "showinfo", lambda *a, **k: None)
+    manager = DatabaseManager(str(tmp_path / "conges.db"))
+    assert manager.connect()
+    manager.run_migrations()
+    yield manager
+    manager.close_all_connections()
@@ -0,0 +1,98 @@
+import sys
+import os
+import logging
+from datetime import date
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+import utils.date_utils
+from core.conges.manager import CongeManager
+from db.database import DatabaseManager
+from db.models import Conge
+from utils.config_loader import CONFIG
+from utils.date_utils import get_calendriers, get_calendar_code
+from utils.holiday_cache import HOLIDAY_CACHE
+
+pytest.importorskip("holidays")
+
+
+@pytest.fixture(autouse=True)
+def calendriers(monkeypatch):
+    monkeypatch.setitem(CONFIG, 'conges', {**CONFIG.get('conges', {}), 'holidays_country': 'MA', 'calendriers': {
+        'Maroc': {'pays': 'MA'},
+        'Catalogne': {'pays': 'ES', 'subdiv': 'CT'},
+        'Sans définition': None,
+    }})
+    monkeypatch.setattr(utils.date_utils, "_unknown_calendars_logged", set())
+    # Le cache est partagé par le processus : pas de calendrier compilé sur une autre base
+    HOLIDAY_CACHE.invalidate()
+
+
+def test_codes_des_calendriers_configures():
+    assert get_calendriers() == {'Maroc': 'MA', 'Catalogne': 'ES-CT', 'Sans définition': 'MA'}
+    assert get_calendar_code('Catalogne') == 'ES-CT'
+    assert get_calendar_code(None) == 'MA'
+
+
+def test_calendrier_inconnu_signale_une_seule_fois(caplog):
+    with caplog.at_level(logging.WARNING):
+        assert get_calendar_code('Atlantide') == 'MA'
+        assert get_calendar_code('Atlantide') == 'MA'
+        assert get_calendar_code('Utopie') == 'MA'
+    messages = [r.getMessage() for r in caplog.records]
+    assert len(messages) == 2
+    assert "'Atlantide'" in messages[0] and "'Utopie'" in messages[1]
+
+
+def test_colonne_calendrier_des_agents(db_manager):
+    colonnes = {r[1]: r for r in db_manager.execute_query("PRAGMA table_info(agents)", fetch="all")}
+    assert colonnes['calendrier'][2] == 'TEXT' and colonnes['calendrier'][4] is None
+
+    defaut = db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+    catalan = db_manager.ajouter_agent("Puig", "Jordi", "P2", "Technicien", "Catalogne")
+    assert db_manager.get_agent_calendrier(defaut) is None
+    assert db_manager.get_agent_calendrier(catalan) == 'Catalogne'
+    assert db_manager.get_agents_calendriers() == {catalan: 'Catalogne'}
+
+    db_manager.set_agent_calendrier(catalan, "")
+    assert db_manager.get_agents_calendriers() == {}
+
+
+def test_verification_selon_le_calendrier_de_chaque_agent(db_manager, tmp_path):
+    manager = CongeManager(db_manager, str(tmp_path))
+    agents = {
+        'defaut': db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur"),
+        'catalan': db_manager.ajouter_agent("Puig", "Jordi", "P2", "Technicien", "Catalogne"),
+        'inconnu': db_manager.ajouter_agent("Bennani", "Omar", "P3", "Infirmier", "Atlantide"),
+    }
+    # Semaine de la fête du Trône (mercredi 30/07, férié au Maroc) : 4 jours ouvrés au Maroc, 5 en Catalogne
+    for agent_id in agents.values():
+        db_manager.ajouter_conge(Conge(None, agent_id, "Congé annuel", None, None, date(2025, 7, 28), date(2025, 8, 1), 5))
+
+    assert date(2025, 7, 30) in manager.get_holidays_set_for_period(2025, 2025, manager.get_calendrier_agent(agents['defaut']))
+    assert date(2025, 9, 11) in manager.get_holidays_set_for_period(2025, 2025, manager.get_calendrier_agent(agents['catalan']))
+
+    incoherents = {conge.agent_id: jours for conge, jours in manager.find_inconsistent_annual_leaves(2025)}
+    # Calendrier inconnu : repli sur le calendrier par défaut
+    assert incoherents == {agents['defaut']: 4, agents['inconnu']: 4}
+
+
+def test_cache_des_jours_feries_propre_a_chaque_base(db_manager, tmp_path):
+    manager = CongeManager(db_manager, str(tmp_path))
+    assert date(2025, 5, 2) not in manager.get_holidays_set_for_period(2025, 2025)
+    assert manager.get_business_calendar(2025, 2025).est_ouvre(date(2025, 5, 2))
+
+    autre_db = DatabaseManager(str(tmp_path / "autre.db"))
+    assert autre_db.connect()
+    try:
+        autre_db.run_migrations()
+        autre_db.add_holiday("2025-05-02", "Pont", "Personnalisé")
+        autre = CongeManager(autre_db, str(tmp_path))
+        # Même calendrier et mêmes années, mais une autre base : pas d'ensemble repris de la première
+        assert date(2025, 5, 2) in autre.get_holidays_set_for_period(2025, 2025)
+        assert not autre.get_business_calendar(2025, 2025).est_ouvre(date(2025, 5, 2))
+    finally:
+        autre_db.close_all_connections()
@@ -0,0 +1,172 @@
+import sys
+import os
+import sqlite3
+from datetime import date
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from core.conges.manager import CongeManager
+from db.models import Conge
+from utils.config_loader import CONFIG
+from utils.holiday_cache import HOLIDAY_CACHE
+
+MOTIF = "Correction après modification des jours fériés"
+
+
+@pytest.fixture
+def manager(db_manager, tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'conges', {**CONFIG.get('conges', {}), 'holidays_country': 'MA', 'calendriers': {},
+                                           'solde_annuel_par_defaut': 22.0})
+    HOLIDAY_CACHE.invalidate()
+    return CongeManager(db_manager, str(tmp_path))
+
+
+@pytest.fixture
+def agents(manager):
+    """
+    Un agent à débiter, un à créditer au-delà des places disponibles et un au solde
+    insuffisant, chacun avec des congés de mars 2025 (sans férié au Maroc) mal décomptés.
+    """
+    db = manager.db
+    soldes = {
+        'alami': {2024: 1, 2025: 20},      # 3 jours pris pour 5 ouvrés : débit de 2
+        'bennani': {2024: 5, 2025: 21},    # 40 jours pris pour 20 ouvrés : crédit de 20
+        'chraibi': {2025: 2},              # 1 jour pris pour 5 ouvrés : débit de 4, impossible
+    }
+    conges = {
+        'alami': [(date(2025, 3, 10), date(2025, 3, 14), 3)],
+        'bennani': [(date(2025, 3, 3), date(2025, 3, 14), 25), (date(2025, 3, 17), date(2025, 3, 28), 15)],
+        'chraibi': [(date(2025, 3, 10), date(2025, 3, 14), 1)],
+    }
+    ids = {}
+    for i, nom in enumerate(soldes):
+        agent_id = db.ajouter_agent(nom.capitalize(), "Prénom", f"P{i}", "Administrateur")
+        for annee, solde in soldes[nom].items():
+            db.create_solde_annuel(agent_id, annee, solde, 'Actif')
+        db.create_solde_annuel(agent_id, 2022, 7, 'Expiré')
+        for debut, fin, jours in conges[nom]:
+            db.ajouter_conge(Conge(None, agent_id, "Congé annuel", None, None, debut, fin, jours))
+        ids[nom] = agent_id
+    return ids
+
+
+def _soldes(db, agent_id):
+    return dict(db.execute_query("SELECT annee, solde FROM soldes_annuels WHERE agent_id = ? ORDER BY annee", (agent_id,), fetch="all"))
+
+
+def _mettre_en_file(manager):
+    # Comme après une modification de jour férié : les congés incohérents sont dans la file
+    manager._verifier_conges(manager.db.get_active_annual_leaves_between(date(2025, 1, 1), date(2025, 12, 31)))
+
+
+def _jours_pris(db):
+    return db.execute_query("SELECT id, jours_pris FROM conges ORDER BY id", fetch="all")
+
+
+def test_apercu_signale_les_soldes_insuffisants(manager, agents):
+    apercu = manager.preparer_corrections(manager.find_inconsistent_annual_leaves(2025))
+
+    assert [item['agent'].id for item in apercu] == [agents['alami'], agents['bennani'], agents['chraibi']]
+    assert [(item['delta'], item['solde_avant'], item['solde_apres'], item['solde_insuffisant']) for item in apercu] == [
+        (2, 21, 19, False),
+        (-20, 26, 46, False),
+        (4, 2, -2, True),
+    ]
+    assert sorted(jours for item in apercu for _, jours in item['corrections']) == [5, 5, 10, 10]
+
+
+def test_apercu_sans_ecriture(manager, agents):
+    db = manager.db
+    inconsistencies = manager.find_inconsistent_annual_leaves(2025)
+    changements = db.conn.total_changes
+    manager.preparer_corrections(inconsistencies)
+    assert db.conn.total_changes == changements
+    assert manager.get_conges_a_verifier() == []
+
+
+def test_correction_ensembliste_des_soldes(manager, agents):
+    db = manager.db
+    _mettre_en_file(manager)
+    assert manager.appliquer_corrections(manager.preparer_corrections(manager.find_inconsistent_annual_leaves(2025))) == 3
+
+    # Débit : de l'année la plus ancienne à la plus récente
+    assert _soldes(db, agents['alami']) == {2022: 7, 2024: 0, 2025: 19}
+    # Crédit : places libres jusqu'à 22 de la plus récente à la plus ancienne, reliquat sur la plus récente
+    assert _soldes(db, agents['bennani']) == {2022: 7, 2024: 22, 2025: 24}
+    # Solde insuffisant : rien n'est modifié et le congé reste à vérifier
+    assert _soldes(db, agents['chraibi']) == {2022: 7, 2025: 2}
+    assert [(c.agent_id, c.jours_pris, jours) for c, jours in manager.get_conges_a_verifier()] == [(agents['chraibi'], 1, 5)]
+
+    mouvements = db.execute_query("SELECT agent_id, annee, delta FROM mouvements_soldes WHERE motif = ? ORDER BY agent_id, annee", (MOTIF,), fetch="all")
+    assert mouvements == [(agents['alami'], 2024, -1), (agents['alami'], 2025, -1),
+                          (agents['bennani'], 2024, 17), (agents['bennani'], 2025, 3)]
+
+
+def test_ecarts_identiques_au_debit_et_credit_unitaires(manager, agents):
+    db = manager.db
+    # Sans reliquat, la requête ensembliste répartit comme le débit et le crédit agent par agent
+    jumeaux = {}
+    for nom in ('alami', 'bennani'):
+        jumeau = db.ajouter_agent(f"{nom}_bis", "Prénom", f"B{nom}", "Administrateur")
+        for annee, solde in _soldes(db, agents[nom]).items():
+            db.create_solde_annuel(jumeau, annee, solde, 'Actif' if annee != 2022 else 'Expiré')
+        jumeaux[nom] = jumeau
+
+    with db.transaction():
+        db.appliquer_ecarts_soldes([(agents['alami'], 2.5), (agents['bennani'], -17)], 22)
+        manager._debiter_solde(jumeaux['alami'], 2.5)
+        manager._crediter_solde(jumeaux['bennani'], 17)
+    for nom in ('alami', 'bennani'):
+        assert _soldes(db, agents[nom]) == _soldes(db, jumeaux[nom])
+
+
+def test_solde_insuffisant_annule_toute_la_correction(manager, agents):
+    db = manager.db
+    avant = {nom: _soldes(db, agent_id) for nom, agent_id in agents.items()}
+    jours_avant = _jours_pris(db)
+
+    # Aperçu non signalé : le solde insuffisant n'est découvert qu'à l'écriture
+    _mettre_en_file(manager)
+    apercu = [{**item, 'solde_insuffisant': False} for item in manager.preparer_corrections(manager.find_inconsistent_annual_leaves(2025))]
+    with pytest.raises(ValueError):
+        manager.appliquer_corrections(apercu)
+
+    assert {nom: _soldes(db, agent_id) for nom, agent_id in agents.items()} == avant
+    assert _jours_pris(db) == jours_avant
+    assert db.execute_query("SELECT COUNT(*) FROM mouvements_soldes WHERE motif = ?", (MOTIF,), fetch="one")[0] == 0
+    assert len(manager.get_conges_a_verifier()) == 4
+
+
+def test_erreur_en_cours_de_lot_annule_la_mise_a_jour_des_conges(manager, agents, monkeypatch):
+    db = manager.db
+    jours_avant = _jours_pris(db)
+
+    def echec(ecarts, solde_max):
+        raise sqlite3.OperationalError("disque plein")
+    monkeypatch.setattr(db, "appliquer_ecarts_soldes", echec)
+    _mettre_en_file(manager)
+    with pytest.raises(sqlite3.Error):
+        manager.appliquer_corrections(manager.preparer_corrections(manager.find_inconsistent_annual_leaves(2025)))
+
+    assert _jours_pris(db) == jours_avant
+    assert len(manager.get_conges_a_verifier()) == 4
+    assert db.execute_query("SELECT motif FROM mouvements_contexte", fetch="one")[0] is None
+
+
+def test_conge_modifie_entre_apercu_et_confirmation(manager, agents):
+    db = manager.db
+    apercu = manager.preparer_corrections(manager.find_inconsistent_annual_leaves(2025))
+    avant = {nom: _soldes(db, agent_id) for nom, agent_id in agents.items()}
+
+    # Le congé de Bennani est raccourci après l'affichage de l'aperçu
+    conge_id = next(c.id for c, _ in apercu[1]['corrections'] if c.date_fin.date() == date(2025, 3, 28))
+    db.execute_query("UPDATE conges SET date_fin = '2025-03-21' WHERE id = ?", (conge_id,))
+    jours_avant = _jours_pris(db)
+    with pytest.raises(ValueError):
+        manager.appliquer_corrections(apercu)
+
+    assert _jours_pris(db) == jours_avant
+    assert {nom: _soldes(db, agent_id) for nom, agent_id in agents.items()} == avant
@@ -0,0 +1,41 @@
+import sys
+import os
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from core.conges.manager import CongeManager
+from utils.config_loader import CONFIG
+
+
+@pytest.fixture
+def manager(db_manager, tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'conges', {**CONFIG.get('conges', {}), 'solde_annuel_par_defaut': 22.0})
+    db_manager.set_annee_exercice(2025)
+    for i in range(7):
+        agent_id = db_manager.ajouter_agent(f"Nom{i}", "Prénom", f"P{i}", "Administrateur")
+        db_manager.execute_query("INSERT INTO soldes_annuels (agent_id, annee, solde, statut) VALUES (?, 2023, 4, 'Actif')", (agent_id,))
+    # Solde de la nouvelle année déjà saisi : il doit être conservé
+    db_manager.execute_query("INSERT INTO soldes_annuels (agent_id, annee, solde, statut) VALUES (1, 2026, 10, 'Actif')")
+    return CongeManager(db_manager, str(tmp_path / "certificats"))
+
+
+def _soldes(manager):
+    return manager.db.execute_query("SELECT agent_id, annee, solde, statut FROM soldes_annuels ORDER BY agent_id, annee", fetch="all")
+
+
+@pytest.mark.parametrize("taille_lot", [None, 3])
+def test_glissement_ensembliste(manager, taille_lot):
+    appels = []
+    assert manager.effectuer_glissement_annuel(taille_lot=taille_lot, progression=lambda f, t: appels.append((f, t)))
+
+    assert manager.get_annee_exercice() == 2026
+    soldes = _soldes(manager)
+    assert (1, 2026, 10.0, 'Actif') in soldes
+    assert all((i, 2026, 22.0, 'Actif') in soldes for i in range(2, 8))
+    assert all(statut == 'Expiré' for _, annee, _, statut in soldes if annee == 2023)
+    assert appels[-1][0] == appels[-1][1]
+    if taille_lot:
+        assert appels == [(3, 7), (6, 7), (7, 7)]
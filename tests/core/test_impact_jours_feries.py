@@ -0,0 +1,71 @@
+import sys
+import os
+from datetime import date
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from core.conges.manager import CongeManager
+from db.models import Conge
+from utils.config_loader import CONFIG
+from utils.holiday_cache import HOLIDAY_CACHE
+
+
+@pytest.fixture
+def conges(db_manager, monkeypatch):
+    """Congés autour du mercredi 12/03/2025 (jour ouvré sans férié officiel au Maroc)."""
+    monkeypatch.setitem(CONFIG, 'conges', {**CONFIG.get('conges', {}), 'holidays_country': 'MA', 'calendriers': {}})
+    HOLIDAY_CACHE.invalidate()
+    alami = db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+    bennani = db_manager.ajouter_agent("Bennani", "Omar", "P2", "Technicien")
+
+    def conge(agent_id, type_conge, debut, fin, jours):
+        return db_manager.ajouter_conge(Conge(None, agent_id, type_conge, None, None, debut, fin, jours))
+    ids = {
+        'semaine': conge(alami, "Congé annuel", date(2025, 3, 10), date(2025, 3, 14), 5),
+        'jour': conge(bennani, "Congé annuel", date(2025, 3, 12), date(2025, 3, 12), 1),
+        'annule': conge(bennani, "Congé annuel", date(2025, 3, 11), date(2025, 3, 13), 3),
+        'maladie': conge(alami, "Congé de maladie", date(2025, 3, 3), date(2025, 3, 21), 15),
+        'suivant': conge(alami, "Congé annuel", date(2025, 3, 17), date(2025, 3, 21), 5),
+        'bornes': conge(bennani, "Congé annuel", date(2025, 3, 5), date(2025, 3, 11), 5),
+    }
+    db_manager.execute_query("UPDATE conges SET statut = 'Annulé' WHERE id = ?", (ids['annule'],))
+    return ids
+
+
+def _file(manager):
+    return {conge.id: jours for conge, jours in manager.get_conges_a_verifier()}
+
+
+def test_conges_annuels_actifs_couvrant_une_date(db_manager, conges):
+    trouves = {conge.id: calendrier for conge, calendrier in db_manager.get_active_annual_leaves_covering(date(2025, 3, 12))}
+    assert trouves == {conges['semaine']: None, conges['jour']: None}
+    # Bornes incluses
+    assert {c.id for c, _ in db_manager.get_active_annual_leaves_covering(date(2025, 3, 11))} == {conges['semaine'], conges['bornes']}
+    assert db_manager.get_active_annual_leaves_covering(date(2025, 3, 15)) == []
+
+
+def test_ajout_puis_suppression_d_un_jour_ferie(db_manager, conges, tmp_path):
+    manager = CongeManager(db_manager, str(tmp_path))
+    assert manager.add_holiday("2025-03-12", "Férié local", "Personnalisé")
+
+    attendu = {conges['semaine']: 4, conges['jour']: 0}
+    assert _file(manager) == attendu
+    # La file est en base : un nouveau gestionnaire (redémarrage) la retrouve
+    assert _file(CongeManager(db_manager, str(tmp_path))) == attendu
+
+    manager.delete_holiday("2025-03-12")
+    assert _file(manager) == {}
+
+
+def test_file_suit_les_modifications_des_conges(db_manager, conges, tmp_path):
+    manager = CongeManager(db_manager, str(tmp_path))
+    manager.add_holiday("2025-03-12", "Férié local", "Personnalisé")
+
+    # Congé supprimé : retiré de la file ; congé corrigé à la main : plus retourné
+    db_manager.execute_query("DELETE FROM conges WHERE id = ?", (conges['jour'],))
+    assert _file(manager) == {conges['semaine']: 4}
+    db_manager.update_conges_jours_pris([(conges['semaine'], 4)])
+    assert _file(manager) == {}
@@ -0,0 +1,47 @@
+import sys
+import os
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def db_manager(db_manager):
+    # Homonymes pour vérifier le départage par id en limite de page
+    for i in range(23):
+        db_manager.ajouter_agent(f"Nom{i % 7}", "Même" if i % 2 else f"Prénom{i}", f"P{i}", "Administrateur")
+    yield db_manager
+
+
+def test_pages_par_cle_parcourent_toute_la_liste(db_manager):
+    attendus = [a.id for a in db_manager.get_agents()]
+    vus, cle, totaux = [], None, set()
+    while True:
+        agents, total, cle = db_manager.get_agents_page(limit=5, after=cle)
+        if not agents:
+            break
+        totaux.add(total)
+        vus.extend(a.id for a in agents)
+    assert vus == attendus
+    assert totaux == {23}
+
+
+def test_total_de_la_recherche_dans_la_meme_requete(db_manager):
+    agents, total, _ = db_manager.get_agents_page(term="nom3", limit=2)
+    assert total == db_manager.get_agents_count("nom3") == 3
+    assert len(agents) == 2
+    assert db_manager.get_agents_page(term="inconnu", limit=2) == ([], 0, None)
+
+
+def test_page_vide_sans_seconde_requete(db_manager):
+    _, _, cle = db_manager.get_agents_page(limit=23)
+    requetes = []
+    db_manager.conn.set_trace_callback(requetes.append)
+    try:
+        assert db_manager.get_agents_page(limit=5, after=cle) == ([], 0, None)
+    finally:
+        db_manager.conn.set_trace_callback(None)
+    assert len([q for q in requetes if q.lstrip().upper().startswith("SELECT")]) == 1
+    assert "OFFSET" not in requetes[-1]
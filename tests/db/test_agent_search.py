@@ -0,0 +1,38 @@
+import sys
+import os
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def db_manager(db_manager):
+    db_manager.ajouter_agent("Benali", "Élodie", "AB1234", "Administrateur")
+    db_manager.ajouter_agent("Chraïbi", "Youssef", "CD5678", "Technicien")
+    yield db_manager
+
+
+def _noms(manager, term):
+    return [a.nom for a in manager.get_agents(term=term)]
+
+
+def test_recherche_insensible_aux_accents_et_par_prefixe(db_manager):
+    assert _noms(db_manager, "elodie") == ["Benali"]
+    assert _noms(db_manager, "ÉLO") == ["Benali"]
+    assert _noms(db_manager, "chrai") == ["Chraïbi"]
+    assert _noms(db_manager, "ab12") == ["Benali"]
+    assert _noms(db_manager, "benali youss") == []
+    assert db_manager.get_agents_count("b") == 1
+
+
+def test_index_suit_les_modifications_et_suppressions(db_manager):
+    agent_id = db_manager.get_agents(term="youssef")[0].id
+    db_manager.modifier_agent(agent_id, "Chraïbi", "Omar", "CD5678", "Technicien")
+    assert _noms(db_manager, "youssef") == []
+    assert _noms(db_manager, "omar") == ["Chraïbi"]
+
+    db_manager.supprimer_agent(agent_id)
+    assert _noms(db_manager, "omar") == []
+    assert db_manager.get_agents_count("omar") == 0
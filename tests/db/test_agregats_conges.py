@@ -0,0 +1,44 @@
+import sys
+import os
+from datetime import date
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from db.models import Conge
+
+RECALCUL = """
+    SELECT agent_id, CAST(substr(date_debut, 1, 4) AS INTEGER), type_conge, statut, COUNT(*), SUM(jours_pris)
+    FROM conges GROUP BY 1, 2, 3, 4 ORDER BY 1, 2, 3, 4
+"""
+
+
+def _agregats(manager):
+    return manager.execute_query("SELECT agent_id, annee, type_conge, statut, nb_conges, jours_pris FROM conges_agregats ORDER BY 1, 2, 3, 4", fetch="all")
+
+
+def test_agregats_tenus_a_jour(db_manager):
+    alami = db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+    bennani = db_manager.ajouter_agent("Bennani", "Omar", "P2", "Technicien")
+    c1 = db_manager.ajouter_conge(Conge(None, alami, "Congé annuel", None, None, date(2025, 3, 3), date(2025, 3, 7), 5))
+    c2 = db_manager.ajouter_conge(Conge(None, alami, "Congé annuel", None, None, date(2025, 7, 1), date(2025, 7, 10), 8))
+    db_manager.ajouter_conge(Conge(None, alami, "Congé annuel", None, None, date(2024, 12, 30), date(2025, 1, 3), 4))
+    db_manager.ajouter_conge(Conge(None, bennani, "Congé de maladie", None, None, date(2025, 2, 3), date(2025, 2, 4), 2))
+    assert db_manager.get_jours_pris_par_annee(alami) == {2024: 4, 2025: 13}
+
+    db_manager.update_conges_jours_pris([(c1, 4)])
+    db_manager.execute_query("UPDATE conges SET statut = 'Annulé' WHERE id = ?", (c2,))
+    assert db_manager.get_jours_pris_par_annee(alami) == {2024: 4, 2025: 4}
+    assert db_manager.get_jours_pris_par_annee(alami, statut="Annulé") == {2025: 8}
+
+    db_manager.supprimer_conge(c1)
+    assert db_manager.get_jours_pris_par_annee(alami) == {2024: 4}
+    assert _agregats(db_manager) == db_manager.execute_query(RECALCUL, fetch="all")
+
+    assert db_manager.get_statistiques_annee(2025) == [("Congé annuel", "Annulé", 1, 1, 8), ("Congé de maladie", "Actif", 1, 1, 2)]
+    assert db_manager.get_statistiques_par_grade(2025, "Congé de maladie") == [("Technicien", 1, 1, 2)]
+
+    db_manager.supprimer_agent(alami)
+    assert _agregats(db_manager) == [(bennani, 2025, "Congé de maladie", "Actif", 1, 2)]
+
@@ -0,0 +1,130 @@
+import sys
+import os
+import gzip
+import sqlite3
+import threading
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from db.backup import (sauvegarder_base, restaurer_base, verifier_sauvegarde, chemin_sauvegarde,
+                       decompresser_sauvegarde, version_schema_application)
+from db.pool import get_pool
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    chemin = str(tmp_path / "source.db")
+    conn = sqlite3.connect(chemin)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, valeur TEXT)")
+    conn.executemany("INSERT INTO t (valeur) VALUES (?)", [("x" * 500,) for _ in range(2000)])
+    conn.commit()
+    conn.close()
+    yield chemin
+    get_pool(chemin).close_all()
+
+
+def _lignes(chemin):
+    conn = sqlite3.connect(chemin)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("compresser", [False, True])
+def test_sauvegarde_par_lots_avec_progression(db_path, tmp_path, compresser):
+    destination = chemin_sauvegarde(db_path, "TEST", compresser)
+    etapes = []
+    sauvegarder_base(db_path, destination, pages_par_etape=50, pause_ms=0,
+                     progression=lambda etape, fait, total: etapes.append((etape, fait, total)))
+
+    copies = [e for e in etapes if e[0] == 'copie']
+    assert len(copies) > 5 and copies[-1][1] == copies[-1][2]
+    assert any(e[0] == 'compression' for e in etapes) == compresser
+    # Seul le fichier final subsiste dans le dossier des sauvegardes
+    assert os.listdir(os.path.dirname(destination)) == [os.path.basename(destination)]
+
+    if compresser:
+        with gzip.open(destination, "rb") as f:
+            assert f.read(16) == b"SQLite format 3\x00"
+    restauree = str(tmp_path / "restauree.db")
+    decompresser_sauvegarde(destination, restauree)
+    assert _lignes(restauree) == 2000
+
+
+def test_ecriture_concurrente_pendant_la_sauvegarde(db_path, tmp_path):
+    ecrivain = sqlite3.connect(db_path)
+    appels = []
+
+    def progression(etape, fait, total):
+        appels.append(fait)
+        # Écriture d'une autre connexion à chaque lot : la copie est reprise,
+        # puis faite en une seule étape au-delà du nombre de reprises toléré
+        if fait < total:
+            ecrivain.execute("INSERT INTO t (valeur) VALUES ('y')")
+            ecrivain.commit()
+
+    destination = str(tmp_path / "copie.db")
+    sauvegarder_base(db_path, destination, pages_par_etape=50, pause_ms=0, progression=progression)
+    ecrivain.close()
+    assert len(appels) > 3
+    assert _lignes(destination) == _lignes(db_path) > 2000
+
+
+def _restaurer_dans_un_thread(db_path, sauvegarde):
+    # Comme depuis l'interface : la restauration passe par la connexion d'un autre thread
+    resultat = []
+
+    def tache():
+        try:
+            resultat.append(restaurer_base(db_path, sauvegarde, pages_par_etape=20))
+        except Exception as e:
+            resultat.append(e)
+    thread = threading.Thread(target=tache)
+    thread.start()
+    thread.join(10)
+    return resultat[0]
+
+
+@pytest.fixture
+def base_ouverte(db_manager):
+    db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+    return db_manager
+
+
+def test_restauration_a_chaud_dans_la_base_ouverte(base_ouverte):
+    sauvegarde = chemin_sauvegarde(base_ouverte.db_file, compresser=True)
+    sauvegarder_base(base_ouverte.db_file, sauvegarde)
+    base_ouverte.ajouter_agent("Bennani", "Omar", "P2", "Technicien")
+    assert base_ouverte.get_agents_count() == 2
+
+    assert _restaurer_dans_un_thread(base_ouverte.db_file, sauvegarde) == version_schema_application()
+    # La connexion restée ouverte voit la base restaurée, sans reconnexion
+    assert [a.nom for a in base_ouverte.get_agents()] == ["Alami"]
+    base_ouverte.ajouter_agent("Chraibi", "Nadia", "P3", "Infirmier")
+    assert base_ouverte.get_agents_count() == 2
+    assert not [f for f in os.listdir(os.path.dirname(base_ouverte.db_file)) if f.endswith(".tmp")]
+
+
+def test_sauvegarde_invalide_refusee_sans_toucher_a_la_base(base_ouverte, tmp_path):
+    corrompue = str(tmp_path / "corrompue.db")
+    with open(corrompue, "wb") as f:
+        f.write(b"pas une base SQLite" * 100)
+    assert isinstance(_restaurer_dans_un_thread(base_ouverte.db_file, corrompue), ValueError)
+
+    future = str(tmp_path / "future.db")
+    sauvegarder_base(base_ouverte.db_file, future)
+    conn = sqlite3.connect(future)
+    conn.execute("INSERT INTO db_version (version) VALUES (?)", (version_schema_application() + 1,))
+    conn.commit()
+    conn.close()
+    with pytest.raises(ValueError):
+        verifier_sauvegarde(future)
+    assert isinstance(_restaurer_dans_un_thread(base_ouverte.db_file, future), ValueError)
+
+    assert base_ouverte.get_agents_count() == 1
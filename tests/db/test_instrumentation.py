@@ -0,0 +1,59 @@
+import sys
+import os
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from db.instrumentation import QUERY_STATS, normaliser_requete
+from utils.config_loader import CONFIG
+
+
+@pytest.fixture
+def db_manager(db_manager):
+    for i in range(3):
+        db_manager.ajouter_agent(f"Nom{i}", "Prénom", f"P{i}", "Administrateur")
+    QUERY_STATS.reset()
+    yield db_manager
+    QUERY_STATS.reset()
+
+
+def test_normalisation_des_listes_in():
+    assert normaliser_requete("SELECT *\n  FROM t WHERE id IN (?,?, ?)") == "SELECT * FROM t WHERE id IN (?, ...)"
+
+
+def test_desactivee_par_defaut(db_manager, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'db', {'instrumentation': {'enabled': False}})
+    db_manager.get_agents()
+    assert QUERY_STATS.stats() == []
+
+
+def test_statistiques_et_requetes_lentes(db_manager, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'db', {'instrumentation': {'enabled': True, 'slow_query_ms': 0}})
+    for _ in range(4):
+        db_manager.get_agent_by_id(1)
+    list(db_manager.iter_agents())
+
+    stats = {s['requete']: s for s in QUERY_STATS.stats()}
+    stat = stats["SELECT id, nom, prenom, ppr, grade, calendrier FROM agents WHERE id=?"]
+    assert stat['appels'] == 4
+    assert stat['p50_ms'] <= stat['p95_ms'] <= stat['max_ms']
+    assert stat['origines'][0] == ("tests/db/test_instrumentation.py:test_statistiques_et_requetes_lentes", 4)
+    assert any("IN (?, ...)" in requete for requete in stats)
+
+    # Seuil à 0 ms : toutes les lectures sont journalisées avec leur plan d'exécution
+    lente = QUERY_STATS.requetes_lentes()[0]
+    assert lente['requete'].startswith("SELECT id, nom, prenom, ppr, grade, calendrier FROM agents")
+    assert any("idx_agents_nom_prenom" in ligne for ligne in lente['plan'])
+
+
+def test_ecritures_groupees_des_jours_feries_mesurees(db_manager, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'db', {'instrumentation': {'enabled': True, 'slow_query_ms': 1000}})
+    db_manager.add_holidays_bulk([("2025-05-02", "Pont")], "Personnalisé")
+    db_manager.store_official_holidays("MA", 2025, 2025, [("MA", "2025-01-01", "Nouvel An")])
+
+    requetes = [s['requete'] for s in QUERY_STATS.stats()]
+    assert any(r.startswith("INSERT OR IGNORE INTO jours_feries_personnalises") for r in requetes)
+    assert any(r.startswith("INSERT OR REPLACE INTO jours_feries_officiels") for r in requetes)
+    assert any(r.startswith("REPLACE INTO jours_feries_officiels_plages") for r in requetes)
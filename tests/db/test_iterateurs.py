@@ -0,0 +1,54 @@
+import sys
+import os
+from datetime import date
+import openpyxl
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from db.models import Conge
+from utils.file_utils import export_all_conges_to_excel, export_agents_to_excel
+from utils.config_loader import CONFIG
+
+
+@pytest.fixture
+def db_manager(db_manager):
+    db_manager.set_annee_exercice(2025)
+    for i in range(5):
+        agent_id = db_manager.ajouter_agent(f"Nom{i}", "Prénom", f"P{i}", "Administrateur")
+        db_manager.execute_query("INSERT INTO soldes_annuels (agent_id, annee, solde, statut) VALUES (?, 2025, ?, 'Actif')", (agent_id, 10 + i))
+        db_manager.ajouter_conge(Conge(None, agent_id, "Congé annuel", None, None, date(2025, 3, 3 + i), date(2025, 3, 10 + i), 5))
+        db_manager.ajouter_conge(Conge(None, agent_id, "Congé de maladie", None, 1, date(2024, 12, 31), date(2025, 1, 2), 2))
+    yield db_manager
+
+
+def test_iter_agents_par_paquets_avec_soldes(db_manager):
+    agents = list(db_manager.iter_agents(arraysize=2))
+    assert [a.nom for a in agents] == [a.nom for a in db_manager.get_agents()]
+    assert [a.get_solde_total_actif() for a in agents] == [10, 11, 12, 13, 14]
+
+
+def test_iter_conges_filtres(db_manager):
+    annuels = list(db_manager.iter_conges(type_conge="Congé annuel", statut="Actif", annee=2025, arraysize=2))
+    assert len(annuels) == 5
+    assert [c.date_debut for c in annuels] == sorted((c.date_debut for c in annuels), reverse=True)
+    assert len(list(db_manager.iter_conges(annee=2024))) == 5
+    assert len(list(db_manager.iter_conges(agent_id=1))) == 2
+
+
+def test_exports_en_flux(db_manager, tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'db', {'arraysize': 3})
+    chemin = str(tmp_path / "export" / "conges.xlsx")
+    export_all_conges_to_excel(db_manager.db_file, str(tmp_path / "certificats"), chemin)
+    lignes = list(openpyxl.load_workbook(chemin).active.iter_rows(values_only=True))
+    assert len(lignes) == 11
+    assert lignes[0] == ("Nom Agent", "Prénom Agent", "PPR Agent", "Type Congé", "Début", "Fin", "Jours Pris", "Statut", "Justification", "Intérimaire")
+    assert sum(1 for ligne in lignes if ligne[9] == "Nom0 Prénom") == 5
+
+    chemin = str(tmp_path / "export" / "agents.xlsx")
+    export_agents_to_excel(db_manager.db_file, str(tmp_path / "certificats"), chemin)
+    ws = openpyxl.load_workbook(chemin).active
+    assert ws.max_row == 6
+    assert ws.column_dimensions["B"].width == len("Nom0") + 2
@@ -0,0 +1,51 @@
+import sys
+import os
+from datetime import date
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from db.models import Conge
+from utils.date_utils import jour_julien
+
+
+@pytest.fixture
+def agent_id(db_manager):
+    return db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+
+
+def _jours(db_manager, conge_id):
+    return db_manager.execute_query("SELECT jour_debut, jour_fin FROM conges WHERE id = ?", (conge_id,), fetch="one")
+
+
+@pytest.mark.parametrize("debut, fin", [
+    (date(2025, 3, 3), date(2025, 3, 7)),
+    (date(2024, 2, 28), date(2024, 3, 1)),   # Année bissextile
+    (date(2024, 12, 30), date(2025, 1, 2)),  # Changement d'année
+    (date(1999, 12, 31), date(2000, 1, 1)),
+])
+def test_jours_renseignes_a_l_insertion(db_manager, agent_id, debut, fin):
+    conge_id = db_manager.ajouter_conge(Conge(None, agent_id, "Congé annuel", None, None, debut, fin, 1))
+    assert _jours(db_manager, conge_id) == (jour_julien(debut), jour_julien(fin))
+
+
+def test_jours_suivent_la_modification_des_dates(db_manager, agent_id):
+    conge_id = db_manager.ajouter_conge(Conge(None, agent_id, "Congé annuel", None, None, date(2025, 3, 3), date(2025, 3, 7), 5))
+
+    db_manager.execute_query("UPDATE conges SET date_fin = ? WHERE id = ?", ("2025-03-14", conge_id))
+    assert _jours(db_manager, conge_id) == (jour_julien(date(2025, 3, 3)), jour_julien(date(2025, 3, 14)))
+
+    db_manager.execute_query("UPDATE conges SET date_debut = ?, date_fin = ? WHERE id = ?", ("2026-01-05", "2026-01-09", conge_id))
+    assert _jours(db_manager, conge_id) == (jour_julien(date(2026, 1, 5)), jour_julien(date(2026, 1, 9)))
+
+    # Une modification sans rapport avec les dates ne change rien
+    db_manager.execute_query("UPDATE conges SET jours_pris = 3 WHERE id = ?", (conge_id,))
+    assert _jours(db_manager, conge_id) == (jour_julien(date(2026, 1, 5)), jour_julien(date(2026, 1, 9)))
+
+
+def test_jour_julien_identique_a_sqlite(db_manager):
+    for jour in [date(1970, 1, 1), date(2000, 2, 29), date(2025, 6, 15), date(2099, 12, 31)]:
+        sql = db_manager.execute_query("SELECT CAST(julianday(date(?)) AS INTEGER)", (jour.isoformat(),), fetch="one")[0]
+        assert sql == jour_julien(jour)
@@ -0,0 +1,52 @@
+import sys
+import os
+from datetime import date
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+import db.database
+from db.database import DatabaseManager
+from db.backup import version_schema_application
+from utils.date_utils import ensure_official_holidays
+
+MIGRATIONS = os.path.join(os.path.dirname(db.database.__file__), "migrations")
+
+
+@pytest.fixture
+def base_heritee(tmp_path, monkeypatch):
+    """Base de la version d'origine : schéma 001 puis migration des soldes hérités (versions 1 et 2)."""
+    monkeypatch.setattr(db.database.messagebox, "showinfo", lambda *a, **k: None)
+    manager = DatabaseManager(str(tmp_path / "heritee.db"))
+    assert manager.connect()
+    manager.execute_query("CREATE TABLE db_version (version INTEGER PRIMARY KEY)")
+    manager.execute_query("CREATE TABLE system_config (config_key TEXT PRIMARY KEY NOT NULL, config_value TEXT NOT NULL)")
+    with open(os.path.join(MIGRATIONS, "001_refonte_soldes.sql"), encoding="utf-8") as f:
+        manager.conn.executescript(f.read())
+    manager.execute_query("REPLACE INTO db_version (version) VALUES (1)")
+    manager.conn.executescript("""
+        ALTER TABLE agents ADD COLUMN solde REAL;
+        INSERT INTO agents (id, nom, prenom, ppr, grade, solde) VALUES (1, 'Alami', 'Sara', 'P1', 'Administrateur', 12);
+    """)
+    manager.set_annee_exercice(2025)
+    manager._handle_data_migration_from_legacy()
+    yield manager
+    manager.close_all_connections()
+
+
+def test_mise_a_niveau_d_une_base_heritee(base_heritee):
+    assert [r[0] for r in base_heritee.execute_query("SELECT version FROM db_version ORDER BY version", fetch="all")] == [1, 2]
+
+    base_heritee.run_migrations()
+
+    assert base_heritee.execute_query("SELECT MAX(version) FROM db_version", fetch="one")[0] == version_schema_application()
+    tables = {r[0] for r in base_heritee.execute_query("SELECT name FROM sqlite_master WHERE type = 'table'", fetch="all")}
+    assert {'jours_feries_officiels', 'jours_feries_officiels_plages'} <= tables
+    assert base_heritee.execute_query("SELECT annee, solde FROM soldes_annuels WHERE agent_id = 1", fetch="all") == [(2025, 12.0)]
+
+    pytest.importorskip("holidays")
+    ensure_official_holidays(base_heritee, 'MA', 2025, 2025)
+    assert base_heritee.get_official_holidays_range('MA') == (2025, 2025)
+    assert base_heritee.get_holiday_dates_between('MA', "2025-01-01", "2025-01-01") == [(date(2025, 1, 1).isoformat(),)]
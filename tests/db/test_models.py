@@ -0,0 +1,52 @@
+import sys
+import os
+from datetime import date, datetime
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from db.models import Agent, AgentRow, Conge, SoldeAnnuel, _texte_partage
+from core.constants import SoldeStatus
+
+
+def test_conge_dates_decodees_au_premier_acces():
+    conge = Conge.from_db_row((1, 2, " Congé annuel ", None, None, "2025-03-03", "03/04/2025", 5, None))
+    assert conge._date_debut == "2025-03-03"
+    assert conge.date_debut == datetime(2025, 3, 3)
+    assert conge._date_debut == datetime(2025, 3, 3)
+    assert conge.date_fin == datetime(2025, 4, 3)
+    assert (conge.type_conge, conge.justif, conge.statut) == ("Congé annuel", "", "Actif")
+
+
+def test_conge_construit_depuis_des_dates_ou_du_texte():
+    conge = Conge(None, 1, "Congé annuel", None, None, date(2025, 3, 3), "", 5)
+    assert conge.date_debut == datetime(2025, 3, 3)
+    assert conge.date_fin is None
+    conge.date_fin = "2025-03-07"
+    assert conge.date_fin == datetime(2025, 3, 7)
+    # Même texte lu deux fois : une seule chaîne partagée
+    autre = Conge.from_db_row((2, 1, "Congé annuel", "", None, "2025-03-03", "2025-03-07", 5, "Actif"))
+    assert autre.type_conge is conge.type_conge
+
+
+def test_seuls_les_textes_a_faible_cardinalite_sont_partages():
+    _texte_partage.cache_clear()
+    agents = [Agent.from_db_row((i, "Alami", "Sara", f"P{i}", " Administrateur ", "MA")) for i in range(3)]
+    assert agents[0].grade is agents[2].grade == "Administrateur"
+    for jour in range(1, 29):
+        Conge.from_db_row((jour, 1, "Congé annuel", None, None, f"2025-02-{jour:02d}", f"2025-02-{jour:02d}", 1, "Actif"))
+    # Les dates, trop nombreuses, ne remplissent pas le cache des textes partagés
+    assert _texte_partage.cache_info().currsize == 4
+
+
+def test_modeles_sans_dictionnaire_d_instance():
+    solde = SoldeAnnuel.from_db_row((1, 1, 2025, "10", "Expiré"))
+    agent = Agent.from_db_row((1, "Alami", "Sara", "P1", "Administrateur"))
+    for objet in (solde, agent, Conge(None, 1, "Congé annuel", None, None, None, None, 0)):
+        assert not hasattr(objet, "__dict__")
+        with pytest.raises(AttributeError):
+            objet.attribut_inconnu = 1
+    assert solde.statut is SoldeStatus.EXPIRE and solde.solde == 10.0
+    assert str(AgentRow(1, "Alami", "Sara", "P1", "Administrateur")) == str(agent)
@@ -0,0 +1,106 @@
+import sys
+import os
+import sqlite3
+from datetime import date
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from core.conges.manager import CongeManager
+from utils.date_utils import jour_julien
+
+
+@pytest.fixture
+def db_manager(db_manager):
+    db_manager.set_annee_exercice(2025)
+    yield db_manager
+
+
+def _mouvements(manager, agent_id):
+    return manager.execute_query("SELECT annee, delta, delta_actif, solde_apres, motif FROM mouvements_soldes WHERE agent_id = ? ORDER BY id", (agent_id,), fetch="all")
+
+
+def test_registre_alimente_avec_le_motif_de_l_operation(db_manager, tmp_path):
+    manager = CongeManager(db_manager, str(tmp_path))
+    agent_id = db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+    db_manager.create_solde_annuel(agent_id, 2024, 4, 'Actif')
+    db_manager.create_solde_annuel(agent_id, 2025, 22, 'Actif')
+
+    with db_manager.transaction():
+        manager._debiter_solde(agent_id, 6, "Débit test")
+    manager.save_manual_soldes(agent_id, {}, {2023: 3})
+
+    assert _mouvements(db_manager, agent_id) == [
+        (2024, 4, 4, 4, 'Création'),
+        (2025, 22, 22, 22, 'Création'),
+        (2024, -4, -4, 0, 'Débit test'),
+        (2025, -2, -2, 20, 'Débit test'),
+        (2023, 3, 3, 3, 'Saisie manuelle'),
+    ]
+    # Hors opération, le motif est remis à zéro
+    assert db_manager.execute_query("SELECT motif FROM mouvements_contexte", fetch="one")[0] is None
+
+    # Expiration : le solde ne change pas mais sort du total actif
+    db_manager.expirer_soldes_annee(2023)
+    assert _mouvements(db_manager, agent_id)[-1] == (2023, 0, -3, 3, 'Modification')
+    assert db_manager.get_solde_a_date(agent_id, date.today()) == 20
+
+
+def test_registre_en_ajout_seul(db_manager):
+    agent_id = db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+    db_manager.create_solde_annuel(agent_id, 2025, 22, 'Actif')
+    with pytest.raises(sqlite3.IntegrityError):
+        db_manager.execute_query("UPDATE mouvements_soldes SET delta = 0")
+    with pytest.raises(sqlite3.IntegrityError):
+        db_manager.execute_query("DELETE FROM mouvements_soldes")
+
+
+def test_solde_a_date_instantane_plus_mouvements_suivants(db_manager):
+    agent_id = db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+    autre_id = db_manager.ajouter_agent("Bennani", "Omar", "P2", "Technicien")
+
+    def mouvement(jour, delta):
+        return db_manager.execute_query(
+            "INSERT INTO mouvements_soldes (agent_id, solde_id, annee, jour, delta, delta_actif, solde_apres, statut_apres, motif) "
+            "VALUES (?, 0, 2024, ?, ?, ?, 0, 'Actif', 'Historique')", (agent_id, jour_julien(jour), delta, delta))
+
+    mouvement(date(2024, 6, 1), 22)
+    mouvement(date(2024, 9, 2), -5)
+    dernier = mouvement(date(2024, 12, 31), -2)
+    db_manager.execute_query("INSERT INTO snapshots_soldes (agent_id, jour, mouvement_id, solde_total) VALUES (?, ?, ?, 15)",
+                             (agent_id, jour_julien(date(2024, 12, 31)), dernier))
+    mouvement(date(2025, 2, 3), -3)
+
+    attendus = {date(2024, 5, 31): 0, date(2024, 8, 1): 22, date(2024, 12, 31): 15, date(2025, 1, 15): 15, date(2025, 3, 1): 12}
+    for jour, solde in attendus.items():
+        assert db_manager.get_solde_a_date(agent_id, jour) == solde
+        soldes = {r[0]: r[5] for r in db_manager.iter_soldes_a_date(jour)}
+        assert soldes == {agent_id: solde, autre_id: 0}
+
+
+def test_snapshot_periodique(db_manager, tmp_path):
+    manager = CongeManager(db_manager, str(tmp_path))
+    agent_id = db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+    db_manager.create_solde_annuel(agent_id, 2025, 22, 'Actif')
+
+    assert manager.snapshot_soldes_si_necessaire(date(2025, 1, 1))
+    assert db_manager.get_dernier_snapshot() == date(2025, 1, 1)
+    assert not manager.snapshot_soldes_si_necessaire(date(2025, 1, 20))
+    assert manager.snapshot_soldes_si_necessaire(date(2025, 2, 15))
+    assert db_manager.execute_query("SELECT COUNT(*) FROM snapshots_soldes WHERE agent_id = ?", (agent_id,), fetch="one")[0] == 2
+
+
+def test_cloture_inscrite_au_registre_avec_instantane(db_manager, tmp_path):
+    manager = CongeManager(db_manager, str(tmp_path))
+    agent_id = db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+    db_manager.create_solde_annuel(agent_id, 2023, 5, 'Actif')
+
+    manager.effectuer_glissement_annuel()
+
+    motifs = [m[4] for m in _mouvements(db_manager, agent_id)]
+    assert motifs == ['Création', "Clôture de l'exercice 2025", "Clôture de l'exercice 2025"]
+    assert db_manager.get_dernier_snapshot() == date.today()
+    assert db_manager.get_solde_a_date(agent_id, date.today()) == 22
+    assert db_manager.get_soldes_annuels_a_date(agent_id, date.today()) == [(2023, 5, 'Expiré'), (2026, 22, 'Actif')]
@@ -0,0 +1,55 @@
+import sys
+import os
+import threading
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from db.database import DatabaseManager
+from db.pool import get_performance_profile
+from utils.config_loader import CONFIG
+
+
+def test_connexion_en_wal_lecteur_ne_bloque_pas_l_ecrivain(tmp_path):
+    db_path = str(tmp_path / "perf.db")
+    ecrivain = DatabaseManager(db_path)
+    assert ecrivain.connect()
+    lecture_ouverte, ecriture_faite, resultats = threading.Event(), threading.Event(), []
+
+    def lecteur():
+        # Connexion propre au thread, avec une transaction de lecture ouverte
+        db = DatabaseManager(db_path)
+        db.connect()
+        try:
+            db.conn.execute("BEGIN")
+            resultats.append(db.conn.execute("SELECT COUNT(*) FROM t").fetchone()[0])
+            lecture_ouverte.set()
+            ecriture_faite.wait(5)
+            resultats.append(db.conn.execute("SELECT COUNT(*) FROM t").fetchone()[0])
+            db.conn.rollback()
+            resultats.append(db.conn.execute("SELECT COUNT(*) FROM t").fetchone()[0])
+        finally:
+            db.close()
+
+    try:
+        assert ecrivain.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert ecrivain.conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        ecrivain.execute_query("CREATE TABLE t (x INTEGER)")
+
+        thread = threading.Thread(target=lecteur)
+        thread.start()
+        assert lecture_ouverte.wait(5)
+        ecrivain.execute_query("INSERT INTO t VALUES (1)")
+        ecriture_faite.set()
+        thread.join(5)
+        assert resultats == [0, 0, 1]
+    finally:
+        ecrivain.close_all_connections()
+
+
+def test_profil_invalide_refuse(monkeypatch):
+    monkeypatch.setitem(CONFIG, 'db', {'performance': {'synchronous': 'PARFOIS'}})
+    with pytest.raises(ValueError):
+        get_performance_profile()
@@ -0,0 +1,59 @@
+import sys
+import os
+import threading
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from db.pool import ConnectionPool
+
+
+def _dans_un_thread(fonction):
+    resultat = []
+    thread = threading.Thread(target=lambda: resultat.append(fonction()))
+    thread.start()
+    thread.join(5)
+    return resultat[0]
+
+
+def test_une_connexion_par_thread_reutilisee_entre_taches(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    conn = pool.checkout()
+    assert pool.checkout() is conn
+    pool.checkin(conn)
+
+    # Un autre thread ne reçoit pas la connexion encore empruntée
+    autre = _dans_un_thread(lambda: pool.checkout())
+    assert autre is not conn
+
+    pool.checkin(conn)
+    assert pool.stats()['idle'] == 1
+
+    def tache():
+        c = pool.checkout()
+        pool.checkin(c)
+        return c
+    assert _dans_un_thread(tache) is conn
+    assert pool.stats()['reused'] == 1
+    pool.close_all()
+
+
+def test_transaction_annulee_et_connexion_invalide_ecartee(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    conn = pool.checkout()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.execute("INSERT INTO t VALUES (1)")
+    assert conn.in_transaction
+    pool.checkin(conn)
+
+    conn = pool.checkout()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.checkin(conn)
+
+    conn.close()
+    nouvelle = pool.checkout()
+    assert nouvelle is not conn
+    assert pool.stats()['created'] == 2
+    pool.checkin(nouvelle)
+    pool.close_all()
@@ -0,0 +1,102 @@
+import sys
+import os
+import re
+from datetime import date
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+import db.database
+from db.database import DatabaseManager
+from db.models import Conge
+
+
+@pytest.fixture
+def db_manager(db_manager):
+    agent_id = db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+    db_manager.execute_query("INSERT INTO soldes_annuels (agent_id, annee, solde, statut) VALUES (?, 2025, 22, 'Actif')", (agent_id,))
+    db_manager.ajouter_conge(Conge(None, agent_id, "Congé annuel", None, None, date(2025, 3, 3), date(2025, 3, 7), 5))
+    db_manager.ajouter_conge(Conge(None, agent_id, "Congé de maladie", None, None, date(2025, 4, 1), date(2025, 4, 2), 2))
+    yield db_manager
+
+
+def _plans(manager, appel):
+    """Exécute l'appel et retourne, pour chaque SELECT émis, la requête et son plan d'exécution."""
+    requetes = []
+    manager.conn.set_trace_callback(requetes.append)
+    try:
+        appel()
+    finally:
+        manager.conn.set_trace_callback(None)
+    return [(q, [r[3] for r in manager.conn.execute("EXPLAIN QUERY PLAN " + q)])
+            for q in requetes if q.lstrip().upper().startswith("SELECT")]
+
+
+# (méthode de lecture, index attendu dans le plan)
+CAS = [
+    (lambda m: m.get_conges(), "idx_conges_date_debut"),
+    (lambda m: m.get_conges(1), "idx_conges_agent_date_debut"),
+    (lambda m: m.get_overlapping_leaves(1, date(2025, 3, 1), date(2025, 3, 31), 99), "idx_conges_agent_statut_jours"),
+    (lambda m: m.get_active_annual_leaves_covering(date(2025, 3, 4)), "idx_conges_type_statut_jours"),
+    (lambda m: m.get_active_annual_leaves_between(date(2025, 1, 1), date(2025, 12, 31)), "idx_conges_type_statut_jours"),
+    (lambda m: m.get_sick_leaves_by_status("manquant"), "idx_conges_type_statut_debut"),
+    (lambda m: m.get_sick_leaves_by_status("justifie"), "idx_conges_type_statut_debut"),
+    (lambda m: m.get_sick_leaves_by_status("tous"), "idx_conges_type_statut_debut"),
+    (lambda m: m.get_agents_on_leave_today(), "idx_conges_statut_jours"),
+    (lambda m: m.get_soldes_by_status("Expiré"), "idx_soldes_statut"),
+    (lambda m: m.get_agents(), "idx_agents_nom_prenom"),
+    (lambda m: m.get_agents(), "idx_soldes_agent_annee"),
+    # Total par fenêtre COUNT(*) OVER () : la recherche entière est lue, le résumé par sa clé
+    (lambda m: m.get_agents_page(limit=50, after=("Alami", "Sara", 1)), "SEARCH r USING INTEGER PRIMARY KEY"),
+    (lambda m: m.get_agents_page(tri="solde_total", descendant=True, after=(22.0, 1)), "SEARCH r USING INTEGER PRIMARY KEY"),
+    (lambda m: m.get_agents_page(solde_min=40), "idx_resume_solde_total"),
+    (lambda m: m.get_agents(term="ala"), "agents_fts"),
+    (lambda m: m.get_agents_count(term="ala"), "agents_fts"),
+    (lambda m: m.get_agent_by_id(1), "idx_soldes_agent_annee"),
+    (lambda m: m.get_agents_calendriers(), "idx_agents_calendrier"),
+    (lambda m: m.get_jours_pris_par_annee(1), "PRIMARY KEY"),
+    (lambda m: m.get_statistiques_annee(2025), "idx_agregats_annee"),
+    (lambda m: m.get_statistiques_par_grade(2025), "idx_agregats_annee"),
+]
+
+
+@pytest.mark.parametrize("appel, index", CAS)
+def test_requete_utilise_l_index(db_manager, appel, index):
+    plans = _plans(db_manager, lambda: appel(db_manager))
+    assert plans
+    assert any(index in ligne for _, plan in plans for ligne in plan), plans
+
+
+@pytest.mark.parametrize("appel, _index", CAS)
+def test_aucun_parcours_complet_des_conges_et_soldes(db_manager, appel, _index):
+    for requete, plan in _plans(db_manager, lambda: appel(db_manager)):
+        for ligne in plan:
+            # "SCAN conges USING INDEX ..." (parcours ordonné) est accepté, pas un parcours de table brut
+            assert not re.fullmatch(r"SCAN (conges|c|soldes_annuels|s)", ligne), (requete, plan)
+
+
+def test_doublons_de_soldes_fusionnes_par_la_migration(tmp_path, monkeypatch):
+    monkeypatch.setattr(db.database.messagebox, "showinfo", lambda *a, **k: None)
+    manager = DatabaseManager(str(tmp_path / "doublons.db"))
+    assert manager.connect()
+    try:
+        # Base antérieure à l'index unique, avec un solde en double
+        manager.execute_query("CREATE TABLE db_version (version INTEGER PRIMARY KEY)")
+        with open(os.path.join(os.path.dirname(db.database.__file__), "migrations", "001_refonte_soldes.sql"), encoding="utf-8") as f:
+            manager.conn.executescript(f.read())
+        manager.execute_query("REPLACE INTO db_version (version) VALUES (5)")
+        manager.conn.executescript("""
+            ALTER TABLE conges ADD COLUMN jour_debut INTEGER;
+            ALTER TABLE conges ADD COLUMN jour_fin INTEGER;
+            ALTER TABLE agents ADD COLUMN calendrier TEXT;
+            INSERT INTO agents (id, nom, prenom, ppr, grade) VALUES (1, 'A', 'B', 'P1', 'G');
+            INSERT INTO soldes_annuels (agent_id, annee, solde, statut) VALUES (1, 2025, 10, 'Actif'), (1, 2025, 5, 'Actif'), (1, 2024, 3, 'Actif');
+        """)
+        manager.run_migrations()
+
+        rows = manager.execute_query("SELECT annee, solde FROM soldes_annuels WHERE agent_id = 1 ORDER BY annee", fetch="all")
+        assert rows == [(2024, 3.0), (2025, 15.0)]
+    finally:
+        manager.close()
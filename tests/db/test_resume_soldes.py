@@ -0,0 +1,61 @@
+import sys
+import os
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def db_manager(db_manager):
+    db_manager.set_annee_exercice(2025)
+    yield db_manager
+
+
+def _resume(manager, agent_id):
+    return manager.execute_query("SELECT solde_total, solde_n, solde_n1, solde_n2 FROM agents_soldes_resume WHERE agent_id = ?", (agent_id,), fetch="one")
+
+
+def test_resume_tenu_a_jour_par_les_declencheurs(db_manager):
+    agent_id = db_manager.ajouter_agent("Alami", "Sara", "P1", "Administrateur")
+    assert _resume(db_manager, agent_id) == (0, 0, 0, 0)
+
+    for annee, solde in ((2023, 4), (2024, 6), (2025, 22)):
+        db_manager.create_solde_annuel(agent_id, annee, solde, 'Actif')
+    assert _resume(db_manager, agent_id) == (32, 22, 6, 4)
+
+    db_manager.execute_query("UPDATE soldes_annuels SET statut = 'Expiré' WHERE agent_id = ? AND annee = 2023", (agent_id,))
+    db_manager.execute_query("UPDATE soldes_annuels SET solde = 20 WHERE agent_id = ? AND annee = 2025", (agent_id,))
+    assert _resume(db_manager, agent_id) == (26, 20, 6, 0)
+
+    # Changement d'exercice : les colonnes N, N-1, N-2 glissent
+    db_manager.set_annee_exercice(2026)
+    assert _resume(db_manager, agent_id) == (26, 0, 20, 6)
+
+    db_manager.execute_query("DELETE FROM soldes_annuels WHERE agent_id = ? AND annee = 2024", (agent_id,))
+    assert _resume(db_manager, agent_id) == (20, 0, 20, 0)
+
+    db_manager.supprimer_agent(agent_id)
+    assert _resume(db_manager, agent_id) is None
+
+
+def test_tri_et_filtre_sur_le_solde_pour_toute_la_liste(db_manager):
+    for i, solde in enumerate([10, 45, 30, 60, 41, 5]):
+        agent_id = db_manager.ajouter_agent(f"Nom{i}", "Prénom", f"P{i}", "Administrateur")
+        db_manager.create_solde_annuel(agent_id, 2025, solde, 'Actif')
+
+    soldes, cle, totaux = [], None, set()
+    while True:
+        agents, total, cle = db_manager.get_agents_page(limit=4, after=cle, tri='solde_total', descendant=True)
+        if not agents:
+            break
+        totaux.add(total)
+        soldes.extend(a.resume_soldes.total for a in agents)
+    assert soldes == [60, 45, 41, 30, 10, 5]
+    assert totaux == {6}
+
+    agents, total, _ = db_manager.get_agents_page(limit=2, solde_min=40)
+    assert total == 3 == db_manager.get_agents_count(solde_min=40)
+    assert [a.nom for a in agents] == ["Nom1", "Nom3"]
+    assert [a.nom for a in db_manager.get_agents(tri='solde_n', solde_min=40)] == ["Nom4", "Nom1", "Nom3"]
@@ -0,0 +1,73 @@
+import sys
+import os
+import sqlite3
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from db.database import DatabaseManager
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "tx.db"))
+    assert manager.connect()
+    manager.execute_query("CREATE TABLE t (x INTEGER UNIQUE)")
+    yield manager
+    manager.close()
+
+
+def _valeurs(manager):
+    return [r[0] for r in manager.execute_query("SELECT x FROM t ORDER BY x", fetch="all")]
+
+
+def test_une_seule_validation_par_portee(db_manager):
+    instructions = []
+    db_manager.conn.set_trace_callback(instructions.append)
+    with db_manager.transaction():
+        db_manager.execute_query("INSERT INTO t VALUES (1)")
+        db_manager.execute_many("INSERT INTO t VALUES (?)", [(2,), (3,)])
+        assert db_manager.conn.in_transaction
+    db_manager.conn.set_trace_callback(None)
+
+    assert [i for i in instructions if i.startswith("COMMIT")] == ["COMMIT"]
+    assert _valeurs(db_manager) == [1, 2, 3]
+
+
+def test_exception_annule_toute_la_portee(db_manager):
+    with pytest.raises(ValueError), db_manager.transaction():
+        db_manager.execute_query("INSERT INTO t VALUES (1)")
+        raise ValueError("échec métier")
+    assert _valeurs(db_manager) == []
+    assert not db_manager.conn.in_transaction
+
+
+def test_portee_imbriquee_annulee_seule(db_manager):
+    with db_manager.transaction():
+        db_manager.execute_query("INSERT INTO t VALUES (1)")
+        with pytest.raises(sqlite3.IntegrityError), db_manager.transaction():
+            db_manager.execute_query("INSERT INTO t VALUES (2)")
+            db_manager.execute_query("INSERT INTO t VALUES (1)")
+        db_manager.execute_query("INSERT INTO t VALUES (3)")
+    assert _valeurs(db_manager) == [1, 3]
+
+
+def test_portee_partagee_par_les_gestionnaires_d_un_meme_thread(db_manager):
+    # Deux gestionnaires du même thread partagent la connexion du pool, donc la portée
+    autre = DatabaseManager(db_manager.db_file)
+    assert autre.connect()
+    assert autre.conn is db_manager.conn
+    try:
+        with pytest.raises(ValueError), db_manager.transaction():
+            autre.execute_query("INSERT INTO t VALUES (1)")
+            # Portée imbriquée ouverte par l'autre gestionnaire : SAVEPOINT, pas un second BEGIN
+            with autre.transaction():
+                db_manager.execute_query("INSERT INTO t VALUES (2)")
+            assert db_manager.conn.in_transaction
+            raise ValueError("échec métier")
+        assert _valeurs(db_manager) == []
+        assert db_manager._tx_depth == autre._tx_depth == 0
+    finally:
+        autre.close()
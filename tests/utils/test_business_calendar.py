@@ -0,0 +1,58 @@
+import sys
+import os
+from datetime import date, datetime, timedelta
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from utils.business_calendar import BusinessCalendar
+from utils.date_utils import jours_ouvres, ajouter_jours_ouvres, calculate_reprise_date
+
+
+# --- Données de test réutilisables ---
+HOLIDAYS_SET_FIXTURE = {
+    date(2024, 1, 1),   # Un lundi
+    date(2024, 8, 19),  # Un lundi
+    date(2024, 8, 24),  # Un samedi
+    date(2024, 12, 31), # Un mardi
+    date(2025, 1, 1),   # Un mercredi
+}
+
+
+def _calendar():
+    return BusinessCalendar(HOLIDAYS_SET_FIXTURE, 2024, 2024)
+
+
+def test_jours_ouvres_identique_au_calcul_lineaire():
+    calendar = _calendar()
+    start = date(2023, 12, 20)
+    for offset in range(0, 420, 7):
+        for length in (0, 1, 4, 30, 98):
+            d1 = start + timedelta(days=offset)
+            d2 = d1 + timedelta(days=length)
+            assert calendar.jours_ouvres(d1, d2) == jours_ouvres(d1, d2, HOLIDAYS_SET_FIXTURE)
+
+def test_ajouter_jours_ouvres_identique_au_calcul_lineaire():
+    calendar = _calendar()
+    start = date(2023, 12, 25)
+    for offset in range(0, 400, 5):
+        for days in (1, 3, 22, 98):
+            d1 = start + timedelta(days=offset)
+            assert ajouter_jours_ouvres(d1, days, calendar) == ajouter_jours_ouvres(d1, days, HOLIDAYS_SET_FIXTURE)
+
+def test_date_reprise_identique_au_calcul_lineaire():
+    calendar = _calendar()
+    start = date(2023, 12, 25)
+    for offset in range(0, 400, 3):
+        d = start + timedelta(days=offset)
+        assert calculate_reprise_date(d, calendar) == calculate_reprise_date(d, HOLIDAYS_SET_FIXTURE)
+
+def test_date_reprise_apres_jour_ferie_de_fin_annee():
+    calendar = _calendar()
+    # Lundi 30/12/2024 -> saute 31/12 et 01/01 (fériés) -> jeudi 02/01/2025
+    assert calendar.date_reprise(date(2024, 12, 30)) == date(2025, 1, 2)
+
+def test_ajouter_jours_ouvres_conserve_le_type_datetime():
+    start = datetime(2024, 8, 15)
+    assert ajouter_jours_ouvres(start, 4, _calendar()) == datetime(2024, 8, 21)
@@ -0,0 +1,54 @@
+import sys
+import os
+from datetime import date, datetime
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from utils.date_utils import (_parse_date_part, _format_date, _ACCEPTED_FORMATS, validate_date,
+                              format_date_for_display, format_date_for_display_short)
+
+VALIDES = ["2024-03-05", "05/03/2024", "05-03-2024", "2024-02-29", "29/02/2024", "5/3/2024", "2024-3-5", "31-12-1999"]
+INVALIDES = ["", "abc", "2024-02-30", "30/02/2024", "2023-02-29", "2024/03/05", "05.03.2024", "2024-13-01",
+             "32/01/2024", "2024-03-05T10:00", "0000-01-01", "05/03/24"]
+
+
+def _reference(chaine):
+    # Analyse sans mémo ni chemin rapide : essai successif des formats acceptés
+    for fmt in _ACCEPTED_FORMATS:
+        try:
+            return datetime.strptime(chaine, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+@pytest.mark.parametrize("chaine", VALIDES + INVALIDES)
+def test_analyse_memorisee_identique_a_l_analyse_directe(chaine):
+    attendu = _reference(chaine)
+    assert _parse_date_part.__wrapped__(chaine) == attendu
+    # Deux fois : premier appel (calcul) puis lecture du mémo
+    assert _parse_date_part(chaine) == attendu
+    assert _parse_date_part(chaine) == attendu
+
+
+def test_dates_invalides():
+    for chaine in INVALIDES:
+        assert validate_date(chaine) is None
+    assert validate_date(None) is None
+    assert validate_date(20240305) is None
+    assert validate_date("2024-03-05 08:30:00") == datetime(2024, 3, 5)
+    assert validate_date(date(2024, 3, 5)) == datetime(2024, 3, 5)
+
+
+def test_formatage_memorise():
+    jour = date(2024, 3, 5)
+    assert _format_date(jour, "%d/%m/%Y") == _format_date.__wrapped__(jour, "%d/%m/%Y") == jour.strftime("%d/%m/%Y")
+    for valeur in ["2024-03-05", "05/03/2024", jour, datetime(2024, 3, 5, 8, 30)]:
+        assert format_date_for_display(valeur) == "05/03/2024"
+        assert format_date_for_display_short(valeur) == "05/03/24"
+    # Valeur non reconnue : restituée telle quelle ; valeur vide : chaîne vide
+    assert format_date_for_display("2024-02-30") == "2024-02-30"
+    assert format_date_for_display(None) == ""
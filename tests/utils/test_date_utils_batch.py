@@ -0,0 +1,34 @@
+import sys
+import os
+from datetime import date, timedelta
+
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from utils import date_utils
+from utils.date_utils import jours_ouvres, jours_ouvres_batch
+
+
+HOLIDAYS_SET_FIXTURE = {
+    date(2024, 8, 19),  # Un lundi
+    date(2024, 8, 24),  # Un samedi
+    date(2025, 1, 1),   # Un mercredi
+}
+
+DEBUTS = [date(2024, 8, 1) + timedelta(days=i * 3) for i in range(60)] + [None, date(2024, 9, 10)]
+FINS = [d + timedelta(days=i % 25) for i, d in enumerate(DEBUTS[:60])] + [date(2024, 9, 1), date(2024, 9, 1)]
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def numpy_mode(request, monkeypatch):
+    if request.param and not date_utils.NUMPY_AVAILABLE:
+        pytest.skip("numpy non installé")
+    monkeypatch.setattr(date_utils, "NUMPY_AVAILABLE", request.param)
+
+
+def test_jours_ouvres_batch_identique_au_calcul_unitaire(numpy_mode):
+    attendus = [jours_ouvres(d, f, HOLIDAYS_SET_FIXTURE) for d, f in zip(DEBUTS, FINS)]
+    assert jours_ouvres_batch(DEBUTS, FINS, HOLIDAYS_SET_FIXTURE) == attendus
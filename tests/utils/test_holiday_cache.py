@@ -0,0 +1,32 @@
+import sys
+import os
+from datetime import date
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from utils.holiday_cache import HolidayCache
+
+
+def test_cache_compte_succes_et_echecs():
+    cache = HolidayCache()
+    appels = []
+    loader = lambda: appels.append(1) or {date(2024, 1, 1)}
+
+    assert cache.get_holidays(('MA', 2024, 2025), loader) == {date(2024, 1, 1)}
+    assert cache.get_holidays(('MA', 2024, 2025), loader) == {date(2024, 1, 1)}
+    assert len(appels) == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+def test_invalidation_force_le_rechargement():
+    cache = HolidayCache()
+    appels = []
+    loader = lambda: appels.append(1) or set()
+
+    cache.get_holidays(('MA', 2024, 2025), loader)
+    cache.invalidate()
+    cache.get_holidays(('MA', 2024, 2025), loader)
+    assert len(appels) == 2
+    assert cache.stats()['invalidations'] == 1
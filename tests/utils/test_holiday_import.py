@@ -0,0 +1,47 @@
+import sys
+import os
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from utils.file_utils import read_holidays_file
+
+
+def test_lecture_ics_evenements_sur_plusieurs_jours(tmp_path):
+    source = tmp_path / "feries.ics"
+    source.write_text(
+        "BEGIN:VCALENDAR\r\n"
+        "BEGIN:VEVENT\r\n"
+        "DTSTART;VALUE=DATE:20250414\r\n"
+        "DTEND;VALUE=DATE:20250416\r\n"
+        "SUMMARY:Fermeture\r\n"
+        " exceptionnelle\r\n"
+        "END:VEVENT\r\n"
+        "BEGIN:VEVENT\r\n"
+        "DTSTART:20251225T000000Z\r\n"
+        "SUMMARY:Noël\\, jour férié\r\n"
+        "END:VEVENT\r\n"
+        "END:VCALENDAR\r\n", encoding="utf-8")
+
+    assert read_holidays_file(str(source)) == [
+        ("2025-04-14", "Fermetureexceptionnelle"),
+        ("2025-04-15", "Fermetureexceptionnelle"),
+        ("2025-12-25", "Noël, jour férié"),
+    ]
+
+
+def test_lecture_csv_avec_entete_et_doublons(tmp_path):
+    source = tmp_path / "feries.csv"
+    source.write_text("date;nom\n01/05/2025;Fête du travail\n2025-01-01;Nouvel an\n01/05/2025;Doublon\n", encoding="utf-8")
+
+    assert read_holidays_file(str(source)) == [("2025-01-01", "Nouvel an"), ("2025-05-01", "Fête du travail")]
+
+
+def test_lecture_csv_invalide_annule_l_import(tmp_path):
+    source = tmp_path / "feries.csv"
+    source.write_text("01/05/2025;Fête du travail\n31/02/2025;Date impossible\n", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="Ligne 2"):
+        read_holidays_file(str(source))
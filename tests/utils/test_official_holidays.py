@@ -0,0 +1,63 @@
+import sys
+import os
+import pytest
+
+# --- Configuration pour permettre l'importation depuis le dossier racine ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# ---------------------------------------------------------------------------
+
+from utils.date_utils import ensure_official_holidays
+
+holidays = pytest.importorskip("holidays")
+
+
+@pytest.fixture
+def appels(monkeypatch):
+    """Années demandées à la bibliothèque ; celles de appels['echecs'] lèvent une erreur."""
+    origine = holidays.country_holidays
+    suivi = {'annees': [], 'echecs': set()}
+
+    def country_holidays(pays, subdiv=None, years=None):
+        suivi['annees'].append(years)
+        if years in suivi['echecs']:
+            raise RuntimeError("indisponible")
+        return origine(pays, subdiv=subdiv, years=years)
+    monkeypatch.setattr(holidays, "country_holidays", country_holidays)
+    return suivi
+
+
+def _annees_stockees(db_manager):
+    rows = db_manager.execute_query("SELECT DISTINCT CAST(substr(date, 1, 4) AS INTEGER) FROM jours_feries_officiels WHERE pays = 'MA' ORDER BY 1", fetch="all")
+    return [r[0] for r in rows]
+
+
+def test_extension_de_plage_limitee_aux_annees_manquantes(db_manager, appels):
+    ensure_official_holidays(db_manager, 'MA', 2024, 2024)
+    assert db_manager.get_official_holidays_range('MA') == (2024, 2024)
+
+    ensure_official_holidays(db_manager, 'MA', 2023, 2025)
+    assert db_manager.get_official_holidays_range('MA') == (2023, 2025)
+    assert appels['annees'] == [2024, 2023, 2025]
+
+    # Plage déjà couverte : aucun nouveau calcul
+    ensure_official_holidays(db_manager, 'MA', 2024, 2025)
+    assert appels['annees'] == [2024, 2023, 2025]
+    assert _annees_stockees(db_manager) == [2023, 2024, 2025]
+
+
+def test_annee_en_echec_non_marquee_comme_couverte(db_manager, appels):
+    appels['echecs'].add(2025)
+    ensure_official_holidays(db_manager, 'MA', 2024, 2025)
+    assert db_manager.get_official_holidays_range('MA') is None
+    assert _annees_stockees(db_manager) == [2024]
+
+    appels['echecs'].clear()
+    ensure_official_holidays(db_manager, 'MA', 2024, 2025)
+    assert db_manager.get_official_holidays_range('MA') == (2024, 2025)
+    assert _annees_stockees(db_manager) == [2024, 2025]
+
+    # Extension partiellement en échec : la plage existante est conservée telle quelle
+    appels['echecs'].add(2027)
+    ensure_official_holidays(db_manager, 'MA', 2024, 2027)
+    assert db_manager.get_official_holidays_range('MA') == (2024, 2025)
+    assert _annees_stockees(db_manager) == [2024, 2025, 2026]
@@ -9,6 +9,8 @@ from utils.config_loader import CONFIG
 from ui.widgets.arabic_keyboard import ArabicKeyboard
 
 class AgentForm(tk.Toplevel):
+    CALENDRIER_DEFAUT = "(Par défaut)"
+
     def __init__(self, parent, manager, agent_id_to_modify=None):
         super().__init__(parent)
         self.parent = parent
@@ -39,6 +41,7 @@ class AgentForm(tk.Toplevel):
         self.entry_prenom.insert(0, agent.prenom)
         self.entry_ppr.insert(0, agent.ppr)
         self.combo_grade.set(agent.grade)
+        self.combo_calendrier.set(agent.calendrier or self.CALENDRIER_DEFAUT)
         
         solde_total = agent.get_solde_total_actif()
         self.solde_info_label.config(text=f"Solde total actif : {solde_total:.1f} jours")
@@ -72,8 +75,13 @@ class AgentForm(tk.Toplevel):
         if grades:
             self.combo_grade.set(grades[0])
 
+        ttk.Label(frame, text="Calendrier:").grid(row=4, column=0, sticky="w", padx=5, pady=5)
+        self.combo_calendrier = ttk.Combobox(frame, values=[self.CALENDRIER_DEFAUT] + self.manager.get_calendriers(), state="readonly")
+        self.combo_calendrier.grid(row=4, column=1, sticky="ew")
+        self.combo_calendrier.set(self.CALENDRIER_DEFAUT)
+
         solde_frame = ttk.LabelFrame(frame, text="Gestion du Solde")
-        solde_frame.grid(row=4, column=0, columnspan=2, sticky="ew", pady=10, padx=5)
+        solde_frame.grid(row=5, column=0, columnspan=2, sticky="ew", pady=10, padx=5)
 
         if self.is_modification:
             self.solde_info_label = ttk.Label(solde_frame, text="Calcul du solde en cours...")
@@ -98,7 +106,7 @@ class AgentForm(tk.Toplevel):
             self.solde_entries[an_n].insert(0, str(CONFIG['conges'].get('solde_annuel_par_defaut', 22.0)))
 
         btn_frame = ttk.Frame(frame)
-        btn_frame.grid(row=5, columnspan=2, pady=(10, 0))
+        btn_frame.grid(row=6, columnspan=2, pady=(10, 0))
         ttk.Button(btn_frame, text="Valider", command=self._on_validate).pack(side=tk.RIGHT, padx=5)
         ttk.Button(btn_frame, text="Annuler", command=self.destroy).pack(side=tk.RIGHT)
 
@@ -108,7 +116,8 @@ class AgentForm(tk.Toplevel):
                 'nom': self.entry_nom.get().strip(),
                 'prenom': self.entry_prenom.get().strip(),
                 'ppr': self.entry_ppr.get().strip(),
-                'grade': self.combo_grade.get()
+                'grade': self.combo_grade.get(),
+                'calendrier': None if self.combo_calendrier.get() == self.CALENDRIER_DEFAUT else self.combo_calendrier.get()
             }
             if not all([agent_data['nom'], agent_data['ppr'], agent_data['grade']]):
                 raise ValueError("Le nom, le PPR et le grade sont obligatoires.")
@@ -37,6 +37,7 @@ class CongeForm(tk.Toplevel):
         
         agent_data = self.manager.get_agent_by_id(self.agent_id)
         self.agent_ppr = agent_data.ppr
+        self.agent_calendrier = agent_data.calendrier
         agent_name = f"{agent_data.nom} {agent_data.prenom}"
         self.agent_solde_total = agent_data.get_solde_total_actif()
 
@@ -83,14 +84,14 @@ class CongeForm(tk.Toplevel):
         
         self.start_date_entry = ttk.Entry(form_frame, width=30)
         self.start_date_entry.grid(row=1, column=1)
-        ttk.Button(form_frame, text="📅", width=2, command=lambda: DatePickerWindow(self, self.start_date_entry, self.manager, self.type_var.get())).grid(row=1, column=2)
+        ttk.Button(form_frame, text="📅", width=2, command=lambda: DatePickerWindow(self, self.start_date_entry, self.manager, self.type_var.get(), self.agent_calendrier)).grid(row=1, column=2)
 
         self.days_spinbox = ttk.Spinbox(form_frame, from_=0, to=365, textvariable=self.days_var, width=10, command=self._update_end_date_from_days)
         self.days_spinbox.grid(row=2, column=1, sticky="w")
         
         self.end_date_entry = ttk.Entry(form_frame, width=30)
         self.end_date_entry.grid(row=3, column=1)
-        ttk.Button(form_frame, text="📅", width=2, command=lambda: DatePickerWindow(self, self.end_date_entry, self.manager, self.type_var.get())).grid(row=3, column=2)
+        ttk.Button(form_frame, text="📅", width=2, command=lambda: DatePickerWindow(self, self.end_date_entry, self.manager, self.type_var.get(), self.agent_calendrier)).grid(row=3, column=2)
 
         self.reprise_date_entry = ttk.Entry(form_frame, width=30, state="readonly")
         self.reprise_date_entry.grid(row=4, column=1, columnspan=2, sticky="ew")
@@ -139,8 +140,8 @@ class CongeForm(tk.Toplevel):
             if not start_date or days < 0:
                 self._update_reprise_date()
                 return
-            holidays_set = self.manager.get_holidays_set_for_period(start_date.year, start_date.year + 2)
-            end_date = self.current_strategy.calculate_end_date(start_date, days, holidays_set)
+            calendar = self.manager.get_business_calendar(start_date.year, start_date.year + 2, self.agent_calendrier)
+            end_date = self.current_strategy.calculate_end_date(start_date, days, calendar)
             current_state = self.end_date_entry.cget('state')
             self.end_date_entry.config(state="normal")
             self.end_date_entry.delete(0, tk.END)
@@ -159,8 +160,8 @@ class CongeForm(tk.Toplevel):
                 self.days_var.set("0")
                 self._update_reprise_date()
                 return
-            holidays_set = self.manager.get_holidays_set_for_period(start_date.year, end_date.year)
-            days = self.current_strategy.calculate_days(start_date, end_date, holidays_set)
+            calendar = self.manager.get_business_calendar(start_date.year, end_date.year, self.agent_calendrier)
+            days = self.current_strategy.calculate_days(start_date, end_date, calendar)
             current_state = self.days_spinbox.cget('state')
             self.days_spinbox.config(state="normal")
             self.days_var.set(str(days))
@@ -175,8 +176,8 @@ class CongeForm(tk.Toplevel):
         self.reprise_date_entry.delete(0, tk.END)
         end_date = validate_date(self.end_date_entry.get())
         if end_date:
-            holidays_set = self.manager.get_holidays_set_for_period(end_date.year, end_date.year + 1)
-            reprise = calculate_reprise_date(end_date, holidays_set)
+            calendar = self.manager.get_business_calendar(end_date.year, end_date.year + 1, self.agent_calendrier)
+            reprise = calculate_reprise_date(end_date, calendar)
             if reprise:
                 self.reprise_date_entry.insert(0, reprise.strftime("%d/%m/%Y"))
         self.reprise_date_entry.config(state="readonly")
@@ -189,8 +190,8 @@ class CongeForm(tk.Toplevel):
             return
             
         self.type_var.set(conge.type_conge)
-        self.start_date_entry.insert(0, format_date_for_display(conge.date_debut.strftime('%Y-%m-%d')))
-        self.end_date_entry.insert(0, format_date_for_display(conge.date_fin.strftime('%Y-%m-%d')))
+        self.start_date_entry.insert(0, format_date_for_display(conge.date_debut))
+        self.end_date_entry.insert(0, format_date_for_display(conge.date_fin))
         self.justif_entry.insert(0, conge.justif or "")
         self.days_var.set(str(conge.jours_pris))
         self.after(100, self._update_reprise_date)
@@ -201,8 +202,8 @@ class CongeForm(tk.Toplevel):
                     break
 
     def _load_interim_agents(self):
-        agents = self.manager.get_all_agents(exclude_id=self.agent_id)
-        self.interim_agents = {f"{a.nom} {a.prenom} (PPR: {a.ppr})": a.id for a in agents}
+        agents = self.manager.get_agents_rows(exclude_id=self.agent_id)
+        self.interim_agents = {str(a): a.id for a in agents}
         self.interim_combo['values'] = [""] + sorted(list(self.interim_agents.keys()))
 
     def _attach_certificate(self):
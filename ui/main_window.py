@@ -13,12 +13,11 @@ import subprocess
 import sys
 
 from core.conges.manager import CongeManager
-from core.constants import SoldeStatus
 from ui.forms.agent_form import AgentForm
 from ui.forms.conge_form import CongeForm
 from ui.widgets.secondary_windows import AdminWindow, JustificatifsWindow
 from utils.file_utils import export_agents_to_excel, export_all_conges_to_excel, import_agents_from_excel, generate_decision_from_template
-from utils.date_utils import format_date_for_display, format_date_for_display_short, calculate_reprise_date
+from utils.date_utils import format_date_for_display, format_date_for_display_short, calculate_reprise_date, validate_date
 from utils.config_loader import CONFIG
 
 
@@ -58,6 +57,12 @@ class MainWindow(tk.Tk):
         self.current_page = 1
         self.items_per_page = 50
         self.total_pages = 1
+        # Clé de début de chaque page déjà parcourue (pagination par clé, selon le tri courant)
+        self._page_cursors = [None]
+        self._search_job = None
+        # Tri de la liste des agents, fait en SQL sur tous les agents : None (nom) ou colonne de solde
+        self._tri = None
+        self._tri_descendant = False
         
         self.restart_on_close = False
 
@@ -104,13 +109,22 @@ class MainWindow(tk.Tk):
         self.search_var.trace_add("write", lambda *args: self.search_agents())
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         search_entry.pack(fill=tk.X, expand=True, side=tk.LEFT)
+        ttk.Label(search_frame, text="Solde total min. :").pack(side=tk.LEFT, padx=(10, 5))
+        self.solde_min_var = tk.StringVar()
+        self.solde_min_var.trace_add("write", lambda *args: self.search_agents())
+        ttk.Entry(search_frame, textvariable=self.solde_min_var, width=6).pack(side=tk.LEFT)
         
         an_n, an_n1, an_n2 = self.annee_exercice, self.annee_exercice - 1, self.annee_exercice - 2
         self.cols_agents = ["ID", "Nom", "Prénom", "PPR", "Grade", f"Solde {an_n2}", f"Solde {an_n1}", f"Solde {an_n}", "Solde Total"]
         self.list_agents = ttk.Treeview(agents_frame, columns=self.cols_agents, show="headings", selectmode="browse")
+        # Colonnes triées en base (toute la liste) ; les autres ne trient que la page affichée
+        self._tris_sql = {"Nom": None, f"Solde {an_n2}": 'solde_n2', f"Solde {an_n1}": 'solde_n1', f"Solde {an_n}": 'solde_n', "Solde Total": 'solde_total'}
         
         for col in self.cols_agents:
-            self.list_agents.heading(col, text=col, command=lambda c=col: treeview_sort_column(self.list_agents, c, False))
+            if col in self._tris_sql:
+                self.list_agents.heading(col, text=col, command=lambda c=col: self._trier_agents(c))
+            else:
+                self.list_agents.heading(col, text=col, command=lambda c=col: treeview_sort_column(self.list_agents, c, False))
 
         self.list_agents.column("ID", width=0, stretch=False)
         self.list_agents.column("Nom", width=120)
@@ -298,23 +312,38 @@ class MainWindow(tk.Tk):
         self.refresh_agents_list(current_selection)
         self.refresh_stats()
         
+    def recharger_donnees(self):
+        """Réaffiche toutes les données après une restauration à chaud de la base (sans redémarrage)."""
+        agent_id = self.get_selected_agent_id()
+        self.annee_exercice = self.manager.get_annee_exercice()
+        an_n, an_n1, an_n2 = self.annee_exercice, self.annee_exercice - 1, self.annee_exercice - 2
+        # Les identifiants des colonnes de soldes sont fixés à la création : seuls les titres suivent l'exercice
+        for col, titre in zip(self.cols_agents[5:8], (f"Solde {an_n2}", f"Solde {an_n1}", f"Solde {an_n}")):
+            self.list_agents.heading(col, text=titre)
+        self.list_conges.delete(*self.list_conges.get_children())
+        self.current_page = 1
+        self._page_cursors = [None]
+        self.refresh_all(agent_id)
+        self.set_status("Base restaurée : données rechargées.")
+
     def refresh_agents_list(self, agent_to_select_id=None):
         for row in self.list_agents.get_children():
             self.list_agents.delete(row)
         term = self.search_var.get().strip().lower() or None
-        total_items = self.manager.get_agents_count(term)
+        # Seules les clés des pages jusqu'à la page courante restent valides après une modification
+        del self._page_cursors[self.current_page:]
+        agents, total_items, cle_suivante = self.manager.get_agents_page(term, self.items_per_page, self._page_cursors[-1],
+                                                                        self._tri, self._tri_descendant, self._get_solde_min())
+        if not agents and self.current_page > 1:
+            # La page courante s'est vidée (suppression) : retour à la page précédente
+            self.current_page -= 1
+            return self.refresh_agents_list(agent_to_select_id)
+        self._page_cursors.append(cle_suivante)
         self.total_pages = max(1, (total_items + self.items_per_page - 1) // self.items_per_page)
-        self.current_page = min(self.current_page, self.total_pages)
-        offset = (self.current_page - 1) * self.items_per_page
-        agents = self.manager.get_all_agents(term=term, limit=self.items_per_page, offset=offset)
         selected_item_id = None
-        an_n, an_n1, an_n2 = self.annee_exercice, self.annee_exercice - 1, self.annee_exercice - 2
         for agent in agents:
-            soldes_par_annee = {s.annee: s.solde for s in agent.soldes_annuels if s.statut == SoldeStatus.ACTIF}
-            solde_n2 = soldes_par_annee.get(an_n2, 0.0)
-            solde_n1 = soldes_par_annee.get(an_n1, 0.0)
-            solde_n = soldes_par_annee.get(an_n, 0.0)
-            solde_total = agent.get_solde_total_actif()
+            # Soldes lus dans le résumé tenu à jour par la base (agents_soldes_resume)
+            solde_total, solde_n, solde_n1, solde_n2 = agent.resume_soldes
             agent_values = (agent.id, agent.nom, agent.prenom, agent.ppr, agent.grade, f"{solde_n2:.1f} j", f"{solde_n1:.1f} j", f"{solde_n:.1f} j", f"{solde_total:.1f} j")
             item_id = self.list_agents.insert("", "end", values=agent_values)
             if agent.id == agent_to_select_id:
@@ -332,6 +361,7 @@ class MainWindow(tk.Tk):
         self.list_conges.delete(*self.list_conges.get_children())
         filtre = self.conge_filter_var.get()
         conges_data = self.manager.get_conges_for_agent(agent_id)
+        calendrier = self.manager.get_calendrier_agent(agent_id)
         conges_par_annee = defaultdict(list)
         for c in conges_data:
             if filtre != "Tous" and c.type_conge != filtre:
@@ -340,10 +370,12 @@ class MainWindow(tk.Tk):
                 conges_par_annee[c.date_debut.year].append(c)
             except AttributeError:
                 logging.warning(f"Date invalide ou nulle pour congé ID {c.id}")
+        # Totaux annuels lus dans les agrégats tenus par la base
+        jours_par_annee = self.manager.get_jours_pris_par_annee(agent_id)
         for annee in sorted(conges_par_annee.keys(), reverse=True):
-            total_jours = sum(c.jours_pris for c in conges_par_annee[annee] if c.type_conge == 'Congé annuel' and c.statut == 'Actif')
+            total_jours = jours_par_annee.get(annee, 0)
             summary_id = self.list_conges.insert("", "end", values=("", "", f"📅 ANNÉE {annee}", "", "", "", total_jours, f"{total_jours} jours pris", ""), tags=("summary",), open=True)
-            holidays_set = self.manager.get_holidays_set_for_period(annee, annee + 1)
+            calendar = self.manager.get_business_calendar(annee, annee + 1, calendrier)
             for conge in sorted(conges_par_annee[annee], key=lambda c: c.date_debut):
                 cert_status = "✅ Fourni" if self.manager.get_certificat_for_conge(conge.id) else "❌ Manquant" if conge.type_conge == 'Congé de maladie' else ""
                 interim_info = ""
@@ -351,7 +383,7 @@ class MainWindow(tk.Tk):
                     interim = self.manager.get_agent_by_id(conge.interim_id)
                     interim_info = f"{interim.nom} {interim.prenom}" if interim else "Agent Supprimé"
                 tags = ('annule',) if conge.statut == 'Annulé' else ()
-                reprise_date = calculate_reprise_date(conge.date_fin, holidays_set)
+                reprise_date = calculate_reprise_date(conge.date_fin, calendar)
                 reprise_date_str = format_date_for_display_short(reprise_date) if reprise_date else ""
                 self.list_conges.insert(summary_id, "end", values=(conge.id, cert_status, conge.type_conge, format_date_for_display_short(conge.date_debut), format_date_for_display_short(conge.date_fin), reprise_date_str, conge.jours_pris, conge.justif or "", interim_info), tags=tags)
 
@@ -359,18 +391,42 @@ class MainWindow(tk.Tk):
         for row in self.list_on_leave.get_children():
             self.list_on_leave.delete(row)
         try:
-            holidays_set = self.manager.get_holidays_set_for_period(self.annee_exercice, self.annee_exercice + 1)
             agents_on_leave_data = self.manager.get_agents_on_leave_today()
-            for nom, prenom, ppr, type_conge, date_fin_str in agents_on_leave_data:
-                # La date de la DB est déjà un objet date/datetime grâce à `detect_types`
-                reprise_date = calculate_reprise_date(date_fin_str, holidays_set)
+            for nom, prenom, ppr, type_conge, date_fin_str, calendrier in agents_on_leave_data:
+                # Calendrier compilé une seule fois par calendrier régional (cache du manager)
+                calendar = self.manager.get_business_calendar(self.annee_exercice, self.annee_exercice + 1, calendrier)
+                # La colonne est déclarée TEXT : `detect_types` ne la convertit pas
+                reprise_date = calculate_reprise_date(validate_date(date_fin_str), calendar)
                 reprise_date_display = format_date_for_display(reprise_date)
                 self.list_on_leave.insert("", "end", values=(f"{nom} {prenom}", ppr, type_conge, reprise_date_display))
         except (sqlite3.Error, AttributeError) as e:
             self.list_on_leave.insert("", "end", values=(f"Erreur: {e}", "", "", ""))
 
     def search_agents(self):
+        # Les frappes rapprochées ne déclenchent qu'une seule recherche
+        if self._search_job:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(200, self._run_search)
+
+    def _get_solde_min(self):
+        try:
+            return float(self.solde_min_var.get().replace(',', '.'))
+        except ValueError:
+            return None
+
+    def _trier_agents(self, col):
+        tri = self._tris_sql[col]
+        # Un second clic sur la même colonne inverse le sens
+        self._tri_descendant = not self._tri_descendant if tri == self._tri else tri is not None
+        self._tri = tri
+        self.current_page = 1
+        self._page_cursors = [None]
+        self.refresh_agents_list(self.get_selected_agent_id())
+
+    def _run_search(self):
+        self._search_job = None
         self.current_page = 1
+        self._page_cursors = [None]
         self.refresh_agents_list()
     
     def on_agent_select(self, event=None):
@@ -418,8 +474,8 @@ class MainWindow(tk.Tk):
                 parts.append(f"{days_int} {jour_text} au titre de l'année {year}")
             details_solde_str = " et ".join(parts)
 
-        holidays_set = self.manager.get_holidays_set_for_period(conge.date_fin.year, conge.date_fin.year + 1)
-        date_reprise = calculate_reprise_date(conge.date_fin, holidays_set)
+        calendar = self.manager.get_business_calendar(conge.date_fin.year, conge.date_fin.year + 1, agent.calendrier)
+        date_reprise = calculate_reprise_date(conge.date_fin, calendar)
 
         context = {
             "{{nom_complet}}": f"{agent.nom} {agent.prenom}", "{{grade}}": agent.grade, "{{ppr}}": agent.ppr,
@@ -15,12 +15,13 @@ class DatePickerWindow(tk.Toplevel):
     Met en évidence les jours fériés pour les types de congés concernés.
     """
     # AXE 2 : Le constructeur attend maintenant 'conge_manager' au lieu de 'db_manager'.
-    def __init__(self, parent, entry_field, conge_manager, conge_type=None):
+    def __init__(self, parent, entry_field, conge_manager, conge_type=None, calendrier=None):
         super().__init__(parent)
         self.entry_field = entry_field
         # AXE 2 : On stocke la référence au manager complet.
         self.manager = conge_manager
         self.conge_type = conge_type
+        self.calendrier = calendrier
         
         self.title("📅 Sélection de date")
         self.resizable(False, False)
@@ -47,7 +48,7 @@ class DatePickerWindow(tk.Toplevel):
             year = datetime.now().year
             # AXE 2 : On appelle la méthode du manager pour obtenir les jours fériés.
             # L'interface ne sait plus comment ces jours sont récupérés (DB, API, etc.).
-            holidays_set = self.manager.get_holidays_set_for_period(year - 1, year + 1)
+            holidays_set = self.manager.get_holidays_set_for_period(year - 1, year + 1, self.calendrier)
             for h_date in holidays_set:
                 self.holidays_dict[h_date] = "Jour Férié"
 
@@ -2,22 +2,18 @@
 # Ce fichier utilise la nouvelle fonction validate_date sans nécessiter de modification.
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 import sqlite3
+import logging
 import os
-import shutil
-
-# La bibliothèque 'holidays' est utilisée ici, mais elle est gérée de manière
-# optionnelle dans date_utils, donc aucune modification n'est nécessaire ici.
-try:
-    import holidays
-except ImportError:
-    pass
+import threading
 
 from ui.widgets.date_picker import DatePickerWindow
 from utils.date_utils import validate_date, format_date_for_display
 from utils.config_loader import CONFIG
+from utils.file_utils import read_holidays_file, run_annual_rollover, export_soldes_a_date_to_excel
+from db.backup import sauvegarder_base, restaurer_base, chemin_sauvegarde, EXTENSIONS_SAUVEGARDE
 
 class EditHolidayWindow(tk.Toplevel):
     """Fenêtre modale pour modifier un jour férié personnalisé."""
@@ -70,6 +66,7 @@ class BackupWindow(tk.Toplevel):
     """Fenêtre pour gérer la création et la restauration des sauvegardes."""
     def __init__(self, parent, manager, main_app_instance):
         super().__init__(parent)
+        self.parent_window = parent
         self.manager = manager
         self.main_app = main_app_instance
         self.db_path = self.manager.db.get_db_path()
@@ -102,12 +99,23 @@ class BackupWindow(tk.Toplevel):
         self.tree.column("Taille", width=100, anchor="e")
         self.tree.pack(fill="both", expand=True)
         
+        progress_frame = ttk.Frame(main_frame, padding=(0, 5))
+        progress_frame.pack(fill="x")
+        self.backup_progress = ttk.Progressbar(progress_frame, mode="determinate", maximum=100)
+        self.backup_progress.pack(side="left", fill="x", expand=True)
+        self.backup_status = ttk.Label(progress_frame, text="", width=30)
+        self.backup_status.pack(side="left", padx=10)
+
         btn_frame = ttk.Frame(main_frame, padding=(0, 10))
         btn_frame.pack(fill="x")
         
-        ttk.Button(btn_frame, text="Fermer", command=self.destroy).pack(side="right")
-        ttk.Button(btn_frame, text="Restaurer la version sélectionnée", command=self._run_restore).pack(side="right", padx=10)
+        self.close_btn = ttk.Button(btn_frame, text="Fermer", command=self.destroy)
+        self.close_btn.pack(side="right")
+        self.restore_btn = ttk.Button(btn_frame, text="Restaurer la version sélectionnée", command=self._run_restore)
+        self.restore_btn.pack(side="right", padx=10)
         ttk.Button(btn_frame, text="Supprimer la sauvegarde", command=self._delete_backup).pack(side="left")
+        self.create_btn = ttk.Button(btn_frame, text="Créer une sauvegarde", command=self._create_backup)
+        self.create_btn.pack(side="left", padx=10)
 
     def _populate_backups(self):
         for row in self.tree.get_children():
@@ -118,7 +126,7 @@ class BackupWindow(tk.Toplevel):
             
         backups = []
         for filename in os.listdir(self.backups_dir):
-            if filename.endswith((".db", ".sqlite3")):
+            if filename.endswith(EXTENSIONS_SAUVEGARDE):
                 full_path = os.path.join(self.backups_dir, filename)
                 try:
                     mtime = os.path.getmtime(full_path)
@@ -141,6 +149,51 @@ class BackupWindow(tk.Toplevel):
         filename = self.tree.item(selection[0], "values")[0]
         return os.path.join(self.backups_dir, filename)
 
+    def _create_backup(self):
+        """Sauvegarde à chaud dans un thread : l'application reste utilisable pendant la copie."""
+        destination = chemin_sauvegarde(self.db_path)
+        etat = {'etape': None, 'fait': 0, 'total': 0}
+        resultat = []
+
+        def progression(etape, fait, total):
+            etat['etape'], etat['fait'], etat['total'] = etape, fait, total
+
+        def tache():
+            try:
+                resultat.append(sauvegarder_base(self.db_path, destination, progression=progression))
+            except Exception as e:
+                resultat.append(e)
+
+        self.create_btn.config(state="disabled")
+        worker = threading.Thread(target=tache, daemon=True)
+        worker.start()
+        self._suivre_sauvegarde(worker, etat, resultat)
+
+    def _suivre_sauvegarde(self, worker, etat, resultat):
+        if not self.winfo_exists():
+            return
+        self._afficher_progression(etat)
+        if worker.is_alive():
+            self.after(100, lambda: self._suivre_sauvegarde(worker, etat, resultat))
+            return
+
+        self.create_btn.config(state="normal")
+        self.backup_progress.config(value=0)
+        self.backup_status.config(text="")
+        if not resultat or isinstance(resultat[0], Exception):
+            messagebox.showerror("Échec de la Sauvegarde", f"La sauvegarde a échoué : {resultat[0] if resultat else ''}", parent=self)
+            return
+        self._populate_backups()
+        messagebox.showinfo("Succès", f"Sauvegarde créée :\n{os.path.basename(resultat[0])}", parent=self)
+
+    _LIBELLES_ETAPES = {'copie': "Copie", 'compression': "Compression",
+                        'decompression': "Décompression", 'restauration': "Restauration"}
+
+    def _afficher_progression(self, etat):
+        if etat['total']:
+            self.backup_progress.config(value=100 * etat['fait'] / etat['total'])
+            self.backup_status.config(text=f"{self._LIBELLES_ETAPES[etat['etape']]} : {100 * etat['fait'] // etat['total']} %")
+
     def _delete_backup(self):
         backup_path = self._get_selected_backup_path()
         if not backup_path:
@@ -161,15 +214,66 @@ class BackupWindow(tk.Toplevel):
         msg = ("Êtes-vous certain de vouloir restaurer cette version ?\n\n"
                "ATTENTION : Toutes les données actuelles seront PERDUES.\n"
                "Cette action est IRRÉVERSIBLE.")
-        if messagebox.askyesno("Confirmation de Restauration", msg, icon='warning', parent=self):
+        if not messagebox.askyesno("Confirmation de Restauration", msg, icon='warning', parent=self):
+            return
+
+        # Restauration à chaud dans un thread : sauvegarde vérifiée (intégrité, version du
+        # schéma) puis recopiée dans la base ouverte, sans fermer l'application
+        etat = {'etape': None, 'fait': 0, 'total': 0}
+        resultat = []
+
+        def progression(etape, fait, total):
+            etat['etape'], etat['fait'], etat['total'] = etape, fait, total
+
+        def tache():
             try:
-                self.manager.db.close()
-                shutil.copy2(backup_path, self.db_path)
-                messagebox.showinfo("Restauration Réussie", "Restauration effectuée.\n\nL'application va redémarrer.", parent=self)
-                self.main_app.trigger_restart()
+                resultat.append(restaurer_base(self.db_path, backup_path, progression=progression))
             except Exception as e:
-                messagebox.showerror("Erreur Critique", f"La restauration a échoué : {e}\n\nRedémarrez l'application.", parent=self)
-                self.destroy()
+                resultat.append(e)
+
+        self._verrouiller_pendant_restauration(True)
+        worker = threading.Thread(target=tache, daemon=True)
+        worker.start()
+        self._suivre_restauration(worker, etat, resultat)
+
+    def _verrouiller_pendant_restauration(self, actif):
+        """Pendant une restauration, les boutons sont désactivés et la fenêtre ne peut pas être fermée."""
+        for bouton in (self.restore_btn, self.create_btn, self.close_btn):
+            bouton.config(state="disabled" if actif else "normal")
+        self.protocol("WM_DELETE_WINDOW", self.bell if actif else self.destroy)
+        self.config(cursor="watch" if actif else "")
+
+    def _suivre_restauration(self, worker, etat, resultat):
+        # Suivi planifié sur la fenêtre principale : la fin de la restauration est traitée
+        # même si cette fenêtre a été détruite entre-temps (fermeture de la fenêtre parente)
+        fenetre_ouverte = self.winfo_exists()
+        if worker.is_alive():
+            if fenetre_ouverte:
+                self._afficher_progression(etat)
+            self.main_app.after(100, lambda: self._suivre_restauration(worker, etat, resultat))
+            return
+
+        parent = self if fenetre_ouverte else self.main_app
+        if fenetre_ouverte:
+            self._verrouiller_pendant_restauration(False)
+            self.backup_progress.config(value=0)
+            self.backup_status.config(text="")
+        if not resultat or isinstance(resultat[0], Exception):
+            # La base n'est modifiée qu'après la vérification de la sauvegarde
+            messagebox.showerror("Échec de la Restauration", f"La restauration a échoué : {resultat[0] if resultat else ''}\n\nLes données actuelles n'ont pas été modifiées.", parent=parent)
+            return
+        try:
+            self.manager.apres_restauration()
+        except Exception as e:
+            logging.error(f"Échec de la mise à niveau de la base restaurée : {e}", exc_info=True)
+            messagebox.showerror("Erreur Critique", f"La base a été restaurée mais sa mise à jour a échoué : {e}\n\nRedémarrez l'application.", parent=parent)
+            return
+        self.main_app.recharger_donnees()
+        if hasattr(self.parent_window, 'recharger') and self.parent_window.winfo_exists():
+            self.parent_window.recharger()
+        messagebox.showinfo("Restauration Réussie", "Restauration effectuée.\nLes données affichées ont été rechargées.", parent=parent)
+        if fenetre_ouverte:
+            self.destroy()
 
 class AdminWindow(tk.Toplevel):
     """Fenêtre d'administration pour les tâches de haut niveau."""
@@ -189,20 +293,33 @@ class AdminWindow(tk.Toplevel):
         self._create_widgets()
         
     def _create_widgets(self):
-        notebook = ttk.Notebook(self)
+        self.notebook = notebook = ttk.Notebook(self)
         notebook.pack(fill="both", expand=True, padx=10, pady=10)
 
         tab_gestion = ttk.Frame(notebook)
         tab_soldes = ttk.Frame(notebook)
         tab_feries = ttk.Frame(notebook)
+        tab_perf = ttk.Frame(notebook)
         
         notebook.add(tab_gestion, text=" Gestion Annuelle ")
         notebook.add(tab_soldes, text=" Gestion Manuelle des Soldes ")
         notebook.add(tab_feries, text=" Jours Fériés ")
+        notebook.add(tab_perf, text=" Performances ")
         
         self._populate_gestion_tab(tab_gestion)
         self._populate_soldes_tab(tab_soldes)
         self._populate_feries_tab(tab_feries)
+        self._populate_perf_tab(tab_perf)
+
+    def recharger(self):
+        """Reconstruit les onglets (exercice, soldes, jours fériés) après une restauration à chaud de la base."""
+        onglet = self.notebook.index(self.notebook.select())
+        self.annee_exercice = self.manager.get_annee_exercice()
+        self.selected_agent_id.set("")
+        self.solde_entries = {}
+        self.notebook.destroy()
+        self._create_widgets()
+        self.notebook.select(onglet)
 
     def _populate_soldes_tab(self, parent_frame):
         selection_frame = ttk.LabelFrame(parent_frame, text="Sélectionner un Agent", padding=10)
@@ -210,9 +327,9 @@ class AdminWindow(tk.Toplevel):
         
         ttk.Label(selection_frame, text="Agent :").pack(side="left", padx=(0, 5))
         
-        all_agents = self.manager.get_all_agents()
-        agent_names = sorted([f"{agent.nom} {agent.prenom} (PPR: {agent.ppr})" for agent in all_agents])
-        self.agent_map = {f"{agent.nom} {agent.prenom} (PPR: {agent.ppr})": agent.id for agent in all_agents}
+        all_agents = self.manager.get_agents_rows()
+        agent_names = sorted([str(agent) for agent in all_agents])
+        self.agent_map = {str(agent): agent.id for agent in all_agents}
 
         agent_combo = ttk.Combobox(selection_frame, textvariable=self.selected_agent_id, values=agent_names, state="readonly", width=50)
         agent_combo.pack(side="left", fill="x", expand=True)
@@ -318,11 +435,22 @@ class AdminWindow(tk.Toplevel):
         glissement_label = ttk.Label(glissement_frame, text=f"L'exercice actuel est {self.annee_exercice}. La clôture mettra à jour l'application pour l'exercice {self.annee_exercice + 1}.\nLe solde de l'année {self.annee_exercice - 2} passera au statut 'Expiré'.", wraplength=700)
         glissement_label.pack(pady=5, fill="x")
         
-        glissement_btn = ttk.Button(glissement_frame, text=f"Clôturer l'exercice {self.annee_exercice}", command=self._run_glissement_annuel)
-        glissement_btn.pack(pady=10)
+        self.glissement_btn = ttk.Button(glissement_frame, text=f"Clôturer l'exercice {self.annee_exercice}", command=self._run_glissement_annuel)
+        self.glissement_btn.pack(pady=10)
+        self.glissement_progress = ttk.Progressbar(glissement_frame, mode="determinate", length=400)
+        self.glissement_status = ttk.Label(glissement_frame, text="")
         
         backup_btn = ttk.Button(glissement_frame, text="Gérer les Sauvegardes / Restaurer", command=self._open_backup_window)
         backup_btn.pack(pady=5)
+
+        audit_frame = ttk.LabelFrame(main_pane, text="Soldes à date (audit)", padding=10)
+        main_pane.add(audit_frame, weight=1)
+        ttk.Label(audit_frame, text="Soldes au (jj/mm/aaaa) :").pack(side=tk.LEFT, padx=5)
+        self.solde_date_entry = ttk.Entry(audit_frame, width=12)
+        self.solde_date_entry.insert(0, f"31/12/{self.annee_exercice - 1}")
+        self.solde_date_entry.pack(side=tk.LEFT, padx=5)
+        self.soldes_date_btn = ttk.Button(audit_frame, text="Exporter les soldes à cette date (Excel)", command=self._exporter_soldes_a_date)
+        self.soldes_date_btn.pack(side=tk.LEFT, padx=5)
         
         apurement_frame = ttk.LabelFrame(main_pane, text="Apurement des Soldes Expirés", padding=10)
         main_pane.add(apurement_frame, weight=3)
@@ -362,6 +490,15 @@ class AdminWindow(tk.Toplevel):
         self.year_var = tk.StringVar(value=str(current_year))
         self.year_spinbox = ttk.Spinbox(year_frame, from_=current_year - 5, to=current_year + 5, textvariable=self.year_var, width=8, command=self.refresh_holidays_list)
         self.year_spinbox.pack(side="left", padx=5)
+        calendriers = self.manager.get_calendriers()
+        self.calendrier_var = tk.StringVar(value="")
+        if calendriers:
+            ttk.Label(year_frame, text="Calendrier:").pack(side="left", padx=(10, 0))
+            calendrier_combo = ttk.Combobox(year_frame, textvariable=self.calendrier_var, values=[""] + calendriers, state="readonly", width=20)
+            calendrier_combo.pack(side="left", padx=5)
+            calendrier_combo.bind("<<ComboboxSelected>>", lambda e: self.refresh_holidays_list())
+        self.cache_stats_label = ttk.Label(year_frame, text="", foreground="grey")
+        self.cache_stats_label.pack(side="right")
         
         cols = ("Date", "Description", "Type")
         self.holidays_tree = ttk.Treeview(top_frame, columns=cols, show="headings", height=10)
@@ -394,10 +531,89 @@ class AdminWindow(tk.Toplevel):
         self.desc_entry = ttk.Entry(add_frame, width=30)
         self.desc_entry.grid(row=1, column=1, columnspan=2, padx=5)
         
-        ttk.Button(bottom_frame, text="Ajouter ce jour férié", command=self.add_holiday).pack(pady=5)
+        add_btn_frame = ttk.Frame(bottom_frame)
+        add_btn_frame.pack(pady=5)
+        ttk.Button(add_btn_frame, text="Ajouter ce jour férié", command=self.add_holiday).pack(side="left", padx=5)
+        ttk.Button(add_btn_frame, text="Importer un fichier (ICS/CSV)...", command=self._import_holidays).pack(side="left", padx=5)
+
+        impact_frame = ttk.Frame(main_frame)
+        impact_frame.pack(fill="x", pady=5, padx=5)
+        self.impact_label = ttk.Label(impact_frame, text="")
+        self.impact_label.pack(side="left")
+        self.impact_btn = ttk.Button(impact_frame, text="Voir les congés impactés", command=self._show_impacted_leaves)
+        self.impact_btn.pack(side="right")
         
         self.refresh_holidays_list()
 
+    def _populate_perf_tab(self, parent_frame):
+        main_frame = ttk.Frame(parent_frame, padding=10)
+        main_frame.pack(fill="both", expand=True)
+
+        top_frame = ttk.Frame(main_frame)
+        top_frame.pack(fill="x", pady=(0, 5))
+        self.instrumentation_var = tk.BooleanVar(value=self.manager.get_instrumentation())
+        ttk.Checkbutton(top_frame, text="Mesurer les requêtes SQL", variable=self.instrumentation_var,
+                        command=lambda: self.manager.set_instrumentation(self.instrumentation_var.get())).pack(side="left")
+        ttk.Button(top_frame, text="Réinitialiser", command=self._reset_perf).pack(side="right")
+        ttk.Button(top_frame, text="Rafraîchir", command=self.refresh_perf).pack(side="right", padx=5)
+
+        stats_frame = ttk.LabelFrame(main_frame, text="Requêtes (par durée cumulée)")
+        stats_frame.pack(fill="both", expand=True, pady=5)
+        cols = ("Requête", "Appels", "Total (ms)", "Moy.", "p50", "p95", "p99", "Max", "Origine")
+        self.perf_tree = ttk.Treeview(stats_frame, columns=cols, show="headings", height=8)
+        for col in cols:
+            self.perf_tree.heading(col, text=col)
+            self.perf_tree.column(col, width=60, anchor="e")
+        self.perf_tree.column("Requête", width=250, anchor="w")
+        self.perf_tree.column("Origine", width=160, anchor="w")
+        self.perf_tree.pack(fill="both", expand=True, padx=5, pady=5)
+
+        lentes_frame = ttk.LabelFrame(main_frame, text="Requêtes lentes")
+        lentes_frame.pack(fill="both", expand=True, pady=5)
+        cols = ("Heure", "Durée (ms)", "Origine", "Requête")
+        self.lentes_tree = ttk.Treeview(lentes_frame, columns=cols, show="headings", height=5)
+        for col in cols:
+            self.lentes_tree.heading(col, text=col)
+        self.lentes_tree.column("Heure", width=70, anchor="center")
+        self.lentes_tree.column("Durée (ms)", width=80, anchor="e")
+        self.lentes_tree.column("Origine", width=160)
+        self.lentes_tree.column("Requête", width=400)
+        self.lentes_tree.pack(fill="both", expand=True, padx=5, pady=5)
+        self.lentes_tree.bind("<<TreeviewSelect>>", self._on_requete_lente_selected)
+        self.plan_text = tk.Text(lentes_frame, height=4, wrap="word", state="disabled")
+        self.plan_text.pack(fill="x", padx=5, pady=(0, 5))
+
+        self.refresh_perf()
+
+    def refresh_perf(self):
+        for tree in (self.perf_tree, self.lentes_tree):
+            for row in tree.get_children():
+                tree.delete(row)
+        for stat in self.manager.get_query_stats():
+            origine = stat['origines'][0][0] if stat['origines'] else ""
+            self.perf_tree.insert("", "end", values=(
+                stat['requete'], stat['appels'], f"{stat['total_ms']:.1f}", f"{stat['moyenne_ms']:.2f}",
+                f"{stat['p50_ms']:.2f}", f"{stat['p95_ms']:.2f}", f"{stat['p99_ms']:.2f}", f"{stat['max_ms']:.1f}", origine))
+        self.requetes_lentes = self.manager.get_requetes_lentes()
+        for i, lente in enumerate(self.requetes_lentes):
+            self.lentes_tree.insert("", "end", iid=str(i), values=(
+                lente['heure'].strftime("%H:%M:%S"), f"{lente['duree_ms']:.0f}", lente['origine'], lente['requete']))
+
+    def _on_requete_lente_selected(self, event=None):
+        selection = self.lentes_tree.selection()
+        if not selection:
+            return
+        lente = self.requetes_lentes[int(selection[0])]
+        texte = f"Paramètres : {lente['params']}\n" + ("Plan : " + " ; ".join(lente['plan']) if lente['plan'] else "Plan non capturé.")
+        self.plan_text.config(state="normal")
+        self.plan_text.delete("1.0", "end")
+        self.plan_text.insert("1.0", texte)
+        self.plan_text.config(state="disabled")
+
+    def _reset_perf(self):
+        self.manager.reset_query_stats()
+        self.refresh_perf()
+
     def refresh_soldes_expires_list(self):
         for row in self.tree_expires.get_children():
             self.tree_expires.delete(row)
@@ -411,27 +627,115 @@ class AdminWindow(tk.Toplevel):
 
     def _run_glissement_annuel(self):
         if messagebox.askyesno("Confirmation", f"Êtes-vous sûr de vouloir clôturer l'exercice {self.annee_exercice} ?\nCette action est IRRÉVERSIBLE.", icon='warning', parent=self):
+            self._lancer_glissement()
+
+    def _lancer_glissement(self):
+        """
+        Exécute dans un thread (connexion propre) la sauvegarde à chaud de la base puis
+        la clôture, et suit leur progression. La clôture n'est pas lancée si la sauvegarde échoue.
+        """
+        db_path = self.manager.db.get_db_path()
+        taille_lot = int(CONFIG['conges'].get('glissement_taille_lot', 5000)) or None
+        etat = {'etape': 'copie', 'fait': 0, 'total': 0}
+        resultat = []
+
+        def progression_sauvegarde(etape, fait, total):
+            etat['etape'], etat['fait'], etat['total'] = etape, fait, total
+
+        def progression(fait, total):
+            etat['etape'], etat['fait'], etat['total'] = 'glissement', fait, total
+
+        def tache():
             try:
-                db_path = self.manager.db.get_db_path()
-                base_dir = os.path.dirname(db_path)
-                backups_dir = os.path.join(base_dir, "backups")
-                os.makedirs(backups_dir, exist_ok=True)
-                timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-                db_filename = os.path.basename(db_path)
-                backup_filename = f"backup_{timestamp}_AVANT_CLOTURE_{self.annee_exercice}_{db_filename}"
-                backup_path = os.path.join(backups_dir, backup_filename)
-                shutil.copy2(db_path, backup_path)
+                destination = chemin_sauvegarde(db_path, f"AVANT_CLOTURE_{self.annee_exercice}")
+                sauvegarder_base(db_path, destination, progression=progression_sauvegarde)
             except Exception as e:
-                messagebox.showerror("Échec de la Sauvegarde", f"La sauvegarde automatique a échoué. Opération annulée.\n\nErreur : {e}", parent=self)
+                resultat.append(e)
+                etat['etape'] = 'echec_sauvegarde'
                 return
-            
             try:
-                self.manager.effectuer_glissement_annuel()
-                messagebox.showinfo("Succès", "Le glissement annuel a été effectué.\nUne sauvegarde a été créée.\n\nL'application va maintenant redémarrer pour appliquer le nouvel exercice.", parent=self)
-                self.parent_window.trigger_restart()
-                self.destroy()
+                resultat.append(run_annual_rollover(db_path, self.manager.certificats_dir, taille_lot, progression))
             except Exception as e:
-                messagebox.showerror("Erreur de Clôture", f"Le glissement a échoué : {e}\n\nPensez à vérifier la sauvegarde avant de réessayer.", parent=self)
+                resultat.append(e)
+
+        self.glissement_btn.config(state="disabled")
+        self.glissement_progress.pack(pady=5)
+        self.glissement_status.pack()
+        self.config(cursor="watch")
+        worker = threading.Thread(target=tache, daemon=True)
+        worker.start()
+        self._suivre_glissement(worker, etat, resultat)
+
+    def _suivre_glissement(self, worker, etat, resultat):
+        # Suivi planifié sur la fenêtre principale : le résultat de la clôture est traité
+        # même si la fenêtre d'administration a été fermée entre-temps
+        fenetre_ouverte = self.winfo_exists()
+        if worker.is_alive():
+            if fenetre_ouverte and etat['total']:
+                self.glissement_progress.config(maximum=etat['total'], value=etat['fait'])
+                if etat['etape'] == 'glissement':
+                    self.glissement_status.config(text=f"{etat['fait']} / {etat['total']} agents traités")
+                else:
+                    libelle = "Sauvegarde" if etat['etape'] == 'copie' else "Compression de la sauvegarde"
+                    self.glissement_status.config(text=f"{libelle} : {100 * etat['fait'] // etat['total']} %")
+            self.parent_window.after(100, lambda: self._suivre_glissement(worker, etat, resultat))
+            return
+
+        parent = self if fenetre_ouverte else self.parent_window
+        if fenetre_ouverte:
+            self.config(cursor="")
+        erreur = resultat[0] if resultat and isinstance(resultat[0], Exception) else None
+        if etat['etape'] == 'echec_sauvegarde':
+            if fenetre_ouverte:
+                self.glissement_btn.config(state="normal")
+                self.glissement_progress.pack_forget()
+                self.glissement_status.pack_forget()
+            messagebox.showerror("Échec de la Sauvegarde", f"La sauvegarde automatique a échoué. Opération annulée.\n\nErreur : {erreur}", parent=parent)
+            return
+        if erreur or not resultat:
+            if fenetre_ouverte:
+                self.glissement_btn.config(state="normal")
+            messagebox.showerror("Erreur de Clôture", f"Le glissement a échoué : {erreur}\n\nLa clôture peut être relancée ; pensez à vérifier la sauvegarde.", parent=parent)
+            return
+        messagebox.showinfo("Succès", "Le glissement annuel a été effectué.\nUne sauvegarde a été créée.\n\nL'application va maintenant redémarrer pour appliquer le nouvel exercice.", parent=parent)
+        self.parent_window.trigger_restart()
+        if fenetre_ouverte:
+            self.destroy()
+
+    def _exporter_soldes_a_date(self):
+        jour = validate_date(self.solde_date_entry.get())
+        if not jour:
+            messagebox.showerror("Date invalide", "Veuillez saisir une date au format jj/mm/aaaa.", parent=self)
+            return
+        save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Fichiers Excel", "*.xlsx")], title="Exporter les soldes à date",
+                                                 initialfile=f"Soldes_au_{jour:%Y-%m-%d}.xlsx", parent=self)
+        if not save_path:
+            return
+        db_path = self.manager.db.get_db_path()
+        resultat = []
+
+        def tache():
+            try:
+                resultat.append(export_soldes_a_date_to_excel(db_path, self.manager.certificats_dir, save_path, jour.date()))
+            except Exception as e:
+                resultat.append(e)
+
+        self.soldes_date_btn.config(state="disabled")
+        self.config(cursor="watch")
+        worker = threading.Thread(target=tache, daemon=True)
+        worker.start()
+        self._suivre_export_soldes(worker, resultat)
+
+    def _suivre_export_soldes(self, worker, resultat):
+        if worker.is_alive():
+            self.after(100, lambda: self._suivre_export_soldes(worker, resultat))
+            return
+        self.config(cursor="")
+        self.soldes_date_btn.config(state="normal")
+        if not resultat or isinstance(resultat[0], Exception):
+            messagebox.showerror("Erreur d'export", f"L'export des soldes a échoué : {resultat[0] if resultat else ''}", parent=self)
+        else:
+            messagebox.showinfo("Export terminé", resultat[0], parent=self)
 
     def _run_apurement(self):
         selection = self.tree_expires.selection()
@@ -452,27 +756,27 @@ class AdminWindow(tk.Toplevel):
             self.holidays_tree.delete(row)
         try:
             year = int(self.year_var.get())
-            country_code = CONFIG['conges']['holidays_country']
-            
-            all_holidays_dict = {}
-            if 'holidays' in sys.modules:
-                 official_holidays = holidays.country_holidays(country_code, years=year)
-                 for h_date, h_name in official_holidays.items():
-                    all_holidays_dict[h_date] = (h_name, "Officiel")
-
-            custom_holidays_list = self.manager.get_holidays_for_year(str(year))
-            for h_date_str, h_name, h_type in custom_holidays_list:
-                validated_date = validate_date(h_date_str)
-                if validated_date:
-                    all_holidays_dict[validated_date.date()] = (h_name, h_type)
-
-            for h_date, (h_name, h_type) in sorted(all_holidays_dict.items()):
-                self.holidays_tree.insert("", "end", values=(format_date_for_display(h_date), h_name, h_type))
+            for h_date_str, h_name, h_type in self.manager.get_holidays_details_for_year(year, self.calendrier_var.get() or None):
+                self.holidays_tree.insert("", "end", values=(format_date_for_display(h_date_str), h_name, h_type))
+            self._refresh_cache_stats()
+            self._refresh_impacts()
         except (tk.TclError, ValueError):
             pass
         except Exception as e:
             messagebox.showerror("Erreur", f"Impossible de charger les jours fériés: {e}", parent=self)
 
+    def _refresh_impacts(self):
+        count = len(self.manager.get_conges_a_verifier())
+        self.impact_label.config(text=f"{count} congé(s) annuel(s) à vérifier suite aux modifications des jours fériés." if count else "Aucun congé impacté.")
+        self.impact_btn.config(state="normal" if count else "disabled")
+
+    def _show_impacted_leaves(self):
+        ReportWindow(self, None, self.manager.get_conges_a_verifier())
+
+    def _refresh_cache_stats(self):
+        stats = self.manager.get_holiday_cache_stats()
+        self.cache_stats_label.config(text=f"Cache : {stats['hits']} succès / {stats['misses']} échecs / {stats['invalidations']} invalidations")
+
     def _get_selected_holiday_info(self):
         selection = self.holidays_tree.selection()
         if not selection:
@@ -540,6 +844,31 @@ class AdminWindow(tk.Toplevel):
         else:
             messagebox.showerror("Erreur", "Cette date est déjà enregistrée.", parent=self)
 
+    def _import_holidays(self):
+        source_path = filedialog.askopenfilename(title="Importer des jours fériés", filetypes=[("Calendrier ou CSV", "*.ics *.csv"), ("iCalendar", "*.ics"), ("CSV", "*.csv")], parent=self)
+        if not source_path:
+            return
+        try:
+            rows = read_holidays_file(source_path)
+        except (ValueError, OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Erreur d'importation", str(e), parent=self)
+            return
+        if not rows:
+            messagebox.showinfo("Importation", "Aucun jour férié trouvé dans le fichier.", parent=self)
+            return
+        if not messagebox.askyesno("Confirmation", f"Importer {len(rows)} jour(s) férié(s) du {format_date_for_display(rows[0][0])} au {format_date_for_display(rows[-1][0])} ?", parent=self):
+            return
+        try:
+            ajoutes, ignores, inconsistencies = self.manager.importer_jours_feries(rows)
+        except sqlite3.Error as e:
+            messagebox.showerror("Erreur BD", f"L'importation a échoué : {e}", parent=self)
+            return
+        self.refresh_holidays_list()
+        msg = f"Importation terminée.\n\n- Jours ajoutés : {ajoutes}\n- Déjà enregistrés (ignorés) : {ignores}"
+        if inconsistencies:
+            msg += f"\n- Congés annuels impactés : {len(inconsistencies)}"
+        messagebox.showinfo("Importation", msg, parent=self)
+
 class JustificatifsWindow(tk.Toplevel):
     """Fenêtre pour le suivi des certificats médicaux manquants ou fournis."""
     def __init__(self, parent, manager):
@@ -612,16 +941,18 @@ class ReportWindow(tk.Toplevel):
     """Fenêtre affichant un rapport d'incohérences de calcul de jours."""
     def __init__(self, parent, year, inconsistencies):
         super().__init__(parent)
+        self.parent = parent
         self.manager = parent.manager
+        self.inconsistencies = inconsistencies
         
-        self.title(f"Rapport d'incohérence pour {year}")
+        self.title(f"Rapport d'incohérence pour {year}" if year else "Congés impactés par les jours fériés")
         self.grab_set()
         self.geometry("900x400")
         
         main_frame = ttk.Frame(self, padding=10)
         main_frame.pack(fill="both", expand=True)
         
-        info_label = ttk.Label(main_frame, text="Les congés suivants ne sont plus valides car des jours fériés ont été modifiés.\nVous devriez les modifier manuellement.", wraplength=850, justify="center")
+        info_label = ttk.Label(main_frame, text="Les congés suivants ne sont plus valides car des jours fériés ont été modifiés.\nVous pouvez les corriger automatiquement (jours pris et soldes) ou les modifier manuellement.", wraplength=850, justify="center")
         info_label.pack(fill="x", pady=10)
         
         cols = ("Agent", "Début Congé", "Fin Congé", "Jours Pris (Enregistré)", "Jours Dûs (Calculé)")
@@ -640,7 +971,61 @@ class ReportWindow(tk.Toplevel):
         for conge, recalculated_days in inconsistencies:
             agent = self.manager.get_agent_by_id(conge.agent_id)
             agent_name = f"{agent.nom} {agent.prenom}" if agent else "Agent Inconnu"
-            tree.insert("", "end", values=(agent_name, conge.date_debut.strftime('%d/%m/%Y'), conge.date_fin.strftime('%d/%m/%Y'), conge.jours_pris, recalculated_days), tags=("error",))
+            tree.insert("", "end", values=(agent_name, format_date_for_display(conge.date_debut), format_date_for_display(conge.date_fin), conge.jours_pris, recalculated_days), tags=("error",))
             
         tree.pack(fill="both", expand=True)
-        ttk.Button(main_frame, text="Fermer", command=self.destroy).pack(pady=10)
\ No newline at end of file
+
+        btn_frame = ttk.Frame(main_frame)
+        btn_frame.pack(pady=10)
+        ttk.Button(btn_frame, text="Corriger automatiquement", command=self._corriger_automatiquement, state="normal" if inconsistencies else "disabled").pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="Fermer", command=self.destroy).pack(side="left", padx=5)
+
+    def _corriger_automatiquement(self):
+        try:
+            apercu = self.manager.preparer_corrections(self.inconsistencies)
+        except sqlite3.Error as e:
+            messagebox.showerror("Erreur BD", f"Impossible de préparer la correction : {e}", parent=self)
+            return
+        if not apercu:
+            messagebox.showinfo("Correction", "Aucun congé à corriger : les données sont déjà à jour.", parent=self)
+            self._rafraichir_parents()
+            self.destroy()
+            return
+
+        a_corriger = [item for item in apercu if not item['solde_insuffisant']]
+        ecartes = [item for item in apercu if item['solde_insuffisant']]
+        lignes = [
+            f"- {item['agent'].nom} {item['agent'].prenom} : {item['delta']:+g} j, solde {item['solde_avant']:g} → {item['solde_apres']:g}"
+            + (" (solde insuffisant, non corrigé)" if item['solde_insuffisant'] else "")
+            for item in apercu[:15]
+        ]
+        if len(apercu) > 15:
+            lignes.append(f"... et {len(apercu) - 15} autres")
+        if not a_corriger:
+            messagebox.showwarning("Correction impossible", "Le solde des agents concernés est insuffisant pour la correction :\n\n"
+                                   + "\n".join(lignes) + "\n\nModifiez ces congés manuellement.", parent=self)
+            return
+
+        nb_conges = sum(len(item['corrections']) for item in a_corriger)
+        msg = f"{nb_conges} congé(s) de {len(a_corriger)} agent(s) vont être corrigés :\n\n" + "\n".join(lignes)
+        if ecartes:
+            msg += f"\n\n{len(ecartes)} agent(s) au solde insuffisant resteront à corriger manuellement."
+        msg += "\n\nConfirmer la correction ?"
+        if not messagebox.askyesno("Confirmer la correction", msg, parent=self):
+            return
+
+        try:
+            nb = self.manager.appliquer_corrections(apercu)
+        except (ValueError, sqlite3.Error) as e:
+            messagebox.showerror("Erreur", f"La correction a échoué, aucune modification n'a été enregistrée :\n{e}", parent=self)
+            return
+        messagebox.showinfo("Succès", f"{nb} congé(s) corrigé(s).", parent=self)
+        self._rafraichir_parents()
+        self.destroy()
+
+    def _rafraichir_parents(self):
+        if hasattr(self.parent, '_refresh_impacts'):
+            self.parent._refresh_impacts()
+        main_window = getattr(self.parent, 'parent_window', self.parent)
+        if hasattr(main_window, 'refresh_all'):
+            main_window.refresh_all()
\ No newline at end of file
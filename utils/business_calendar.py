@@ -0,0 +1,146 @@
+# Fichier : utils/business_calendar.py
+# Description : Calendrier des jours ouvrés précalculé. Un tableau cumulatif des
+# jours ouvrés et une table "prochain jour ouvré" permettent de compter les jours
+# entre deux dates en O(1) et de trouver une date de fin en O(log n).
+
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+
+def _to_date(value):
+    """Ramène un datetime à un objet date (les dates sont retournées telles quelles)."""
+    return value.date() if isinstance(value, datetime) else value
+
+
+class BusinessCalendar:
+    """
+    Calendrier des jours ouvrés (lundi-vendredi hors jours fériés) couvrant les
+    années [start_year, end_year]. Il est construit une seule fois par ensemble
+    de jours fériés puis réutilisé pour tous les calculs. Les dates situées hors
+    de la plage précalculée restent gérées, par un parcours jour par jour.
+    """
+
+    def __init__(self, holidays_set, start_year, end_year):
+        self.holidays = frozenset(holidays_set)
+        self.start = date(start_year, 1, 1)
+        self.end = date(end_year, 12, 31)
+        self._origin = self.start.toordinal()
+        size = self.end.toordinal() - self._origin + 1
+
+        ouvres = [1 if self._is_ouvre_lineaire(self.start + timedelta(days=i)) else 0 for i in range(size)]
+        # _cumul[i] = nombre de jours ouvrés dans [start, start + i[
+        self._cumul = array('l', accumulate(ouvres, initial=0))
+        # _prochain[i] = indice du premier jour ouvré >= i (size si aucun dans la plage)
+        self._prochain = array('l', [size]) * (size + 1)
+        for i in range(size - 1, -1, -1):
+            self._prochain[i] = i if ouvres[i] else self._prochain[i + 1]
+        self._size = size
+
+    def _is_ouvre_lineaire(self, jour):
+        return jour.weekday() < 5 and jour not in self.holidays
+
+    def _index(self, jour):
+        """Retourne l'indice du jour dans la plage, ou None s'il est en dehors."""
+        i = jour.toordinal() - self._origin
+        return i if 0 <= i < self._size else None
+
+    def covers(self, start_year, end_year):
+        """Indique si le calendrier couvre entièrement les années demandées."""
+        return self.start.year <= start_year and end_year <= self.end.year
+
+    def est_ouvre(self, jour):
+        """Indique si la date donnée est un jour ouvré."""
+        jour = _to_date(jour)
+        i = self._index(jour)
+        if i is None:
+            return self._is_ouvre_lineaire(jour)
+        return self._cumul[i + 1] != self._cumul[i]
+
+    def jours_ouvres(self, date_debut, date_fin):
+        """Nombre de jours ouvrés entre deux dates incluses."""
+        if not date_debut or not date_fin:
+            return 0
+        debut, fin = _to_date(date_debut), _to_date(date_fin)
+        if fin < debut:
+            return 0
+
+        total = 0
+        # Portions éventuelles hors de la plage précalculée
+        if debut < self.start:
+            total += self._compter_lineaire(debut, min(fin, self.start - timedelta(days=1)))
+            debut = self.start
+        if fin > self.end:
+            total += self._compter_lineaire(max(debut, self.end + timedelta(days=1)), fin)
+            fin = self.end
+        if debut <= fin:
+            i, j = self._index(debut), self._index(fin)
+            total += self._cumul[j + 1] - self._cumul[i]
+        return total
+
+    def ajouter_jours_ouvres(self, date_debut, nb_jours):
+        """
+        Retourne la date du n-ième jour ouvré à partir de date_debut (inclus).
+        Si nb_jours <= 0, la date de début est retournée.
+        """
+        debut = _to_date(date_debut)
+        if nb_jours <= 0:
+            return debut
+
+        i = self._index(debut)
+        if i is None:
+            if debut > self.end:
+                return self._ajouter_lineaire(debut, nb_jours)
+            # Avant la plage : on consomme les jours jusqu'au début de la plage
+            avant = self._compter_lineaire(debut, self.start - timedelta(days=1))
+            if avant >= nb_jours:
+                return self._ajouter_lineaire(debut, nb_jours)
+            nb_jours -= avant
+            i = 0
+
+        cible = self._cumul[i] + nb_jours
+        if cible > self._cumul[self._size]:
+            restant = cible - self._cumul[self._size]
+            return self._ajouter_lineaire(self.end + timedelta(days=1), restant)
+        # Plus petit k tel que _cumul[k + 1] >= cible
+        k = bisect_left(self._cumul, cible, i + 1) - 1
+        return date.fromordinal(self._origin + k)
+
+    def prochain_jour_ouvre(self, jour):
+        """Retourne le premier jour ouvré à partir de la date donnée (incluse)."""
+        jour = _to_date(jour)
+        i = self._index(jour)
+        if i is not None:
+            k = self._prochain[i]
+            if k < self._size:
+                return date.fromordinal(self._origin + k)
+            jour = self.end + timedelta(days=1)
+        while not self._is_ouvre_lineaire(jour):
+            jour += timedelta(days=1)
+        return jour
+
+    def date_reprise(self, date_fin):
+        """Date de reprise de service : premier jour ouvré après la date de fin."""
+        if not date_fin:
+            return None
+        return self.prochain_jour_ouvre(_to_date(date_fin) + timedelta(days=1))
+
+    def _compter_lineaire(self, debut, fin):
+        jours = 0
+        current = debut
+        while current <= fin:
+            if self._is_ouvre_lineaire(current):
+                jours += 1
+            current += timedelta(days=1)
+        return jours
+
+    def _ajouter_lineaire(self, debut, nb_jours):
+        current = debut
+        compte = 0
+        while True:
+            if self._is_ouvre_lineaire(current):
+                compte += 1
+                if compte >= nb_jours:
+                    return current
+            current += timedelta(days=1)
@@ -2,43 +2,71 @@
 # Version finale corrigée avec validation de date stricte et gestion d'erreur.
 
 from datetime import datetime, timedelta, date
+from functools import lru_cache
 import sqlite3
 import logging
 from utils.config_loader import CONFIG
+from utils.business_calendar import BusinessCalendar
 
-# --- Gestion optionnelle de la bibliothèque holidays ---
+# --- Gestion optionnelle de la bibliothèque numpy (calculs vectorisés) ---
 try:
-    import holidays
-    HOLIDAYS_AVAILABLE = True
+    import numpy as np
+    NUMPY_AVAILABLE = True
 except ImportError:
-    HOLIDAYS_AVAILABLE = False
-    logging.warning("Bibliothèque 'holidays' non trouvée. Seuls les jours fériés personnalisés seront chargés.")
+    NUMPY_AVAILABLE = False
 
-# --- Fonctions de formatage (ajustées pour la nouvelle validation) ---
+# --- Codec de dates : analyse et formatage mémorisés ---
 
-def format_date_for_display(date_str_sql):
-    """Convertit une date du format SQL (YYYY-MM-DD) en format affichable (DD/MM/YYYY)."""
-    if not date_str_sql:
+# Taille maximale des mémos (les mêmes dates reviennent très souvent : listes, exports)
+_DATE_CACHE_SIZE = 8192
+_ACCEPTED_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d")
+
+@lru_cache(maxsize=_DATE_CACHE_SIZE)
+def _parse_date_part(date_part):
+    """Analyse une chaîne déjà nettoyée. Chemin rapide pour le format ISO (AAAA-MM-JJ)."""
+    if len(date_part) == 10 and date_part[4] == '-' and date_part[7] == '-':
+        try:
+            return datetime.fromisoformat(date_part)
+        except ValueError:
+            return None
+    for fmt in _ACCEPTED_FORMATS:
+        try:
+            return datetime.strptime(date_part, fmt)
+        except (ValueError, TypeError):
+            continue
+    return None
+
+@lru_cache(maxsize=_DATE_CACHE_SIZE)
+def _format_date(date_obj, fmt):
+    return date_obj.strftime(fmt)
+
+def _format_for_display(value, fmt):
+    if not value:
         return ""
     try:
-        if hasattr(date_str_sql, 'strftime'):
-            return date_str_sql.strftime("%d/%m/%Y")
-        validated_date = validate_date(date_str_sql)
-        return validated_date.strftime("%d/%m/%Y") if validated_date else str(date_str_sql)
+        if hasattr(value, 'strftime'):
+            return _format_date(value, fmt)
+        validated_date = validate_date(str(value))
+        return _format_date(validated_date, fmt) if validated_date else str(value)
     except (ValueError, TypeError, AttributeError):
-        return str(date_str_sql)
+        return str(value)
+
+def format_date_for_display(date_str_sql):
+    """Convertit une date du format SQL (YYYY-MM-DD) en format affichable (DD/MM/YYYY)."""
+    return _format_for_display(date_str_sql, "%d/%m/%Y")
 
 def format_date_for_display_short(date_obj):
     """Convertit un objet date en format affichable court (JJ/MM/AA)."""
-    if not date_obj:
-        return ""
-    try:
-        if hasattr(date_obj, 'strftime'):
-            return date_obj.strftime("%d/%m/%y")
-        validated_date = validate_date(str(date_obj))
-        return validated_date.strftime("%d/%m/%y") if validated_date else str(date_obj)
-    except (ValueError, TypeError, AttributeError):
-        return str(date_obj)
+    return _format_for_display(date_obj, "%d/%m/%y")
+
+# Écart entre date.toordinal() et le jour julien entier de SQLite (CAST(julianday(...) AS INTEGER))
+_JULIAN_DAY_OFFSET = 1721424
+
+def jour_julien(date_obj):
+    """Numéro de jour entier d'une date, identique aux colonnes jour_debut / jour_fin de la base."""
+    if isinstance(date_obj, datetime):
+        date_obj = date_obj.date()
+    return date_obj.toordinal() + _JULIAN_DAY_OFFSET
 
 # --- Fonction de validation (corrigée) ---
 
@@ -59,49 +87,131 @@ def validate_date(date_str):
         return None
 
     # Nettoie la chaîne pour ne garder que la partie date
-    date_part = str(date_str).strip().split(" ")[0]
-    accepted_formats = ["%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d"]
-    
-    for fmt in accepted_formats:
-        try:
-            return datetime.strptime(date_part, fmt)
-        except (ValueError, TypeError):
-            continue
-            
-    return None
+    return _parse_date_part(date_str.strip().split(" ")[0])
 
 # --- Fonctions de calcul (ajustées pour la nouvelle validation) ---
 
-def get_holidays_set_for_period(db_manager, start_year, end_year):
-    """Charge les jours fériés (officiels et personnalisés) pour une période donnée."""
-    country_code = CONFIG['conges']['holidays_country']
-    all_h = {}
-    
-    for year in range(start_year, end_year + 2):
-        # Charge les jours fériés officiels si la bibliothèque est disponible
-        if HOLIDAYS_AVAILABLE:
-            try:
-                all_h.update(holidays.country_holidays(country_code, years=year))
-            except Exception as e:
-                logging.error(f"Erreur lors de la récupération des jours fériés officiels pour {year}: {e}")
-
-        # Charge les jours fériés personnalisés depuis la base de données
+def get_calendriers():
+    """
+    Calendriers régionaux configurés (conges.calendriers) : {nom: code}.
+    Le code est le code pays ISO, suivi de la subdivision éventuelle ('MA', 'ES-CT').
+    """
+    calendriers = {}
+    for nom, definition in (CONFIG['conges'].get('calendriers') or {}).items():
+        definition = definition or {}
+        pays = definition.get('pays', CONFIG['conges']['holidays_country'])
+        subdiv = definition.get('subdiv')
+        calendriers[nom] = f"{pays}-{subdiv}" if subdiv else pays
+    return calendriers
+
+# Calendriers inconnus déjà signalés (un avertissement par nom)
+_unknown_calendars_logged = set()
+
+def get_calendar_code(nom_calendrier=None):
+    """Code du calendrier nommé, ou du calendrier par défaut (conges.holidays_country)."""
+    if nom_calendrier:
+        code = get_calendriers().get(nom_calendrier)
+        if code:
+            return code
+        if nom_calendrier not in _unknown_calendars_logged:
+            logging.warning(f"Calendrier '{nom_calendrier}' inconnu : utilisation du calendrier par défaut.")
+            _unknown_calendars_logged.add(nom_calendrier)
+    return CONFIG['conges']['holidays_country']
+
+_holidays_warning_logged = False
+
+def _compute_official_holidays(country_code, years):
+    """
+    Calcule les jours fériés officiels avec la bibliothèque 'holidays' (import optionnel).
+    `country_code` est un code de calendrier ('MA' ou 'PAYS-SUBDIV').
+    Retourne (lignes, années en échec) où les lignes sont des tuples (code, date SQL, nom),
+    ou None si la bibliothèque est absente.
+    """
+    global _holidays_warning_logged
+    try:
+        import holidays
+    except ImportError:
+        if not _holidays_warning_logged:
+            logging.warning("Bibliothèque 'holidays' non trouvée. Seuls les jours fériés personnalisés seront chargés.")
+            _holidays_warning_logged = True
+        return None
+
+    pays, _, subdiv = country_code.partition('-')
+    rows, failed_years = [], []
+    for year in years:
         try:
-            if db_manager and db_manager.conn:
-                db_h = db_manager.get_holidays_for_year(str(year))
-                for date_str, name, type in db_h:
-                    validated_date = validate_date(date_str)
-                    if validated_date:
-                        all_h[validated_date.date()] = name
-        except sqlite3.Error as e:
-            logging.error(f"Erreur lors du chargement des jours fériés personnalisés pour {year}: {e}")
-            
-    return set(all_h.keys())
+            rows.extend((country_code, h_date.strftime('%Y-%m-%d'), h_name)
+                        for h_date, h_name in holidays.country_holidays(pays, subdiv=subdiv or None, years=year).items())
+        except Exception as e:
+            failed_years.append(year)
+            logging.error(f"Erreur lors de la récupération des jours fériés officiels pour {year}: {e}")
+    return rows, failed_years
+
+def ensure_official_holidays(db_manager, country_code, start_year, end_year):
+    """
+    S'assure que la table jours_feries_officiels couvre les années [start_year, end_year].
+    La bibliothèque 'holidays' n'est sollicitée que pour les années manquantes. Si une
+    année échoue, la plage enregistrée n'est pas élargie : elle sera recalculée au prochain appel.
+    """
+    if not db_manager or not db_manager.conn:
+        return
+    try:
+        current_range = db_manager.get_official_holidays_range(country_code)
+        if current_range and current_range[0] <= start_year and end_year <= current_range[1]:
+            return
+
+        if current_range:
+            new_start, new_end = min(start_year, current_range[0]), max(end_year, current_range[1])
+            missing_years = [y for y in range(new_start, new_end + 1) if not current_range[0] <= y <= current_range[1]]
+        else:
+            new_start, new_end = start_year, end_year
+            missing_years = list(range(new_start, new_end + 1))
+
+        result = _compute_official_holidays(country_code, missing_years)
+        if result is None:
+            return
+        rows, failed_years = result
+        if failed_years:
+            # Les années calculées sont conservées, mais la plage couverte reste inchangée
+            db_manager.store_official_holidays(country_code, *(current_range or (None, None)), rows)
+            logging.warning(f"Jours fériés officiels ({country_code}) incomplets : années {failed_years} à recalculer.")
+            return
+        db_manager.store_official_holidays(country_code, new_start, new_end, rows)
+        logging.info(f"Jours fériés officiels ({country_code}) précalculés pour {new_start}-{new_end}.")
+    except sqlite3.Error as e:
+        logging.error(f"Erreur lors du précalcul des jours fériés officiels ({country_code}): {e}")
+
+def get_holidays_set_for_period(db_manager, start_year, end_year, country_code=None):
+    """
+    Charge les jours fériés (officiels et personnalisés) pour une période donnée.
+    `country_code` désigne le calendrier (par défaut conges.holidays_country).
+    """
+    country_code = country_code or CONFIG['conges']['holidays_country']
+    last_year = end_year + 1
+    holidays_set = set()
+    if not db_manager or not db_manager.conn:
+        return holidays_set
+
+    ensure_official_holidays(db_manager, country_code, start_year, last_year)
+    try:
+        rows = db_manager.get_holiday_dates_between(country_code, f"{start_year:04d}-01-01", f"{last_year:04d}-12-31")
+        for (date_str,) in rows:
+            validated_date = validate_date(date_str)
+            if validated_date:
+                holidays_set.add(validated_date.date())
+    except sqlite3.Error as e:
+        logging.error(f"Erreur lors du chargement des jours fériés pour {start_year}-{last_year}: {e}")
+    return holidays_set
 
 def jours_ouvres(date_debut, date_fin, holidays_set):
-    """Calcule le nombre de jours ouvrés entre deux dates, en excluant les jours fériés."""
+    """
+    Calcule le nombre de jours ouvrés entre deux dates, en excluant les jours fériés.
+    `holidays_set` peut être un ensemble de dates ou un BusinessCalendar (calcul en O(1)).
+    """
     if not date_debut or not date_fin or date_fin < date_debut:
         return 0
+    if isinstance(holidays_set, BusinessCalendar):
+        return holidays_set.jours_ouvres(date_debut, date_fin)
     jours = 0
     current_day = date_debut.date() if isinstance(date_debut, datetime) else date_debut
     end_day = date_fin.date() if isinstance(date_fin, datetime) else date_fin
@@ -111,12 +221,66 @@ def jours_ouvres(date_debut, date_fin, holidays_set):
         current_day += timedelta(days=1)
     return jours
 
+def ajouter_jours_ouvres(date_debut, nb_jours, holidays_set):
+    """
+    Retourne la date du n-ième jour ouvré à partir de date_debut (inclus).
+    Le type de la date de début (date ou datetime) est conservé.
+    """
+    if nb_jours <= 0:
+        return date_debut
+    start_day = date_debut.date() if isinstance(date_debut, datetime) else date_debut
+    if isinstance(holidays_set, BusinessCalendar):
+        end_day = holidays_set.ajouter_jours_ouvres(start_day, nb_jours)
+    else:
+        end_day = start_day
+        days_counted = 0
+        while True:
+            if end_day.weekday() < 5 and end_day not in holidays_set:
+                days_counted += 1
+                if days_counted >= nb_jours:
+                    break
+            end_day += timedelta(days=1)
+    if isinstance(date_debut, datetime):
+        return datetime.combine(end_day, date_debut.time())
+    return end_day
+
 def calculate_reprise_date(end_date, holidays_set):
     """Calcule la date de reprise de service."""
     if not end_date:
         return None
+    if isinstance(holidays_set, BusinessCalendar):
+        return holidays_set.date_reprise(end_date)
     reprise_date = end_date.date() if isinstance(end_date, datetime) else end_date
     reprise_date += timedelta(days=1)
     while reprise_date.weekday() >= 5 or reprise_date in holidays_set: 
         reprise_date += timedelta(days=1)
-    return reprise_date
\ No newline at end of file
+    return reprise_date
+
+# --- Calculs par lots (vectorisés avec numpy si disponible) ---
+
+def _numpy_busdaycalendar(holidays_set):
+    holidays_iter = holidays_set.holidays if isinstance(holidays_set, BusinessCalendar) else holidays_set
+    return np.busdaycalendar(weekmask='1111100', holidays=np.array(sorted(holidays_iter), dtype='datetime64[D]'))
+
+def _to_datetime64(dates):
+    """Convertit une séquence de date/datetime (ou None) en tableau datetime64[D] (NaT pour None)."""
+    return np.array([d.date() if isinstance(d, datetime) else d for d in dates], dtype='datetime64[D]')
+
+def jours_ouvres_batch(dates_debut, dates_fin, holidays_set):
+    """
+    Version par lots de jours_ouvres : retourne la liste des jours ouvrés pour
+    chaque couple (dates_debut[i], dates_fin[i]). Utilise numpy.busday_count si disponible.
+    """
+    if not NUMPY_AVAILABLE:
+        return [jours_ouvres(debut, fin, holidays_set) for debut, fin in zip(dates_debut, dates_fin)]
+    if len(dates_debut) == 0:
+        return []
+
+    debuts = _to_datetime64(dates_debut)
+    fins = _to_datetime64(dates_fin)
+    valides = ~np.isnat(debuts) & ~np.isnat(fins) & (fins >= debuts)
+    resultats = np.zeros(len(debuts), dtype=np.int64)
+    if valides.any():
+        resultats[valides] = np.busday_count(debuts[valides], fins[valides] + np.timedelta64(1, 'D'),
+                                             busdaycal=_numpy_busdaycalendar(holidays_set))
+    return resultats.tolist()
@@ -4,7 +4,10 @@
 import openpyxl
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font
-from datetime import datetime
+from openpyxl.cell import WriteOnlyCell
+from datetime import datetime, timedelta
+import csv
+from itertools import chain, islice
 import re
 import logging
 import docx
@@ -14,11 +17,12 @@ import uuid  # Import nécessaire pour la génération d'ID uniques
 from db.database import DatabaseManager
 from core.conges.manager import CongeManager
 from utils.config_loader import CONFIG
-from utils.date_utils import format_date_for_display
+from utils.date_utils import format_date_for_display, validate_date
 
 def _perform_db_operation_with_manager(db_path, certificats_path, operation_callback):
     """
-    Fonction utilitaire pour gérer la connexion/déconnexion DB dans un thread.
+    Fonction utilitaire pour exécuter une opération DB dans un thread. La connexion est
+    empruntée au pool partagé (déjà configurée, cache chaud) puis lui est rendue.
     """
     db = DatabaseManager(db_path)
     if not db.connect():
@@ -32,28 +36,42 @@ def _perform_db_operation_with_manager(db_path, certificats_path, operation_call
     finally:
         db.close()
 
+def _preparer_feuille(ws, headers, largeurs):
+    """
+    Dimensionne les colonnes puis écrit l'en-tête d'une feuille en écriture seule.
+    Les largeurs doivent être connues avant la première ligne : elles sont écrites en tête du fichier.
+    """
+    for col_idx, (header, largeur) in enumerate(zip(headers, largeurs), 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = max(len(header), largeur) + 2
+    header_font = Font(bold=True)
+    cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cells.append(cell)
+    ws.append(cells)
+
 def export_agents_to_excel(db_path, certificats_path, save_path):
-    """Exporte la liste des agents. Conçu pour être exécuté dans un thread."""
+    """
+    Exporte la liste des agents. Conçu pour être exécuté dans un thread.
+    Les agents sont lus par paquets et écrits au fil de l'eau (classeur en écriture seule) :
+    la mémoire utilisée ne dépend pas du nombre d'agents.
+    """
     def operation(manager):
-        agents = manager.get_all_agents()
-        if not agents:
+        if not manager.get_agents_count():
             return "Aucun agent à exporter."
         
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Agents"
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Agents")
         
         annee_exercice = manager.get_annee_exercice()
         an_n, an_n1, an_n2 = annee_exercice, annee_exercice - 1, annee_exercice - 2
         headers = ["ID", "Nom", "Prénom", "PPR", "Grade", 
                    f"Solde {an_n2}", f"Solde {an_n1}", f"Solde {an_n}", "Solde Total Actif"]
-        ws.append(headers)
-        
-        header_font = Font(bold=True)
-        for cell in ws[1]:
-            cell.font = header_font
+        longueurs = manager.db.get_longueurs_max("agents", ["id", "nom", "prenom", "ppr", "grade"])
+        _preparer_feuille(ws, headers, list(longueurs.values()) + [6] * 4)
 
-        for agent in agents:
+        for agent in manager.iter_all_agents():
             soldes_par_annee = {s.annee: s.solde for s in agent.soldes_annuels if s.statut == 'Actif'}
             solde_n2 = soldes_par_annee.get(an_n2, 0.0)
             solde_n1 = soldes_par_annee.get(an_n1, 0.0)
@@ -62,10 +80,6 @@ def export_agents_to_excel(db_path, certificats_path, save_path):
             
             ws.append([agent.id, agent.nom, agent.prenom, agent.ppr, agent.grade, 
                        solde_n2, solde_n1, solde_n, solde_total])
-
-        for col_idx, col_cells in enumerate(ws.columns, 1):
-            max_length = max(len(str(cell.value or "")) for cell in col_cells)
-            ws.column_dimensions[get_column_letter(col_idx)].width = max_length + 2
         
         output_dir = os.path.dirname(save_path)
         os.makedirs(output_dir, exist_ok=True)
@@ -76,35 +90,37 @@ def export_agents_to_excel(db_path, certificats_path, save_path):
     return _perform_db_operation_with_manager(db_path, certificats_path, operation)
 
 def export_all_conges_to_excel(db_path, certificats_path, save_path):
-    """Exporte la liste de tous les congés. Conçu pour être exécuté dans un thread."""
+    """
+    Exporte la liste de tous les congés. Conçu pour être exécuté dans un thread.
+    Les congés sont lus et écrits par paquets ; seuls les agents du paquet courant sont chargés.
+    """
     def operation(manager):
-        all_conges = manager.get_all_conges()
-        if not all_conges:
+        all_conges = manager.iter_all_conges()
+        premier = next(all_conges, None)
+        if premier is None:
             return "Aucun congé à exporter."
+        all_conges = chain([premier], all_conges)
             
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Tous les Congés"
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Tous les Congés")
         headers = ["Nom Agent", "Prénom Agent", "PPR Agent", "Type Congé", "Début", "Fin", "Jours Pris", "Statut", "Justification", "Intérimaire"]
-        ws.append(headers)
-        header_font = Font(bold=True)
-        for cell in ws[1]:
-            cell.font = header_font
-            
-        all_agents = {agent.id: agent for agent in manager.get_all_agents()}
-        for conge in all_conges:
-            agent = all_agents.get(conge.agent_id)
-            agent_nom, agent_prenom, agent_ppr = (agent.nom, agent.prenom, agent.ppr) if agent else ("Agent", "Supprimé", "")
-            interim_info = ""
-            if conge.interim_id:
-                interim = all_agents.get(conge.interim_id)
-                interim_info = f"{interim.nom} {interim.prenom}" if interim else "Agent Supprimé"
-            row_data = [agent_nom, agent_prenom, agent_ppr, conge.type_conge, format_date_for_display(conge.date_debut), format_date_for_display(conge.date_fin), conge.jours_pris, conge.statut, conge.justif or "", interim_info]
-            ws.append(row_data)
-            
-        for col_idx, col_cells in enumerate(ws.columns, 1):
-            max_length = max(len(str(cell.value or "")) for cell in col_cells)
-            ws.column_dimensions[get_column_letter(col_idx)].width = max_length + 2
+        l_agents = manager.db.get_longueurs_max("agents", ["nom", "prenom", "ppr"])
+        l_conges = manager.db.get_longueurs_max("conges", ["type_conge", "statut", "justif"])
+        _preparer_feuille(ws, headers, [l_agents["nom"], l_agents["prenom"], l_agents["ppr"], l_conges["type_conge"], 10, 10, 4,
+                                        l_conges["statut"], l_conges["justif"], l_agents["nom"] + l_agents["prenom"] + 1])
+
+        for paquet in iter(lambda: list(islice(all_conges, manager.db.arraysize)), []):
+            agents = manager.db.get_agents_identites([c.agent_id for c in paquet] + [c.interim_id for c in paquet if c.interim_id])
+
+            for conge in paquet:
+                agent = agents.get(conge.agent_id)
+                agent_nom, agent_prenom, agent_ppr = agent[:3] if agent else ("Agent", "Supprimé", "")
+                interim_info = ""
+                if conge.interim_id:
+                    interim = agents.get(conge.interim_id)
+                    interim_info = f"{interim[0]} {interim[1]}" if interim else "Agent Supprimé"
+                row_data = [agent_nom, agent_prenom, agent_ppr, conge.type_conge, format_date_for_display(conge.date_debut), format_date_for_display(conge.date_fin), conge.jours_pris, conge.statut, conge.justif or "", interim_info]
+                ws.append(row_data)
 
         output_dir = os.path.dirname(save_path)
         os.makedirs(output_dir, exist_ok=True)
@@ -114,6 +130,32 @@ def export_all_conges_to_excel(db_path, certificats_path, save_path):
 
     return _perform_db_operation_with_manager(db_path, certificats_path, operation)
 
+def export_soldes_a_date_to_excel(db_path, certificats_path, save_path, jour):
+    """
+    Exporte le solde actif total de chaque agent à la fin du jour donné (audit de fin
+    d'exercice). Conçu pour être exécuté dans un thread. Les soldes sont calculés par
+    la base (dernier instantané + mouvements suivants) et écrits au fil de l'eau.
+    """
+    def operation(manager):
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(f"Soldes au {jour:%d-%m-%Y}")
+        headers = ["ID", "Nom", "Prénom", "PPR", "Grade", f"Solde au {jour:%d/%m/%Y}"]
+        longueurs = manager.db.get_longueurs_max("agents", ["id", "nom", "prenom", "ppr", "grade"])
+        _preparer_feuille(ws, headers, list(longueurs.values()) + [6])
+
+        nb_agents = 0
+        for agent_id, nom, prenom, ppr, grade, solde in manager.iter_soldes_a_date(jour):
+            ws.append([agent_id, nom, prenom, ppr, grade, round(solde, 2)])
+            nb_agents += 1
+        if not nb_agents:
+            return "Aucun agent à exporter."
+
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        wb.save(save_path)
+        return f"Soldes au {jour:%d/%m/%Y} de {nb_agents} agent(s) exportés vers\n{save_path}"
+
+    return _perform_db_operation_with_manager(db_path, certificats_path, operation)
+
 def import_agents_from_excel(db_path, certificats_path, source_path):
     """Importe des agents avec une logique de colonnes optionnelles."""
     def operation(manager):
@@ -133,8 +175,8 @@ def import_agents_from_excel(db_path, certificats_path, source_path):
 
         col_map = {name: i for i, name in enumerate(header)}
         
-        manager.db.conn.execute('BEGIN TRANSACTION')
-        try:
+        # Une seule validation pour tout le fichier ; toute erreur annule l'import
+        with manager.db.transaction():
             for i, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
                 if all(c is None for c in row):
                     continue
@@ -182,18 +224,124 @@ def import_agents_from_excel(db_path, certificats_path, source_path):
                     errors.append(f"Ligne {i}: {ve}")
             
             if errors:
-                manager.db.conn.rollback()
                 raise Exception("Importation annulée en raison d'erreurs:\n" + "\n".join(errors[:10]))
-            else:
-                manager.db.conn.commit()
-                return f"Importation réussie !\n\n- Agents ajoutés : {added_count}\n- Agents mis à jour : {updated_count}"
+        return f"Importation réussie !\n\n- Agents ajoutés : {added_count}\n- Agents mis à jour : {updated_count}"
 
-        except Exception as e:
-            manager.db.conn.rollback()
-            raise e
+    return _perform_db_operation_with_manager(db_path, certificats_path, operation)
+
+def run_annual_rollover(db_path, certificats_path, taille_lot=None, progression=None):
+    """Clôture de l'exercice annuel. Conçu pour être exécuté dans un thread."""
+    def operation(manager):
+        return manager.effectuer_glissement_annuel(taille_lot=taille_lot, progression=progression)
 
     return _perform_db_operation_with_manager(db_path, certificats_path, operation)
 
+def _ics_date(value):
+    """Convertit une valeur DTSTART/DTEND (AAAAMMJJ ou AAAAMMJJTHHMMSS[Z]) en date."""
+    return datetime.strptime(value.strip()[:8], "%Y%m%d").date()
+
+def _read_holidays_ics(source_path, errors):
+    """
+    Lit les événements (VEVENT) d'un fichier iCalendar. Un événement sur plusieurs jours
+    donne une date par jour ; les règles de récurrence (RRULE) ne sont pas développées.
+    """
+    with open(source_path, encoding="utf-8-sig") as f:
+        raw_lines = f.read().splitlines()
+
+    # Dépliage des lignes longues (RFC 5545 : continuation par espace ou tabulation)
+    lines = []
+    for line in raw_lines:
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        else:
+            lines.append(line)
+
+    rows, event = [], None
+    for num, line in enumerate(lines, start=1):
+        if line == "BEGIN:VEVENT":
+            event = {'ligne': num}
+        elif line == "END:VEVENT" and event is not None:
+            try:
+                if 'DTSTART' not in event:
+                    raise ValueError("DTSTART manquant.")
+                nom = event.get('SUMMARY', '').strip()
+                if not nom:
+                    raise ValueError("SUMMARY manquant.")
+                debut = _ics_date(event['DTSTART'][1])
+                if 'DTEND' in event:
+                    params, value = event['DTEND']
+                    fin = _ics_date(value)
+                    # Pour un événement "journée entière", DTEND est exclusif
+                    if "VALUE=DATE" in params or len(value.strip()) == 8:
+                        fin -= timedelta(days=1)
+                    fin = max(fin, debut)
+                else:
+                    fin = debut
+                jour = debut
+                while jour <= fin:
+                    rows.append((jour.strftime("%Y-%m-%d"), nom))
+                    jour += timedelta(days=1)
+            except ValueError as e:
+                errors.append(f"Événement ligne {event['ligne']}: {e}")
+            event = None
+        elif event is not None and ":" in line:
+            key, value = line.split(":", 1)
+            name, _, params = key.partition(";")
+            if name == "SUMMARY":
+                event['SUMMARY'] = value.replace("\\,", ",").replace("\\;", ";").replace("\\n", " ").replace("\\\\", "\\")
+            elif name in ("DTSTART", "DTEND"):
+                event[name] = (params.upper(), value)
+    return rows
+
+def _read_holidays_csv(source_path, errors):
+    """Lit un fichier CSV à deux colonnes (date, description), avec ou sans ligne d'en-tête."""
+    with open(source_path, encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=";,\t").delimiter
+        except csv.Error:
+            delimiter = ";"
+        rows = []
+        for num, row in enumerate(csv.reader(f, delimiter=delimiter), start=1):
+            if not row or all(not c.strip() for c in row):
+                continue
+            jour = validate_date(row[0])
+            if not jour:
+                if num == 1:
+                    continue  # ligne d'en-tête
+                errors.append(f"Ligne {num}: date '{row[0]}' invalide.")
+                continue
+            nom = row[1].strip() if len(row) > 1 else ""
+            if not nom:
+                errors.append(f"Ligne {num}: description manquante.")
+                continue
+            rows.append((jour.strftime("%Y-%m-%d"), nom))
+    return rows
+
+def read_holidays_file(source_path):
+    """
+    Lit et valide un fichier de jours fériés (.ics ou .csv).
+    Retourne la liste triée des (date_sql, description), une seule entrée par date.
+    Lève ValueError si le fichier contient des erreurs : rien n'est importé dans ce cas.
+    """
+    errors = []
+    extension = os.path.splitext(source_path)[1].lower()
+    if extension == ".ics":
+        rows = _read_holidays_ics(source_path, errors)
+    elif extension == ".csv":
+        rows = _read_holidays_csv(source_path, errors)
+    else:
+        raise ValueError(f"Format de fichier non pris en charge : {extension or source_path}")
+
+    if errors:
+        raise ValueError("Importation annulée en raison d'erreurs:\n" + "\n".join(errors[:10]))
+
+    par_date = {}
+    for date_sql, nom in rows:
+        par_date.setdefault(date_sql, nom)
+    return sorted(par_date.items())
+
 def generate_decision_from_template(template_path, output_path, context):
     """
     Génère un document Word à partir d'un modèle en remplaçant les tags.
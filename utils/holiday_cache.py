@@ -0,0 +1,67 @@
+# Fichier : utils/holiday_cache.py
+# Description : Cache des jours fériés partagé par tout le processus.
+# Les ensembles de jours fériés et les calendriers de jours ouvrés compilés sont
+# conservés par (chemin de la base, pays, année de début, année de fin) et ne sont
+# invalidés que lors d'une écriture sur les jours fériés.
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class HolidayCache:
+    """Cache thread-safe des jours fériés et des calendriers de jours ouvrés."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holidays = {}
+        self._calendars = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _get(self, store, key, loader):
+        with self._lock:
+            if key in store:
+                self.hits += 1
+                return store[key]
+            self.misses += 1
+            generation = self.invalidations
+        # Le chargement se fait hors du verrou (requêtes SQL potentiellement longues)
+        value = loader()
+        with self._lock:
+            # Une invalidation pendant le chargement rend la valeur obsolète pour le cache
+            if generation != self.invalidations:
+                return value
+            return store.setdefault(key, value)
+
+    def get_holidays(self, key, loader):
+        """Retourne l'ensemble (frozenset) des jours fériés pour la clé, en le chargeant si besoin."""
+        return self._get(self._holidays, key, lambda: frozenset(loader()))
+
+    def get_calendar(self, key, builder):
+        """Retourne le calendrier compilé pour la clé, en le construisant si besoin."""
+        return self._get(self._calendars, key, builder)
+
+    def invalidate(self):
+        """Vide le cache après une modification des jours fériés."""
+        with self._lock:
+            self._holidays.clear()
+            self._calendars.clear()
+            self.invalidations += 1
+        logger.info("Cache des jours fériés invalidé.")
+
+    def stats(self):
+        """Retourne les compteurs du cache."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'entries': len(self._holidays) + len(self._calendars),
+            }
+
+
+# Instance unique partagée par tous les CongeManager du processus
+HOLIDAY_CACHE = HolidayCache()